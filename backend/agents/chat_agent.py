@@ -2,15 +2,37 @@ from crewai import Agent, Crew, Task, Process
 from loguru import logger
 from models.chat_models import ChatMessage
 from typing import List
-from services.qdrant_service import qdrant_service
+import re
+from services.vector_store_factory import vector_store
 from config import llm
+from config.settings import settings
 from services.notebook_repository import notebook_repository
 
-async def get_relevant_sources(notebook_id: str, query: str):
+# Words that make a question depend on earlier turns, e.g. "what about its pricing?"
+FOLLOW_UP_WORDS = frozenset("""
+it its it's this these those they them their theirs he him his she her hers
+former latter above previous earlier else again
+""".split())
 
-  logger.info(f"Getting relevant sources from Qdrant for notebook: {notebook_id} with query: {query}")
+def needs_query_rewrite(question: str, chat_history: str) -> bool:
+  """Check whether a question needs the chat history folded in before searching.
 
-  results = await qdrant_service.search(query, notebook_id)
+  Hybrid search matches exact terms on its own, so only short or referential
+  follow-up questions are rewritten with the LLM.
+  """
+  if not chat_history or settings.CHAT_QUERY_REWRITE == "never":
+    return False
+  if settings.CHAT_QUERY_REWRITE == "always":
+    return True
+  words = re.findall(r"[\w']+", question.casefold())
+  return len(words) < 4 or any(word in FOLLOW_UP_WORDS for word in words)
+
+async def get_relevant_sources(notebook_id: str, queries: List[str]):
+
+  logger.info(f"Getting relevant sources for notebook: {notebook_id} with queries: {queries}")
+
+  # All phrasings are embedded and searched in one round trip each
+  results = await vector_store.search_many(queries, notebook_id, fields=["content_chunk", "url", "page_title"])
 
   output = ""
   for result in results:
@@ -20,7 +42,7 @@ async def get_relevant_sources(notebook_id: str, query: str):
         source_info = f"Source: {page_title} ({result['url']})"
     output += f"Content: {result['content_chunk']}\n{source_info}\n---\n"
 
-  logger.info(f"Relevant sources from Qdrant for notebook: {notebook_id} with query: {query} are: {output}")
+  logger.info(f"Relevant sources for notebook: {notebook_id} with queries: {queries} are: {output}")
 
   return output
 
@@ -85,10 +107,11 @@ async def run_chat_agent(notebook_id: str, messages: List[ChatMessage]):
 
     logger.info(f"Chat history: {chat_history}")
 
-    # Rewrite question based on chat history for better vector search
-    search_query = messages[-1].content
-    if chat_history:
-        search_query = llm.call(f"""
+    # Rewrite follow-up questions based on chat history for better vector search,
+    # searching with both the original and the rewritten question
+    search_queries = [messages[-1].content]
+    if needs_query_rewrite(messages[-1].content, chat_history):
+        search_queries.append(llm.call(f"""
         Given the following chat history and current question, rewrite the question to include relevant context that would help with searching a vector database. Focus on key concepts and terminology that should match similar content.
 
         Chat History:
@@ -102,9 +125,9 @@ async def run_chat_agent(notebook_id: str, messages: List[ChatMessage]):
         ```
 
         Rewrite the question in a way that captures the full context. Only output the rewritten question, nothing else.
-        """)
+        """))
 
-    relevant_sources = await get_relevant_sources(notebook_id, search_query)
+    relevant_sources = await get_relevant_sources(notebook_id, search_queries)
 
     crew = get_decipher_crew()
 
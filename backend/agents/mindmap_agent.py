@@ -1,8 +1,9 @@
 from crewai import Agent, Crew, Task, Process
 from loguru import logger
 from config import llm
+from services.cancellation import check_cancelled
 from models.mindmap_models import MindmapStructure, SimpleMindmapStructure
-from services.qdrant_service import qdrant_service
+from services.vector_store_factory import vector_store
 import uuid
 
 def get_mindmap_crew():
@@ -138,6 +139,7 @@ def get_mindmap_crew():
         tasks=[analyze_content_task, create_mindmap_task],
         process=Process.sequential,
         verbose=True,
+        step_callback=check_cancelled,
     )
 
 
@@ -153,12 +155,12 @@ async def run_mindmap_agent(notebook_id: str):
     """
     logger.info(f"Running mindmap agent for notebook: {notebook_id}")
 
-    chunks = await qdrant_service.get_all_chunks_by_notebook_id(notebook_id)
+    # Stream chunks so only their text is held in memory
+    research_parts = []
+    async for chunk in vector_store.iter_chunks_by_notebook_id(notebook_id, fields=["content_chunk"]):
+        research_parts.append(chunk["content_chunk"])
 
-    research = "\n\n".join(
-        chunk["content_chunk"]
-        for chunk in chunks
-    )
+    research = "\n\n".join(research_parts)
 
     logger.debug(f"Research content length: {len(research)} characters")
 
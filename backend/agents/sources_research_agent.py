@@ -7,10 +7,12 @@ from datetime import datetime
 import time
 from models.topic_research_models import WebLink, BlogPostTaskResult, FaqTaskResult
 from models.task_models import ResearchSource
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 from config import llm, SOURCES_RESEARCH_AGENT_CONFIGS, SOURCES_RESEARCH_TASK_CONFIGS
 import asyncio
+from services.cancellation import check_cancelled
 from services.markitdown_service import markdown_converter
+from services.task_executor import task_progress, task_stage
 
 server_params = StdioServerParameters(
     command="pnpm",
@@ -18,7 +20,18 @@ server_params = StdioServerParameters(
     env={"API_TOKEN": os.environ["BRIGHT_DATA_API_TOKEN"], "BROWSER_AUTH": os.environ["BRIGHT_DATA_BROWSER_AUTH"]},
 )
 
-async def run_sources_research_crew(sources: List[ResearchSource]):
+async def run_sources_research_crew(
+    sources: List[ResearchSource],
+    on_page_scraped: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_file_converted: Optional[Callable[[Dict[str, Any]], None]] = None,
+):
+    """Research user-provided sources and write a blog post and FAQ about them.
+
+    Args:
+        sources: URLs, uploaded files and manual text to research
+        on_page_scraped: Called with each scraped page ({"url", "content"}) as soon as it is scraped
+        on_file_converted: Called with each converted file ({"file_name", "content"}) as soon as it is converted
+    """
     logger.info(f"Running sources research crew for {len(sources)} sources")
 
     start_time = time.time()
@@ -56,7 +69,8 @@ async def run_sources_research_crew(sources: List[ResearchSource]):
                 verbose=True,
                 process=Process.sequential,
                 output_log_file=f"logs/web_scraping_crew_{current_time}.log",
-                max_rpm=20
+                max_rpm=20,
+                step_callback=check_cancelled
             )
 
             researcher = Agent(
@@ -108,7 +122,8 @@ async def run_sources_research_crew(sources: List[ResearchSource]):
                 verbose=True,
                 process=Process.sequential,
                 output_log_file=f"logs/research_content_crew_{current_time}.log",
-                max_rpm=20
+                max_rpm=20,
+                step_callback=check_cancelled
             )
 
             scraped_data = []
@@ -118,21 +133,25 @@ async def run_sources_research_crew(sources: List[ResearchSource]):
                     if source.source_type == "URL"]
 
             logger.info(f"Unique Links Collected: {links}")
+            task_progress(links_found=len(links))
 
             logger.info(f"Running web scraping crew for {len(links)} links")
 
+            async def scrape(link: WebLink):
+                result = await web_scraping_crew.kickoff_async(inputs={
+                    "url": link.url,
+                    "current_time": current_time,
+                })
+                if on_page_scraped is not None:
+                    on_page_scraped({"url": link.url, "content": result.raw})
+                return result
+
             # Create tasks for parallel web scraping
-            web_scraping_tasks = []
-            for link in links:
-                web_scraping_tasks.append(
-                    web_scraping_crew.kickoff_async(inputs={
-                        "url": link.url,
-                        "current_time": current_time,
-                    })
-                )
+            web_scraping_tasks = [scrape(link) for link in links]
 
             # Execute all web scraping tasks in parallel
-            web_scraping_results = await asyncio.gather(*web_scraping_tasks)
+            async with task_stage("scraping"):
+                web_scraping_results = await asyncio.gather(*web_scraping_tasks)
 
             # Process results and collect scraped data
             for link, result in zip(links, web_scraping_results):
@@ -156,24 +175,28 @@ async def run_sources_research_crew(sources: List[ResearchSource]):
             file_data = []
 
             if any(source.source_type == "UPLOAD" for source in sources):
-                markdown_files = await markdown_converter.convert_urls_to_markdown(
-                    [source.source_url for source in sources if source.source_type == "UPLOAD"]
-                )
+                async with task_stage("file_conversion"):
+                    markdown_files = await markdown_converter.convert_urls_to_markdown(
+                        [source.source_url for source in sources if source.source_type == "UPLOAD"]
+                    )
                 for url, markdown_content in markdown_files.items():
                     file_content += f"\n---\n- File: {url}\n---\n{markdown_content}\n---\n"
                     file_data.append({
                         "file_name": url,
                         "content": markdown_content
                     })
+                    if on_file_converted is not None:
+                        on_file_converted(file_data[-1])
 
             logger.info(f"File content: {file_content}")
 
-            research_content_crew_result = await research_content_crew.kickoff_async(inputs={
-                "scraped_data": scraped_data,
-                "textual_content": textual_content,
-                "file_content": file_content,
-                "current_time": current_time,
-            })
+            async with task_stage("content_crew"):
+                research_content_crew_result = await research_content_crew.kickoff_async(inputs={
+                    "scraped_data": scraped_data,
+                    "textual_content": textual_content,
+                    "file_content": file_content,
+                    "current_time": current_time,
+                })
 
             faq_result = faq_task.output.pydantic.faq
             logger.info(f"FAQ task result: {faq_result}")
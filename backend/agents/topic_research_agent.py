@@ -6,257 +6,381 @@ from loguru import logger
 from datetime import datetime
 import time
 from models.topic_research_models import WebScrapingPlannerTaskResult, WebScrapingLinkCollectorTaskResult, WebLink, BlogPostTaskResult, FaqTaskResult
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 from config import llm, TOPIC_RESEARCH_AGENT_CONFIGS, TOPIC_RESEARCH_TASK_CONFIGS
 import asyncio
+from services.cancellation import check_cancelled
+from services.checkpoint_repository import TaskCheckpoints
+from services.task_executor import task_progress, task_stage
 server_params = StdioServerParameters(
     command="pnpm",
     args=["dlx", "@brightdata/mcp"],
     env={"API_TOKEN": os.environ["BRIGHT_DATA_API_TOKEN"], "BROWSER_AUTH": os.environ["BRIGHT_DATA_BROWSER_AUTH"]},
 )
 
-# Initialize MCPAdapt with CrewAI adapter
-async def run_research_crew(topic: str):
+# Checkpointed stages, in pipeline order
+SEARCH_QUERIES_STAGE = "search_queries"
+LINKS_STAGE = "links"
+SCRAPED_PAGE_STAGE = "scraped_page"  # One checkpoint per URL
+RESEARCH_NOTES_STAGE = "research_notes"
+CONTENT_STAGE = "content"
+
+# Called with each scraped page ({"url", "page_title", "content"}) as soon as it is available
+PageCallback = Callable[[Dict[str, Any]], None]
+
+def build_planning_crew(current_time: str) -> Crew:
+    # Planning crew agents
+    web_scraping_planner = Agent(
+        role=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_planner"]["role"],
+        goal=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_planner"]["goal"],
+        backstory=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_planner"]["backstory"],
+        verbose=True,
+        llm=llm,
+    )
+
+    # Planning crew tasks
+
+    planner_task = Task(
+        description=TOPIC_RESEARCH_TASK_CONFIGS["planner"]["description"],
+        expected_output=TOPIC_RESEARCH_TASK_CONFIGS["planner"]["expected_output"],
+        agent=web_scraping_planner,
+        max_retries=5,
+        output_pydantic=WebScrapingPlannerTaskResult
+    )
+
+    # Planning crew
+    return Crew(
+        agents=[web_scraping_planner],
+        tasks=[planner_task],
+        verbose=True,
+        process=Process.sequential,
+        output_log_file=f"logs/planning_crew_{current_time}.log",
+        max_rpm=20,
+        step_callback=check_cancelled
+    )
+
+def build_link_collector_crew(tools, current_time: str) -> Crew:
+    web_scraping_link_collector_tools = [tool for tool in tools if tool.name in ["search_engine"]]
+
+    # Web scraping link collector agents
+    web_scraping_link_collector = Agent(
+        role=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_link_collector"]["role"],
+        goal=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_link_collector"]["goal"],
+        backstory=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_link_collector"]["backstory"],
+        verbose=True,
+        tools=web_scraping_link_collector_tools,
+        llm=llm,
+    )
+
+    # Web scraping link collector tasks
+    link_collector_task = Task(
+        description=TOPIC_RESEARCH_TASK_CONFIGS["link_collector"]["description"],
+        expected_output=TOPIC_RESEARCH_TASK_CONFIGS["link_collector"]["expected_output"],
+        agent=web_scraping_link_collector,
+        max_retries=5,
+        output_pydantic=WebScrapingLinkCollectorTaskResult
+    )
+
+    # Web scraping link collector crew
+    return Crew(
+        agents=[web_scraping_link_collector],
+        tasks=[link_collector_task],
+        verbose=True,
+        process=Process.sequential,
+        output_log_file=f"logs/web_scraping_link_collector_crew_{current_time}.log",
+        max_rpm=20,
+        step_callback=check_cancelled
+    )
+
+def build_web_scraping_crew(tools, current_time: str) -> Crew:
+    web_scraping_tools = [tool for tool in tools if tool.name in ["scrape_as_markdown"]]
+
+    # Web scraping agents
+    web_scraper = Agent(
+        role=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraper"]["role"],
+        goal=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraper"]["goal"],
+        backstory=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraper"]["backstory"],
+        verbose=True,
+        tools=web_scraping_tools,
+        llm=llm,
+        max_iter=50,
+    )
+
+    # Web scraping tasks
+    web_scraping_task = Task(
+        description=TOPIC_RESEARCH_TASK_CONFIGS["web_scraping"]["description"],
+        expected_output=TOPIC_RESEARCH_TASK_CONFIGS["web_scraping"]["expected_output"],
+        agent=web_scraper,
+        max_retries=5
+    )
+
+    # Web scraping crew
+    return Crew(
+        agents=[web_scraper],
+        tasks=[web_scraping_task],
+        verbose=True,
+        process=Process.sequential,
+        output_log_file=f"logs/web_scraping_crew_{current_time}.log",
+        max_rpm=20,
+        step_callback=check_cancelled
+    )
+
+def build_researcher() -> Agent:
+    return Agent(
+        role=TOPIC_RESEARCH_AGENT_CONFIGS["researcher"]["role"],
+        goal=TOPIC_RESEARCH_AGENT_CONFIGS["researcher"]["goal"],
+        backstory=TOPIC_RESEARCH_AGENT_CONFIGS["researcher"]["backstory"],
+        verbose=True,
+        llm=llm,
+    )
+
+def build_research_crew(current_time: str) -> Crew:
+    researcher = build_researcher()
+
+    research_task = Task(
+        description=TOPIC_RESEARCH_TASK_CONFIGS["research_analysis"]["description"],
+        expected_output=TOPIC_RESEARCH_TASK_CONFIGS["research_analysis"]["expected_output"],
+        agent=researcher,
+        max_retries=5,
+    )
+
+    return Crew(
+        agents=[researcher],
+        tasks=[research_task],
+        verbose=True,
+        process=Process.sequential,
+        output_log_file=f"logs/research_crew_{current_time}.log",
+        max_rpm=20,
+        step_callback=check_cancelled
+    )
+
+def build_content_crew(current_time: str) -> Crew:
+    # The research notes are passed in as the research_notes input
+    researcher = build_researcher()
+
+    content_writer = Agent(
+        role=TOPIC_RESEARCH_AGENT_CONFIGS["content_writer"]["role"],
+        goal=TOPIC_RESEARCH_AGENT_CONFIGS["content_writer"]["goal"],
+        backstory=TOPIC_RESEARCH_AGENT_CONFIGS["content_writer"]["backstory"],
+        verbose=True,
+        llm=llm,
+    )
+
+    faq_task = Task(
+        description=TOPIC_RESEARCH_TASK_CONFIGS["faq_generation"]["description"],
+        expected_output=TOPIC_RESEARCH_TASK_CONFIGS["faq_generation"]["expected_output"],
+        agent=researcher,
+        max_retries=5,
+        output_pydantic=FaqTaskResult
+    )
+
+    content_task = Task(
+        description=TOPIC_RESEARCH_TASK_CONFIGS["content_creation"]["description"],
+        expected_output=TOPIC_RESEARCH_TASK_CONFIGS["content_creation"]["expected_output"],
+        agent=content_writer,
+        max_retries=5,
+        output_pydantic=BlogPostTaskResult
+    )
+
+    # The blog post is the crew result, so it runs last
+    return Crew(
+        agents=[researcher, content_writer],
+        tasks=[faq_task, content_task],
+        verbose=True,
+        process=Process.sequential,
+        output_log_file=f"logs/research_content_crew_{current_time}.log",
+        max_rpm=20,
+        step_callback=check_cancelled
+    )
+
+async def collect_links(tools, topic: str, search_queries: List[str], current_time: str) -> List[WebLink]:
+    """Run the link collector crew for every search query and return the unique links."""
+    web_scraping_link_collector_crew = build_link_collector_crew(tools, current_time)
+
+    logger.info(f"Running web scraping link collector crew for {len(search_queries)} search queries")
+
+    # Create tasks for parallel execution
+    link_collector_tasks = []
+    for search_query in search_queries:
+        logger.info(f"Creating task for search query {search_query}")
+        link_collector_tasks.append(
+            web_scraping_link_collector_crew.kickoff_async(inputs={
+                "topic": topic,
+                "search_query": search_query,
+                "current_time": current_time,
+            })
+        )
+
+    # Execute all tasks in parallel
+    link_collector_results = await asyncio.gather(*link_collector_tasks)
+
+    # Process results and collect unique links
+    links: List[WebLink] = []
+    for result in link_collector_results:
+        logger.info(f"Processing link collector result: {result}")
+        result_links = result["links"]
+        for link in result_links:
+            if link.url not in [l.url for l in links]:
+                links.append(link)
+
+    logger.info(f"Unique Links Collected: {links}")
+    return links
+
+async def scrape_links(tools, topic: str, links: List[WebLink], current_time: str, checkpoints: Optional[TaskCheckpoints],
+                       on_page_scraped: Optional[PageCallback] = None) -> Dict[str, str]:
+    """Scrape links in parallel, saving each page as soon as it is scraped.
+
+    Returns:
+        Scraped markdown by URL
+    """
+    web_scraping_crew = build_web_scraping_crew(tools, current_time)
+
+    logger.info(f"Running web scraping crew for {len(links)} links")
+
+    async def scrape(link: WebLink) -> str:
+        result = await web_scraping_crew.kickoff_async(inputs={
+            "topic": topic,
+            "url": link.url,
+            "current_time": current_time,
+        })
+        logger.info(f"Web scraping crew result for link {link}: {result}")
+        # Saved per page, so pages scraped before another page failed are not scraped again
+        if checkpoints is not None:
+            await checkpoints.save(SCRAPED_PAGE_STAGE, result.raw, key=link.url)
+        if on_page_scraped is not None:
+            on_page_scraped({"url": link.url, "page_title": link.title, "content": result.raw})
+        return result.raw
+
+    # Execute all web scraping tasks in parallel
+    web_scraping_results = await asyncio.gather(*[scrape(link) for link in links])
+    return {link.url: content for link, content in zip(links, web_scraping_results)}
+
+async def run_research_crew(topic: str, checkpoints: Optional[TaskCheckpoints] = None,
+                            on_page_scraped: Optional[PageCallback] = None) -> Dict[str, Any]:
+    """Research a topic on the web and write a blog post and FAQ about it.
+
+    The pipeline runs planning, link collection, scraping, research and
+    content creation in turn. With ``checkpoints``, the output of every stage
+    (and of every scraped page) is saved as it completes, and stages already
+    saved by an earlier attempt of the task are skipped.
+
+    Args:
+        topic: The research topic
+        checkpoints: Checkpoints of the task running the research
+        on_page_scraped: Called with each page as soon as it is scraped (or
+            loaded from a checkpoint), e.g. to embed it while the crews run
+
+    Returns:
+        dict with ``blog_post``, ``title``, ``links``, ``scraped_data`` and ``faq``
+    """
     logger.info(f"Running topic research crew for topic: {topic}")
 
+    def load(stage: str) -> Optional[Any]:
+        return checkpoints.get(stage) if checkpoints is not None else None
+
+    async def save(stage: str, data: Any) -> None:
+        if checkpoints is not None:
+            await checkpoints.save(stage, data)
+
     start_time = time.time()
     try:
-        with MCPServerAdapter(server_params) as tools:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            logger.info(f"Tools: {tools}")
-
-            web_scraping_link_collector_tools = [tool for tool in tools if tool.name in ["search_engine"]]
-
-            web_scraping_tools = [tool for tool in tools if tool.name in ["scrape_as_markdown"]]
-
-            # Planning crew agents
-            web_scraping_planner = Agent(
-                role=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_planner"]["role"],
-                goal=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_planner"]["goal"],
-                backstory=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_planner"]["backstory"],
-                verbose=True,
-                llm=llm,
-            )
-
-            # Planning crew tasks
-
-            planner_task = Task(
-                description=TOPIC_RESEARCH_TASK_CONFIGS["planner"]["description"],
-                expected_output=TOPIC_RESEARCH_TASK_CONFIGS["planner"]["expected_output"],
-                agent=web_scraping_planner,
-                max_retries=5,
-                output_pydantic=WebScrapingPlannerTaskResult
-            )
-
-            # Planning crew
-            planning_crew = Crew(
-                agents=[web_scraping_planner],
-                tasks=[planner_task],
-                verbose=True,
-                process=Process.sequential,
-                output_log_file=f"logs/planning_crew_{current_time}.log",
-                max_rpm=20
-            )
-
-            # Web scraping link collector agents
-            web_scraping_link_collector = Agent(
-                role=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_link_collector"]["role"],
-                goal=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_link_collector"]["goal"],
-                backstory=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraping_link_collector"]["backstory"],
-                verbose=True,
-                tools=web_scraping_link_collector_tools,
-                llm=llm,
-            )
-
-            # Web scraping link collector tasks
-            link_collector_task = Task(
-                description=TOPIC_RESEARCH_TASK_CONFIGS["link_collector"]["description"],
-                expected_output=TOPIC_RESEARCH_TASK_CONFIGS["link_collector"]["expected_output"],
-                agent=web_scraping_link_collector,
-                max_retries=5,
-                output_pydantic=WebScrapingLinkCollectorTaskResult
-            )
-
-            # Web scraping link collector crew
-            web_scraping_link_collector_crew = Crew(
-                agents=[web_scraping_link_collector],
-                tasks=[link_collector_task],
-                verbose=True,
-                process=Process.sequential,
-                output_log_file=f"logs/web_scraping_link_collector_crew_{current_time}.log",
-                max_rpm=20
-            )
-
-            # Web scraping agents
-            web_scraper = Agent(
-                role=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraper"]["role"],
-                goal=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraper"]["goal"],
-                backstory=TOPIC_RESEARCH_AGENT_CONFIGS["web_scraper"]["backstory"],
-                verbose=True,
-                tools=web_scraping_tools,
-                llm=llm,
-                max_iter=50,
-            )
-
-            # Web scraping tasks
-            web_scraping_task = Task(
-                description=TOPIC_RESEARCH_TASK_CONFIGS["web_scraping"]["description"],
-                expected_output=TOPIC_RESEARCH_TASK_CONFIGS["web_scraping"]["expected_output"],
-                agent=web_scraper,
-                max_retries=5
-            )
-
-            # Web scraping crew
-            web_scraping_crew = Crew(
-                agents=[web_scraper],
-                tasks=[web_scraping_task],
-                verbose=True,
-                process=Process.sequential,
-                output_log_file=f"logs/web_scraping_crew_{current_time}.log",
-                max_rpm=20
-            )
-
-            # Research and content creation agents
-            researcher = Agent(
-                role=TOPIC_RESEARCH_AGENT_CONFIGS["researcher"]["role"],
-                goal=TOPIC_RESEARCH_AGENT_CONFIGS["researcher"]["goal"],
-                backstory=TOPIC_RESEARCH_AGENT_CONFIGS["researcher"]["backstory"],
-                verbose=True,
-                llm=llm,
-            )
-
-            content_writer = Agent(
-                role=TOPIC_RESEARCH_AGENT_CONFIGS["content_writer"]["role"],
-                goal=TOPIC_RESEARCH_AGENT_CONFIGS["content_writer"]["goal"],
-                backstory=TOPIC_RESEARCH_AGENT_CONFIGS["content_writer"]["backstory"],
-                verbose=True,
-                llm=llm,
-            )
-
-            # Research and content creation tasks
-            research_task = Task(
-                description=TOPIC_RESEARCH_TASK_CONFIGS["research_analysis"]["description"],
-                expected_output=TOPIC_RESEARCH_TASK_CONFIGS["research_analysis"]["expected_output"],
-                agent=researcher,
-                max_retries=5,
-            )
-
-            content_task = Task(
-                description=TOPIC_RESEARCH_TASK_CONFIGS["content_creation"]["description"],
-                expected_output=TOPIC_RESEARCH_TASK_CONFIGS["content_creation"]["expected_output"],
-                agent=content_writer,
-                context=[research_task],
-                max_retries=5,
-                output_pydantic=BlogPostTaskResult
-            )
-
-            faq_task = Task(
-                description=TOPIC_RESEARCH_TASK_CONFIGS["faq_generation"]["description"],
-                expected_output=TOPIC_RESEARCH_TASK_CONFIGS["faq_generation"]["expected_output"],
-                agent=researcher,
-                context=[research_task],
-                max_retries=5,
-                output_pydantic=FaqTaskResult
-            )
-
-            # Research and content creation crew
-            research_content_crew = Crew(
-                agents=[researcher, content_writer],
-                tasks=[research_task, faq_task, content_task],
-                verbose=True,
-                process=Process.sequential,
-                output_log_file=f"logs/research_content_crew_{current_time}.log",
-                max_rpm=20
-            )
-
-            planning_crew_result = await planning_crew.kickoff_async(inputs={
-                "topic": topic,
-                "current_time": current_time
-            })
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        search_queries = load(SEARCH_QUERIES_STAGE)
+        if search_queries is None:
+            async with task_stage("planning"):
+                planning_crew_result = await build_planning_crew(current_time).kickoff_async(inputs={
+                    "topic": topic,
+                    "current_time": current_time
+                })
 
             logger.info(f"Planning crew result: {planning_crew_result}")
 
             search_queries = planning_crew_result["search_queries"]
+            await save(SEARCH_QUERIES_STAGE, search_queries)
 
-            logger.info(f"Search queries: {search_queries}")
-
-            scraped_data = []
-            links: List[WebLink] = []
-
-            logger.info(f"Running web scraping link collector crew for {len(search_queries)} search queries")
-
-            # Create tasks for parallel execution
-            link_collector_tasks = []
-            for search_query in search_queries:
-                logger.info(f"Creating task for search query {search_query}")
-                link_collector_tasks.append(
-                    web_scraping_link_collector_crew.kickoff_async(inputs={
-                        "topic": topic,
-                        "search_query": search_query,
-                        "current_time": current_time,
-                    })
-                )
+        logger.info(f"Search queries: {search_queries}")
 
-            # Execute all tasks in parallel
-            link_collector_results = await asyncio.gather(*link_collector_tasks)
-
-            # Process results and collect unique links
-            links = []
-            for result in link_collector_results:
-                logger.info(f"Processing link collector result: {result}")
-                result_links = result["links"]
-                for link in result_links:
-                    if link.url not in [l.url for l in links]:
-                        links.append(link)
-
-            logger.info(f"Unique Links Collected: {links}")
-
-            logger.info(f"Running web scraping crew for {len(links)} links")
-
-            # Create tasks for parallel web scraping
-            web_scraping_tasks = []
+        saved_links = load(LINKS_STAGE)
+        links: List[WebLink] = [WebLink(**link) for link in saved_links] if saved_links is not None else []
+        scraped_pages: Dict[str, str] = checkpoints.get_all(SCRAPED_PAGE_STAGE) if checkpoints is not None else {}
+        pending_links = [link for link in links if link.url not in scraped_pages]
+        if saved_links is not None:
+            task_progress(links_found=len(links))
+        if on_page_scraped is not None:
             for link in links:
-                web_scraping_tasks.append(
-                    web_scraping_crew.kickoff_async(inputs={
-                        "topic": topic,
-                        "url": link.url,
-                        "current_time": current_time,
-                    })
-                )
-
-            # Execute all web scraping tasks in parallel
-            web_scraping_results = await asyncio.gather(*web_scraping_tasks)
-
-            # Process results and collect scraped data
-            for link, result in zip(links, web_scraping_results):
-                logger.info(f"Web scraping crew result for link {link}: {result}")
-                scraped_data.append({
-                    "url": link.url,
-                    "page_title": link.title,
-                    "content": result.raw
+                if link.url in scraped_pages:
+                    on_page_scraped({"url": link.url, "page_title": link.title, "content": scraped_pages[link.url]})
+
+        # The MCP server is only needed (and started) for link collection and scraping
+        if saved_links is None or pending_links:
+            with MCPServerAdapter(server_params) as tools:
+                logger.info(f"Tools: {tools}")
+
+                if saved_links is None:
+                    async with task_stage("link_collection"):
+                        links = await collect_links(tools, topic, search_queries, current_time)
+                    task_progress(links_found=len(links))
+                    await save(LINKS_STAGE, [link.model_dump() for link in links])
+                    pending_links = links
+                else:
+                    logger.info(f"Resuming scraping: {len(scraped_pages)} of {len(links)} links already scraped")
+
+                async with task_stage("scraping"):
+                    scraped_pages.update(await scrape_links(tools, topic, pending_links, current_time, checkpoints, on_page_scraped))
+
+        # Process results and collect scraped data
+        scraped_data = [
+            {
+                "url": link.url,
+                "page_title": link.title,
+                "content": scraped_pages[link.url]
+            }
+            for link in links
+        ]
+
+        logger.info(f"Scraped data: {scraped_data}")
+
+        research_notes = load(RESEARCH_NOTES_STAGE)
+        if research_notes is None:
+            async with task_stage("research_crew"):
+                research_crew_result = await build_research_crew(current_time).kickoff_async(inputs={
+                    "topic": topic,
+                    "scraped_data": scraped_data,
+                    "current_time": current_time,
+                })
+            research_notes = research_crew_result.raw
+            await save(RESEARCH_NOTES_STAGE, research_notes)
+
+        content = load(CONTENT_STAGE)
+        if content is None:
+            content_crew = build_content_crew(current_time)
+            async with task_stage("content_crew"):
+                research_content_crew_result = await content_crew.kickoff_async(inputs={
+                    "topic": topic,
+                    "research_notes": research_notes,
+                    "current_time": current_time,
                 })
 
-            logger.info(f"Scraped data: {scraped_data}")
-
-            research_content_crew_result = await research_content_crew.kickoff_async(inputs={
-                "topic": topic,
-                "scraped_data": scraped_data,
-                "current_time": current_time,
-            })
-
-            faq_result = faq_task.output.pydantic.faq
+            faq_result = content_crew.tasks[0].output.pydantic.faq
             logger.info(f"FAQ task result: {faq_result}")
 
             logger.info(f"Research and content creation crew result: {research_content_crew_result}")
 
-            return {
+            content = {
                 "blog_post": research_content_crew_result["blog_post"],
                 "title": research_content_crew_result["title"],
-                "links": [link.model_dump() for link in links],
-                "scraped_data": scraped_data,
                 "faq": [faq.model_dump() for faq in faq_result]
             }
+            await save(CONTENT_STAGE, content)
+
+        return {
+            "blog_post": content["blog_post"],
+            "title": content["title"],
+            "links": [link.model_dump() for link in links],
+            "scraped_data": scraped_data,
+            "faq": content["faq"]
+        }
     except Exception as e:
         logger.error(f"Error in topic research agent: {e}")
         raise e
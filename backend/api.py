@@ -3,7 +3,10 @@ from loguru import logger
 from datetime import datetime
 from contextlib import asynccontextmanager
 
-from services import initialize_db_pool, close_db_pool
+from config.settings import settings
+from services import initialize_db_pool, close_db_pool, vector_store, task_manager
+from services.task_events import task_events
+from services.task_worker import create_task_worker
 from routers.research import router as research_router
 from routers.chat import router as chat_router
 from routers.audio import router as audio_router
@@ -28,10 +31,39 @@ async def lifespan(app):
     logger.info("Initializing database connection pool")
     await initialize_db_pool()
 
+    # Set up the vector store once, before the first request needs it
+    logger.info("Initializing vector store")
+    try:
+        await vector_store.initialize()
+    except Exception as e:
+        # Requests retry the setup lazily, e.g. once Qdrant is reachable
+        logger.error(f"Vector store initialization failed, will retry on first use: {e}")
+
+    # Relay task events between this process and the workers
+    logger.info("Starting task event bus")
+    await task_events.start()
+
+    # Run queued tasks in this process unless dedicated workers (worker.py) do
+    worker = None
+    if settings.RUN_EMBEDDED_WORKER:
+        logger.info("Starting embedded task worker")
+        worker = create_task_worker()
+        task_manager.worker = worker
+        worker.start()
+
     yield
 
     # Shutdown logic
     logger.info("Shutting down application...")
+
+    if worker is not None:
+        # Unfinished tasks are picked up again once their lease expires
+        logger.info("Stopping embedded task worker")
+        task_manager.worker = None
+        await worker.shutdown()
+
+    logger.info("Stopping task event bus")
+    await task_events.stop()
     
     # Close database connection pool
     logger.info("Closing database connection pool")
@@ -0,0 +1,5 @@
+"""
+Offline micro-benchmarks for the ingestion and retrieval path.
+
+Run them from the backend directory, e.g. ``python -m benchmarks.chunking``.
+"""
@@ -0,0 +1,110 @@
+"""
+Micro-benchmark comparing chunkers on markdown documents.
+
+Compares the original whitespace word-window splitter with the chunkers in
+services.chunking, reporting chunking throughput and the total number of
+tokens that would be sent to the embeddings API.
+
+Usage (from the backend directory):
+    python -m benchmarks.chunking                    # synthetic scraped-page corpus
+    python -m benchmarks.chunking page1.md page2.md  # your own documents
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List
+
+from services.chunking import MarkdownChunker, TokenCounter, WordWindowChunker
+
+EMBEDDING_MODEL_MAX_TOKENS = 8191
+
+WORDS = (
+    "research agent vector search embedding model token latency throughput notebook source "
+    "pipeline retrieval context answer question data analysis result market growth revenue "
+    "product customer user system design performance memory network request response"
+).split()
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 512, chunk_overlap: int = 50) -> List[str]:
+    """The splitter QdrantSourceStore used before services.chunking, kept for comparison."""
+    if not text:
+        return []
+    tokens = text.split()
+    chunk_starts = range(0, len(tokens), chunk_size - chunk_overlap)
+    chunks = [
+        " ".join(tokens[i:i + chunk_size])
+        for i in chunk_starts
+        if i + chunk_size <= len(tokens)
+    ]
+    if tokens[chunk_starts[-1]:]:
+        chunks.append(" ".join(tokens[chunk_starts[-1]:]))
+    return chunks
+
+
+def make_document(rng: random.Random, sections: int) -> str:
+    """Build a markdown document resembling a scraped page."""
+    def sentence() -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))).capitalize() + "."
+
+    parts = [f"# {sentence()}"]
+    for _ in range(sections):
+        parts.append(f"## {sentence()}")
+        for _ in range(rng.randint(1, 6)):
+            parts.append(" ".join(sentence() for _ in range(rng.randint(2, 12))))
+        if rng.random() < 0.3:
+            rows = ["| Metric | Value | Change |", "| --- | --- | --- |"]
+            rows += [f"| {rng.choice(WORDS)} | {rng.randint(1, 10_000)} | {rng.uniform(-50, 50):.1f}% |" for _ in range(rng.randint(3, 40))]
+            parts.append("\n".join(rows))
+        if rng.random() < 0.15:
+            code = [f"{rng.choice(WORDS)}_{i} = {rng.randint(0, 99)}" for i in range(rng.randint(3, 20))]
+            parts.append("```python\n" + "\n".join(code) + "\n```")
+    return "\n\n".join(parts)
+
+
+def run(name: str, chunk: Callable[[str], Iterable[str]], documents: List[str], counter: TokenCounter, repeat: int) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunks = [c for document in documents for c in chunk(document)]
+    elapsed = time.perf_counter() - start
+
+    chunk_tokens = [counter.count(c) for c in chunks]
+    document_tokens = sum(counter.count(document) for document in documents)
+    total_tokens = sum(chunk_tokens)
+
+    print(
+        f"{name:<22} chunks={len(chunks):>6}  chunks/s={len(chunks) * repeat / elapsed:>10.0f}  "
+        f"tokens_embedded={total_tokens:>9}  overhead={total_tokens / max(document_tokens, 1) - 1:>6.1%}  "
+        f"max_tokens={max(chunk_tokens, default=0):>5}  over_limit={sum(t > EMBEDDING_MODEL_MAX_TOKENS for t in chunk_tokens)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Markdown files to chunk (default: synthetic corpus)")
+    parser.add_argument("--documents", type=int, default=40, help="Synthetic documents to generate")
+    parser.add_argument("--sections", type=int, default=12, help="Sections per synthetic document")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--model", default="text-embedding-3-small")
+    args = parser.parse_args()
+
+    if args.files:
+        documents = [Path(path).read_text(encoding="utf-8") for path in args.files]
+    else:
+        rng = random.Random(42)
+        documents = [make_document(rng, args.sections) for _ in range(args.documents)]
+
+    counter = TokenCounter(args.model)
+    counter.count("warm up")
+
+    print(f"{len(documents)} documents, {sum(counter.count(d) for d in documents)} tokens\n")
+    run("legacy word window", lambda text: legacy_chunk_text(text, args.chunk_size, args.chunk_overlap), documents, counter, args.repeat)
+    run("WordWindowChunker", WordWindowChunker(args.chunk_size, args.chunk_overlap).chunk, documents, counter, args.repeat)
+    run("MarkdownChunker", MarkdownChunker(args.chunk_size, args.chunk_overlap, counter).chunk, documents, counter, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+End-to-end benchmark of ingestion throughput and search latency.
+
+Ingests synthetic markdown documents through the full vector store path
+(chunking, embedding, storage) and then times searches, including query
+embedding. The deterministic hashing embedding provider is used by default so
+the benchmark runs without network access; pass --provider local to measure a
+sentence-transformers model instead. The local memory-mapped backend always
+runs; pass --qdrant-url to also benchmark a Qdrant server (a temporary
+collection is created and dropped).
+
+Usage (from the backend directory):
+    python -m benchmarks.ingestion
+    python -m benchmarks.ingestion --documents 200 --provider local --qdrant-url http://localhost:6333
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from typing import List
+
+from benchmarks.chunking import WORDS, make_document
+from services.embedding_provider import EmbeddingProvider, HashingEmbeddingProvider, SentenceTransformerEmbeddingProvider
+from services.local_vector_store import LocalVectorStore
+from services.qdrant_service import QdrantSourceStore
+from services.vector_store import BaseVectorStore
+
+NOTEBOOK_ID = "benchmark-notebook"
+
+
+async def run(name: str, store: BaseVectorStore, documents: List[str], queries: List[str], limit: int) -> None:
+    await store.initialize()
+    sources = [
+        {"content": document, "metadata": {"url": f"https://example.com/{i}"}}
+        for i, document in enumerate(documents)
+    ]
+
+    start = time.perf_counter()
+    await store.add_sources(NOTEBOOK_ID, sources)
+    ingest_seconds = time.perf_counter() - start
+    chunks = len(await store.get_point_index(NOTEBOOK_ID))
+
+    # Warm up so the first timed search does not pay for loading the notebook
+    await store.search(queries[0], NOTEBOOK_ID, limit)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await store.search(query, NOTEBOOK_ID, limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{name:<8} chunks={chunks:>6}  ingest={ingest_seconds:>7.2f}s  chunks/s={chunks / ingest_seconds:>8.0f}  "
+        f"search p50={statistics.median(latencies):>7.2f}ms  p95={p95:>7.2f}ms"
+    )
+
+
+def make_provider(args: argparse.Namespace) -> EmbeddingProvider:
+    if args.provider == "local":
+        return SentenceTransformerEmbeddingProvider(model=args.local_model)
+    return HashingEmbeddingProvider(dimension=args.dimension)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50, help="Synthetic documents to ingest")
+    parser.add_argument("--sections", type=int, default=12, help="Sections per synthetic document")
+    parser.add_argument("--queries", type=int, default=100, help="Timed searches")
+    parser.add_argument("--limit", type=int, default=5, help="Results per search")
+    parser.add_argument("--provider", choices=["hashing", "local"], default="hashing", help="Embedding provider")
+    parser.add_argument("--dimension", type=int, default=384, help="Hashing embedding dimension")
+    parser.add_argument("--local-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--qdrant-url", help="Also benchmark this Qdrant server")
+    parser.add_argument("--qdrant-api-key")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    documents = [make_document(rng, args.sections) for _ in range(args.documents)]
+    queries = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 10))) for _ in range(args.queries)]
+    provider = make_provider(args)
+    print(f"{len(documents)} documents, {len(queries)} queries, top {args.limit}, embeddings from {provider.model}\n")
+
+    with tempfile.TemporaryDirectory() as path:
+        local = LocalVectorStore(path=path, embedding_provider=provider, upsert_batch_size=1024)
+        await run("local", local, documents, queries, args.limit)
+
+    if args.qdrant_url:
+        qdrant = QdrantSourceStore(
+            qdrant_url=args.qdrant_url,
+            qdrant_api_key=args.qdrant_api_key,
+            collection_name=f"benchmark_{uuid.uuid4().hex[:8]}",
+            hybrid=True,
+            embedding_provider=provider,
+        )
+        try:
+            await run("qdrant", qdrant, documents, queries, args.limit)
+        finally:
+            await qdrant.qdrant_client.delete_collection(qdrant.collection_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
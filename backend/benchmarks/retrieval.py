@@ -0,0 +1,108 @@
+"""
+Micro-benchmark of vector search latency per backend.
+
+Fills a notebook with random unit vectors and times nearest neighbour
+searches against it, without calling the embeddings API. The local
+memory-mapped backend always runs; pass --qdrant-url to compare with a Qdrant
+server (a temporary collection is created and dropped).
+
+Usage (from the backend directory):
+    python -m benchmarks.retrieval
+    python -m benchmarks.retrieval --chunks 20000 --qdrant-url http://localhost:6333
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import uuid
+from typing import List
+
+import numpy as np
+from qdrant_client.http.models import Distance, VectorParams
+
+from services.embedding_provider import HashingEmbeddingProvider
+from services.local_vector_store import LocalVectorStore
+from services.qdrant_service import QdrantSourceStore
+from services.vector_store import BaseVectorStore, Point
+
+NOTEBOOK_ID = "benchmark-notebook"
+
+
+def make_points(rng: np.random.Generator, chunks: int, dimension: int) -> List[Point]:
+    vectors = rng.standard_normal((chunks, dimension), dtype=np.float32)
+    return [
+        (str(uuid.uuid4()), vector.tolist(), {
+            "content_chunk": f"chunk {i}",
+            "chunk_index": i,
+            "total_chunks": chunks,
+            "notebook_id": NOTEBOOK_ID,
+        })
+        for i, vector in enumerate(vectors)
+    ]
+
+
+async def run(name: str, store: BaseVectorStore, points: List[Point], queries: np.ndarray, limit: int) -> None:
+    start = time.perf_counter()
+    await store._upsert_points(points)
+    load_seconds = time.perf_counter() - start
+
+    # Warm up so the first timed search does not pay for loading the notebook
+    await store._search_by_vector(queries[0].tolist(), NOTEBOOK_ID, limit)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await store._search_by_vector(query.tolist(), NOTEBOOK_ID, limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{name:<8} load={load_seconds:>7.2f}s  p50={statistics.median(latencies):>7.2f}ms  "
+        f"p95={p95:>7.2f}ms  qps={len(latencies) / (sum(latencies) / 1000):>8.0f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000, help="Chunks in the notebook")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Timed searches")
+    parser.add_argument("--limit", type=int, default=5, help="Results per search")
+    parser.add_argument("--qdrant-url", help="Also benchmark this Qdrant server")
+    parser.add_argument("--qdrant-api-key")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    points = make_points(rng, args.chunks, args.dimension)
+    queries = rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+    print(f"{args.chunks} chunks of dimension {args.dimension}, {args.queries} queries, top {args.limit}\n")
+
+    with tempfile.TemporaryDirectory() as path:
+        local = LocalVectorStore(path=path, embedding_provider=HashingEmbeddingProvider(args.dimension), upsert_batch_size=1024)
+        await local.initialize()
+        await run("local", local, points, queries, args.limit)
+
+    if args.qdrant_url:
+        qdrant = QdrantSourceStore(
+            qdrant_url=args.qdrant_url,
+            qdrant_api_key=args.qdrant_api_key,
+            collection_name=f"benchmark_{uuid.uuid4().hex[:8]}",
+            embedding_provider=HashingEmbeddingProvider(args.dimension),
+        )
+        await qdrant.qdrant_client.create_collection(
+            collection_name=qdrant.collection_name,
+            vectors_config=VectorParams(size=args.dimension, distance=Distance.COSINE),
+        )
+        await qdrant._ensure_payload_indexes()
+        qdrant._initialized = True
+        try:
+            await run("qdrant", qdrant, points, queries, args.limit)
+        finally:
+            await qdrant.qdrant_client.delete_collection(qdrant.collection_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -14,11 +14,83 @@ class Settings(BaseSettings):
     # Storage settings
     STORAGE_TYPE: str = os.getenv("STORAGE_TYPE", "local")  # 'local' or 'r2'
     STORAGE_BASE_PATH: str = os.getenv("STORAGE_BASE_PATH", "uploads")
+    TASK_RESULT_OFFLOAD_BYTES: int = int(os.getenv("TASK_RESULT_OFFLOAD_BYTES", "16384"))  # Larger result fields go to storage, 0 = keep inline
     
+    # Vector store settings
+    VECTOR_STORE_TYPE: str = os.getenv("VECTOR_STORE_TYPE", "qdrant")  # 'qdrant' or 'local'
+    LOCAL_VECTOR_STORE_PATH: str = os.getenv("LOCAL_VECTOR_STORE_PATH", "data/vectors")
+    LOCAL_VECTOR_STORE_MAX_OPEN_NOTEBOOKS: int = int(os.getenv("LOCAL_VECTOR_STORE_MAX_OPEN_NOTEBOOKS", "64"))  # Notebooks kept loaded in memory
+
     # Qdrant settings
     QDRANT_API_URL: str = os.getenv("QDRANT_API_URL", "http://localhost:6333")
     QDRANT_API_KEY: Optional[str] = os.getenv("QDRANT_API_KEY")
-    
+    QDRANT_UPSERT_BATCH_SIZE: int = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+    QDRANT_SCROLL_PAGE_SIZE: int = int(os.getenv("QDRANT_SCROLL_PAGE_SIZE", "256"))
+    QDRANT_COLLECTION_NAME: str = os.getenv("QDRANT_COLLECTION_NAME", "notebook_sources")  # Collection or alias
+    QDRANT_VECTORS_ON_DISK: bool = os.getenv("QDRANT_VECTORS_ON_DISK", "true").lower() == "true"
+    QDRANT_QUANTIZATION: str = os.getenv("QDRANT_QUANTIZATION", "int8")  # 'int8' or 'none'
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = float(os.getenv("QDRANT_QUANTIZATION_OVERSAMPLING", "2.0"))
+    QDRANT_HNSW_M: int = int(os.getenv("QDRANT_HNSW_M", "16"))
+    QDRANT_HNSW_EF_CONSTRUCT: int = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+    QDRANT_HNSW_EF: int = int(os.getenv("QDRANT_HNSW_EF", "128"))  # Search-time beam width
+    SEARCH_HYBRID: bool = os.getenv("SEARCH_HYBRID", "true").lower() == "true"  # Dense + BM25 sparse vectors fused with RRF (Qdrant)
+    HYBRID_PREFETCH_LIMIT: int = int(os.getenv("HYBRID_PREFETCH_LIMIT", "20"))  # Candidates per ranking before fusion
+
+    # Search result selection settings
+    SEARCH_DIVERSIFY: bool = os.getenv("SEARCH_DIVERSIFY", "true").lower() == "true"  # Maximal marginal relevance re-ranking
+    SEARCH_MMR_LAMBDA: float = float(os.getenv("SEARCH_MMR_LAMBDA", "0.7"))  # 1 = relevance only, 0 = diversity only
+    SEARCH_MMR_FETCH_MULTIPLIER: int = int(os.getenv("SEARCH_MMR_FETCH_MULTIPLIER", "4"))  # Candidates fetched per result
+    SEARCH_DUPLICATE_THRESHOLD: float = float(os.getenv("SEARCH_DUPLICATE_THRESHOLD", "0.95"))  # Cosine similarity collapsed as duplicates
+
+    # Embedding settings
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "openai")  # 'openai', 'local' (sentence-transformers) or 'hashing' (offline stand-in)
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")  # OpenAI model
+    LOCAL_EMBEDDING_MODEL: str = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    LOCAL_EMBEDDING_DEVICE: Optional[str] = os.getenv("LOCAL_EMBEDDING_DEVICE")  # e.g. 'cpu' or 'cuda'
+    HASHING_EMBEDDING_DIMENSION: int = int(os.getenv("HASHING_EMBEDDING_DIMENSION", "384"))
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))  # Max inputs per embeddings request
+    EMBEDDING_BATCH_MAX_TOKENS: int = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))  # Max tokens per embeddings request
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+    SOURCE_EMBEDDING_MAX_ATTEMPTS: int = int(os.getenv("SOURCE_EMBEDDING_MAX_ATTEMPTS", "3"))  # Passes over the sources that failed before the task fails
+    EMBEDDING_REQUESTS_PER_MINUTE: int = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "3000"))  # Per process, 0 = unlimited (OpenAI)
+    EMBEDDING_TOKENS_PER_MINUTE: int = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))  # Per process, 0 = unlimited (OpenAI)
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))  # Concurrent embeddings requests, lowered on 429s
+    CHUNKER: str = os.getenv("CHUNKER", "markdown")  # 'markdown' (token and structure aware) or 'words'
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "512"))  # Tokens per chunk ('words' chunker: words)
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "50"))
+    INGESTION_CONCURRENCY: int = int(os.getenv("INGESTION_CONCURRENCY", "4"))  # Sources embedded in parallel per notebook
+    CHUNK_TEXT_COMPRESSION: str = os.getenv("CHUNK_TEXT_COMPRESSION", "none")  # 'zstd' or 'none', for chunk text stored in the vector store
+
+    # Embedding cache settings
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_SIZE_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_SIZE_MB", "512"))
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", "1024"))  # 0 disables the cache
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+
+    # Task queue settings
+    RUN_EMBEDDED_WORKER: bool = os.getenv("RUN_EMBEDDED_WORKER", "true").lower() == "true"  # Run queued tasks in the API process too
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "4"))  # Tasks run at once per worker
+    WORKER_POLL_INTERVAL_SECONDS: float = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "2"))
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))  # A task of a crashed worker is retried after this
+    JOB_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_DELAY_SECONDS: int = int(os.getenv("JOB_RETRY_DELAY_SECONDS", "30"))
+    MAX_RUNNING_TASKS: int = int(os.getenv("MAX_RUNNING_TASKS", "8"))  # Across all workers, 0 = unlimited
+    MAX_RUNNING_RESEARCH_TASKS: int = int(os.getenv("MAX_RUNNING_RESEARCH_TASKS", "2"))  # Each runs crews and an MCP server, 0 = unlimited
+    MAX_RUNNING_AUDIO_OVERVIEW_TASKS: int = int(os.getenv("MAX_RUNNING_AUDIO_OVERVIEW_TASKS", "2"))  # 0 = unlimited
+    MAX_RUNNING_MINDMAP_TASKS: int = int(os.getenv("MAX_RUNNING_MINDMAP_TASKS", "4"))  # 0 = unlimited
+    MAX_QUEUED_TASKS: int = int(os.getenv("MAX_QUEUED_TASKS", "50"))  # Submissions beyond this get 429, 0 = unlimited
+    TASK_EVENTS_KEEPALIVE_SECONDS: float = float(os.getenv("TASK_EVENTS_KEEPALIVE_SECONDS", "15"))  # Idle event streams re-check the task status this often
+    TASK_MAX_ATTEMPTS: int = int(os.getenv("TASK_MAX_ATTEMPTS", "2"))  # Attempts within one job run, before the job queue retries
+    TASK_RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("TASK_RETRY_BASE_DELAY_SECONDS", "5"))  # Doubles per attempt, with jitter
+    RESEARCH_TASK_TIMEOUT_SECONDS: int = int(os.getenv("RESEARCH_TASK_TIMEOUT_SECONDS", "3600"))
+    AUDIO_OVERVIEW_TASK_TIMEOUT_SECONDS: int = int(os.getenv("AUDIO_OVERVIEW_TASK_TIMEOUT_SECONDS", "1800"))
+    MINDMAP_TASK_TIMEOUT_SECONDS: int = int(os.getenv("MINDMAP_TASK_TIMEOUT_SECONDS", "600"))
+
+    # Chat settings
+    CHAT_QUERY_REWRITE: str = os.getenv("CHAT_QUERY_REWRITE", "auto")  # 'auto' (follow-up questions only), 'always' or 'never'
+
     # Cloudflare R2 settings
     CLOUDFLARE_ACCOUNT_ID: Optional[str] = os.getenv("CLOUDFLARE_ACCOUNT_ID")
     CLOUDFLARE_R2_ACCESS_KEY_ID: Optional[str] = os.getenv("CLOUDFLARE_R2_ACCESS_KEY_ID")
@@ -130,6 +130,11 @@ TASK_CONFIGS = {
 
         Your task is to transform the given research findings into a compelling, engaging, and informative long-form blog post.
 
+        Research Analysis:
+        ```
+        {research_notes}
+        ```
+
         Follow these steps meticulously:
 
         1. **Content Structure**
@@ -172,6 +177,11 @@ TASK_CONFIGS = {
 
         Your task is to create an informative FAQ section that addresses key questions readers may have about {topic}.
 
+        Research Analysis:
+        ```
+        {research_notes}
+        ```
+
         Follow these steps meticulously:
 
         1. **Question Requirements**
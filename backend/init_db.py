@@ -1,8 +1,13 @@
 """
 Database initialization script to create all tables defined in SQLAlchemy models.
+
+create_all only creates missing tables, so columns added to a model after its
+table was created are added with the idempotent statements in COLUMN_UPGRADES.
+Running the script again after upgrading brings an existing database up to date.
 """
 
 import asyncio
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 import os
 from loguru import logger
@@ -10,6 +15,11 @@ from loguru import logger
 from models.db import Base
 from services.db_service import DATABASE_URL
 
+# Columns added to existing tables, applied after create_all
+COLUMN_UPGRADES = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS stage_timings JSON",
+]
+
 async def create_tables():
     """Create all tables defined in SQLAlchemy models."""
     logger.info("Creating database tables...")
@@ -21,6 +31,8 @@ async def create_tables():
         # Create all tables
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            for statement in COLUMN_UPGRADES:
+                await conn.execute(text(statement))
         
         logger.info("Database tables created successfully")
     except Exception as e:
@@ -0,0 +1,246 @@
+"""
+Rebuild the Qdrant sources collection with the current collection settings.
+
+The collection is copied into a new versioned collection created from the
+QDRANT_* settings (on-disk vectors, quantization, HNSW parameters, hybrid
+dense + BM25 sparse vectors). Sparse vectors are computed from the stored
+chunk text while copying, so nothing is embedded again. Points
+written while the copy runs are picked up by catch-up passes, then the
+collection name is switched over to the new collection with an alias, so the
+application keeps reading and writing through the same name throughout.
+
+When the name is still a plain collection rather than an alias, the old
+collection has to be dropped right before the alias is created, so writes
+made after the last copy pass would be lost. The first migration therefore
+refuses to start while research tasks (the only writers) are queued or
+running in the task queue, and gives up, dropping the new collection, if one
+started while it copied. Searches in the sub-second gap between dropping the
+collection and creating the alias fail, and writes are retried by the store.
+Later migrations swap the alias atomically and run alongside research tasks.
+
+Catch-up passes compare payloads only: a point whose vector was replaced
+with an unchanged payload (e.g. re-embedded by a new model) is not copied
+again. Do not run a migration while switching embedding providers.
+
+Restart the API after a migration that changes the vector layout (enabling
+or disabling SEARCH_HYBRID), since the layout is detected on startup.
+
+Usage (from the backend directory):
+    python migrate_vector_collection.py            # migrate and drop the old collection
+    python migrate_vector_collection.py --keep-old # keep the old versioned collection
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from qdrant_client.http import models as rest
+from sqlalchemy import func, or_, select
+
+from config.settings import settings
+from models.db import TaskJob
+from services.db_service import close_db_pool, get_db_session
+from services.job_queue import ACTIVE_STATUSES
+from services.qdrant_service import QdrantSourceStore
+from services.task_service import TaskManager
+from services.vector_store_factory import VectorStoreFactory, VectorStoreType
+
+class IngestionActiveError(Exception):
+    """Error raised when research tasks could write to a collection that is about to be dropped."""
+
+async def resolve_alias(store: QdrantSourceStore) -> Optional[str]:
+    """Get the collection the store's name points to, or None if it is not an alias."""
+    aliases_response = await store.qdrant_client.get_aliases()
+    for alias in aliases_response.aliases:
+        if alias.alias_name == store.collection_name:
+            return alias.collection_name
+    return None
+
+async def database_time() -> datetime:
+    """Get the database clock, which the task queue timestamps jobs with."""
+    async with get_db_session() as session:
+        return (await session.execute(select(func.localtimestamp()))).scalar_one()
+
+async def count_research_jobs(started_since: Optional[datetime] = None) -> int:
+    """Count research jobs, which write to the collection, that may have written to it.
+
+    Args:
+        started_since: Count running jobs and jobs started since this time
+            (default: count queued and running jobs)
+
+    Returns:
+        Number of matching jobs
+    """
+    if started_since is None:
+        condition = TaskJob.status.in_(ACTIVE_STATUSES)
+    else:
+        condition = or_(TaskJob.status == "running", TaskJob.started_at >= started_since)
+    async with get_db_session() as session:
+        return (await session.execute(
+            select(func.count())
+            .select_from(TaskJob)
+            .where(TaskJob.task_type == TaskManager.RESEARCH, condition)
+        )).scalar_one()
+
+def dense_vector(store: QdrantSourceStore, vector: Any) -> Any:
+    """Get the dense embedding of a point from either vector layout."""
+    if isinstance(vector, dict):
+        return vector[store.DENSE_VECTOR]
+    return vector
+
+async def copy_points(
+    store: QdrantSourceStore,
+    source: str,
+    target: str,
+    copied: Optional[Dict[Any, Dict[str, Any]]] = None,
+) -> Dict[Any, Dict[str, Any]]:
+    """Copy points that are missing or have a different payload in the target collection.
+
+    Only payloads are compared (``copied.get(point.id) != point.payload``), so
+    a point whose vector changed while its payload stayed the same is not
+    detected by a catch-up pass.
+
+    Args:
+        store: Store whose client and batch settings are used
+        source: Collection to copy from
+        target: Collection to copy to
+        copied: Payloads already copied by a previous pass, by point ID
+
+    Returns:
+        Payloads of all points present in the source, by point ID
+    """
+    copied = copied or {}
+    seen: Dict[Any, Dict[str, Any]] = {}
+    offset = None
+    while True:
+        points, offset = await store.qdrant_client.scroll(
+            collection_name=source,
+            limit=store.upsert_batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        batch = [
+            rest.PointStruct(
+                id=point.id,
+                vector=store._point_vector(dense_vector(store, point.vector), point.payload, hybrid=store.hybrid),
+                # Re-encode so the chunk text follows CHUNK_TEXT_COMPRESSION
+                payload=store._encode_payload(store._decode_payload(point.payload)),
+            )
+            for point in points
+            if copied.get(point.id) != point.payload
+        ]
+        if batch:
+            await store._with_retries(
+                lambda batch=batch: store.qdrant_client.upsert(collection_name=target, points=batch),
+                f"Copy of {len(batch)} points to {target}",
+            )
+        seen.update((point.id, point.payload) for point in points)
+        if offset is None:
+            break
+
+    # Points deleted from the source since the previous pass
+    deleted = [point_id for point_id in copied if point_id not in seen]
+    if deleted:
+        await store.qdrant_client.delete(
+            collection_name=target,
+            points_selector=rest.PointIdsList(points=deleted),
+        )
+
+    logger.info(f"Copied {len(seen)} points from {source} to {target} ({len(deleted)} deleted since last pass)")
+    return seen
+
+async def migrate(keep_old: bool = False, catch_up_passes: int = 2) -> None:
+    """Rebuild the sources collection into a new versioned collection and switch the alias to it.
+
+    Args:
+        keep_old: Keep the previous collection instead of deleting it
+        catch_up_passes: Copy passes after the initial copy to pick up concurrent writes
+
+    Raises:
+        IngestionActiveError: The name is a plain collection and research tasks
+            were queued or running before or during the copy
+    """
+    store = VectorStoreFactory.get_vector_store(VectorStoreType.QDRANT)
+    name = store.collection_name
+
+    aliased = await resolve_alias(store)
+    source = aliased or name
+    if not await store.qdrant_client.collection_exists(source):
+        logger.info(f"Collection {name} does not exist yet, nothing to migrate")
+        return
+
+    started_at = None
+    if not aliased:
+        # The original collection will be dropped, so nothing may write to it meanwhile
+        started_at = await database_time()
+        active = await count_research_jobs()
+        if active:
+            raise IngestionActiveError(
+                f"{active} research tasks are queued or running; migrate {name} once they finish"
+            )
+
+    source_info = await store.qdrant_client.get_collection(source)
+    vector_size = dense_vector(store, source_info.config.params.vectors).size
+    target = f"{name}_v{int(time.time())}"
+
+    logger.info(f"Migrating {source} to {target}")
+    await store.create_collection(target, vector_size)
+    await store._ensure_payload_indexes(target)
+
+    copied = await copy_points(store, source, target)
+    for _ in range(catch_up_passes):
+        copied = await copy_points(store, source, target, copied)
+
+    if aliased:
+        # Swap the alias atomically
+        await store.qdrant_client.update_collection_aliases(change_aliases_operations=[
+            rest.DeleteAliasOperation(delete_alias=rest.DeleteAlias(alias_name=name)),
+            rest.CreateAliasOperation(create_alias=rest.CreateAlias(collection_name=target, alias_name=name)),
+        ])
+        # Writes that reached the old collection after the last pass, before the swap
+        await copy_points(store, source, target, copied)
+        if not keep_old:
+            await store.qdrant_client.delete_collection(source)
+    else:
+        # An alias cannot share its name with a collection, so the original goes first
+        await copy_points(store, source, target, copied)
+        started = await count_research_jobs(started_since=started_at)
+        if started:
+            # Their writes since the last pass would be lost with the original collection
+            await store.qdrant_client.delete_collection(target)
+            raise IngestionActiveError(
+                f"{started} research tasks ran during the migration; {name} was left unchanged, "
+                "migrate it once they finish"
+            )
+        await store.qdrant_client.delete_collection(source)
+        await store.qdrant_client.update_collection_aliases(change_aliases_operations=[
+            rest.CreateAliasOperation(create_alias=rest.CreateAlias(collection_name=target, alias_name=name)),
+        ])
+
+    logger.info(f"{name} now points to {target}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-old", action="store_true", help="Keep the previous versioned collection")
+    parser.add_argument("--catch-up-passes", type=int, default=2, help="Copy passes after the initial copy")
+    args = parser.parse_args()
+
+    if settings.VECTOR_STORE_TYPE != VectorStoreType.QDRANT:
+        logger.warning(f"VECTOR_STORE_TYPE is {settings.VECTOR_STORE_TYPE}, migrating the Qdrant collection anyway")
+
+    async def main() -> None:
+        try:
+            await migrate(keep_old=args.keep_old, catch_up_passes=args.catch_up_passes)
+        finally:
+            await close_db_pool()
+
+    try:
+        asyncio.run(main())
+    except IngestionActiveError as e:
+        logger.error(str(e))
+        sys.exit(1)
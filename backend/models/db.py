@@ -7,7 +7,7 @@ from datetime import datetime
 import uuid
 from enum import Enum
 
-from sqlalchemy import String, Text, Column, ForeignKey, JSON, DateTime, func, Enum as SQLEnum, Index
+from sqlalchemy import String, Text, Column, ForeignKey, JSON, DateTime, Integer, func, text, Enum as SQLEnum, Index
 from sqlalchemy.orm import declarative_base, relationship, mapped_column, Mapped
 
 # Base class for SQLAlchemy models
@@ -40,6 +40,8 @@ class Task(Base):
     failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Durations of the task's stages, one entry per stage and attempt
+    stage_timings: Mapped[Optional[List[Dict[str, Any]]]] = mapped_column(JSON, nullable=True)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert the model to a dictionary."""
@@ -53,7 +55,100 @@ class Task(Base):
             "completed_at": self.completed_at,
             "failed_at": self.failed_at,
             "result": self.result,
-            "error": self.error
+            "error": self.error,
+            "stage_timings": self.stage_timings
+        }
+
+class TaskJob(Base):
+    """Queue entry for a task, claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED.
+
+    A claimed job is leased to one worker until ``lease_expires_at``; the worker
+    renews the lease with heartbeats, so jobs of crashed workers expire and are
+    claimed again.
+
+    ``dedupe_key`` hashes the task type, notebook and input; at most one queued
+    or running job has a given key, so duplicate submissions share a task.
+    ``idempotency_key`` holds the (scoped) key sent by the client, if any.
+    """
+    __tablename__ = "task_jobs"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    task_id: Mapped[str] = mapped_column(String(36), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, unique=True)
+    task_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(String(50), nullable=False, default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    available_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=func.now())
+    locked_by: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    dedupe_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('ix_task_jobs_status_available_at', status, available_at),
+        Index('ix_task_jobs_task_type_status', task_type, status),
+        Index(
+            'ux_task_jobs_active_dedupe_key', dedupe_key, unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the model to a dictionary."""
+        return {
+            "id": self.id,
+            "task_id": self.task_id,
+            "task_type": self.task_type,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "available_at": self.available_at,
+            "locked_by": self.locked_by,
+            "lease_expires_at": self.lease_expires_at,
+            "heartbeat_at": self.heartbeat_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_error": self.last_error,
+            "dedupe_key": self.dedupe_key,
+            "idempotency_key": self.idempotency_key,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+class TaskCheckpoint(Base):
+    """Output of a completed stage of a task, so a retried task resumes after it.
+
+    Stages producing one output per item (such as scraped pages, keyed by URL)
+    store one row per item under ``key``; other stages use an empty key.
+    """
+    __tablename__ = "task_checkpoints"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    task_id: Mapped[str] = mapped_column(String(36), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    stage: Mapped[str] = mapped_column(String(50), nullable=False)
+    key: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    data: Mapped[Any] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=func.now())
+
+    __table_args__ = (
+        Index('ux_task_checkpoints_task_id_stage_key', task_id, stage, key, unique=True),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the model to a dictionary."""
+        return {
+            "id": self.id,
+            "task_id": self.task_id,
+            "stage": self.stage,
+            "key": self.key,
+            "data": self.data,
+            "created_at": self.created_at,
         }
 
 class Notebook(Base):
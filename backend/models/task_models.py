@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any, Literal
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 class ResearchSource(BaseModel):
@@ -18,18 +18,22 @@ class TaskResponse(BaseModel):
     notebook_id: str
     status: str
     message: str
+    queue_position: Optional[int] = Field(None, description="Position among queued tasks of the same type.")
+    estimated_wait_seconds: Optional[float] = Field(None, description="Estimated time until the task starts.")
 
 class TaskStatusResponse(BaseModel):
+    # Fields other than task_id are only set when selected with ``fields=``
     task_id: str
-    notebook_id: str
-    topic: Optional[str]
-    sources: Optional[List[ResearchSource]]
-    status: str
-    created_at: datetime
+    notebook_id: Optional[str] = None
+    topic: Optional[str] = None
+    sources: Optional[List[ResearchSource]] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
     result: Optional[Any] = None
     error: Optional[str] = None
     completed_at: Optional[datetime] = None
     failed_at: Optional[datetime] = None
+    stage_timings: Optional[List[Dict[str, Any]]] = None
 
 class TaskListItem(BaseModel):
     task_id: str
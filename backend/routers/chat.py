@@ -3,7 +3,7 @@ from loguru import logger
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
-from services import qdrant_service
+from services import vector_store
 from models.chat_models import ChatMessageInput
 from agents.chat_agent import run_chat_agent
 
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
 from datetime import datetime
+from typing import AsyncIterator, Optional
 
 from services import task_manager
+from services.task_service import TaskQueueFullError
 from services.notebook_repository import notebook_repository
+from services.task_events import TERMINAL_STATUSES, format_sse, task_events
+from config.settings import settings
 from models.task_models import (
     ResearchRequest,
     TaskResponse,
@@ -12,14 +18,23 @@ from models.task_models import (
 
 router = APIRouter(prefix="/research", tags=["research"])
 
+def queue_full_error(e: TaskQueueFullError) -> HTTPException:
+    """Build the 429 response for a submission rejected by admission control."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 @router.post(
     "/",
     response_model=TaskResponse,
     status_code=status.HTTP_202_ACCEPTED,
     summary="Submit a new research task",
-    description="Submits a topic for research. The task runs in the background."
+    description="Submits a topic for research. The task runs in the background. "
+                "Submitting the same research while it is queued or running, or repeating an Idempotency-Key, returns the existing task."
 )
-async def submit_research_task(request: ResearchRequest):
+async def submit_research_task(request: ResearchRequest, idempotency_key: Optional[str] = Header(None, max_length=255)):
     try:
         logger.info(f"Received research request: {request.dict()}")
         logger.info(f"Submitting research task for notebook: {request.notebook_id}" +
@@ -41,15 +56,25 @@ async def submit_research_task(request: ResearchRequest):
             task_id = await task_manager.submit_task_async(
                 notebook_id=request.notebook_id,
                 topic=request.topic,
-                sources=request.sources
+                sources=request.sources,
+                idempotency_key=idempotency_key
             )
             logger.debug(f"Research task submitted with ID: {task_id}")
 
+            queue_info = await task_manager.get_queue_info(task_id, task_manager.RESEARCH)
             return TaskResponse(
                 task_id=task_id,
                 notebook_id=request.notebook_id,
                 status="IN_QUEUE",
-                message="Research task submitted and will be processed."
+                message="Research task submitted and will be processed.",
+                **queue_info
+            )
+        except TaskQueueFullError as e:
+            raise queue_full_error(e)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
             )
         except Exception as e:
             logger.error(f"Error in task_manager.submit_task_async: {str(e)}")
@@ -71,14 +96,25 @@ async def submit_research_task(request: ResearchRequest):
 @router.get(
     "/{task_id}",
     response_model=TaskStatusResponse,
+    response_model_exclude_unset=True,
     summary="Get research task status by ID",
-    description="Retrieves the status and result (if available) of a specific research task."
+    description="Retrieves the status and result (if available) of a specific research task. "
+                "Poll with `fields=status` (or e.g. `fields=status,error,result.title`) to skip loading the result."
 )
-async def get_task_details(task_id: str):
+async def get_task_details(
+    task_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; `result.<name>` selects fields of the result.")
+):
     logger.debug(f"Getting details for task ID: {task_id}")
 
     # Use the async version to avoid event loop conflicts
-    task_info = await task_manager.get_task_status_async(task_id)
+    try:
+        task_info = await task_manager.get_task_status_async(task_id, fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
     if not task_info:
         logger.warning(f"Task not found: {task_id}")
@@ -88,6 +124,92 @@ async def get_task_details(task_id: str):
         )
     return TaskStatusResponse(**task_info, task_id=task_id)
 
+async def task_event_stream(task_id: str, request: Request) -> AsyncIterator[str]:
+    """Stream a task's events until it finishes or the client disconnects."""
+    # Subscribe before reading the status, so no event falls in between
+    async with task_events.subscribe(task_id) as events:
+        task_info = await task_manager.get_task_status_async(task_id, fields="status,error")
+        if task_info is None:
+            return
+        yield format_sse({"task_id": task_id, "type": "status", "data": task_info})
+        if task_info["status"] in TERMINAL_STATUSES:
+            return
+
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=settings.TASK_EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                # Events of other processes are lost while a listener reconnects, so don't miss the end
+                task_info = await task_manager.get_task_status_async(task_id, fields="status,error")
+                if task_info is None:
+                    return
+                if task_info["status"] in TERMINAL_STATUSES:
+                    yield format_sse({"task_id": task_id, "type": "status", "data": task_info})
+                    return
+                yield ": keepalive\n\n"
+                continue
+
+            yield format_sse(event)
+            if event["type"] == "status" and event["data"].get("status") in TERMINAL_STATUSES:
+                return
+
+@router.get(
+    "/{task_id}/events",
+    response_class=StreamingResponse,
+    summary="Stream research task events",
+    description="Streams the task's status changes, stage transitions and progress counters "
+                "(links found, pages scraped, chunks embedded) as server-sent events, "
+                "starting with its current status and ending with its final status."
+)
+async def stream_task_events(task_id: str, request: Request):
+    task_info = await task_manager.get_task_status_async(task_id, fields="status")
+    if not task_info:
+        logger.warning(f"Task not found: {task_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found."
+        )
+
+    return StreamingResponse(
+        task_event_stream(task_id, request),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.delete(
+    "/{task_id}",
+    response_model=TaskResponse,
+    summary="Cancel a research task",
+    description="Cancels a queued or running task. Running work (crews, MCP servers and HTTP requests) is stopped within seconds."
+)
+async def cancel_task(task_id: str):
+    logger.info(f"Cancelling task: {task_id}")
+
+    cancelled = await task_manager.cancel_task(task_id)
+
+    if cancelled is None:
+        logger.warning(f"Task not found: {task_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found."
+        )
+    if not cancelled:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Task has already finished."
+        )
+
+    task_info = await task_manager.get_task_status_async(task_id, fields="notebook_id")
+    return TaskResponse(
+        task_id=task_id,
+        notebook_id=task_info["notebook_id"],
+        status="cancelled",
+        message="Task cancelled."
+    )
+
 @router.post(
     "/audio-overview/{notebook_id}",
     response_model=TaskResponse,
@@ -95,7 +217,7 @@ async def get_task_details(task_id: str):
     summary="Generate audio overview from notebook summary",
     description="Creates an audio overview using the summary from a completed notebook research. The task runs in the background."
 )
-async def generate_audio_overview(notebook_id: str):
+async def generate_audio_overview(notebook_id: str, idempotency_key: Optional[str] = Header(None, max_length=255)):
     """Generate an audio overview from a notebook's research summary."""
     logger.info(f"Generating audio overview for notebook: {notebook_id}")
 
@@ -110,15 +232,19 @@ async def generate_audio_overview(notebook_id: str):
 
     try:
         # Submit audio overview task
-        task_id = await task_manager.submit_audio_overview_task_async(notebook_id)
+        task_id = await task_manager.submit_audio_overview_task_async(notebook_id, idempotency_key=idempotency_key)
         logger.info(f"Audio overview task submitted for notebook: {notebook_id}")
 
+        queue_info = await task_manager.get_queue_info(task_id, task_manager.AUDIO_OVERVIEW)
         return TaskResponse(
             task_id=task_id,
             notebook_id=notebook_id,
             status="IN_QUEUE",
-            message="Audio overview task submitted and will be processed."
+            message="Audio overview task submitted and will be processed.",
+            **queue_info
         )
+    except TaskQueueFullError as e:
+        raise queue_full_error(e)
     except Exception as e:
         logger.error(f"Error submitting audio overview task for notebook {notebook_id}: {e}")
         raise HTTPException(
@@ -133,7 +259,7 @@ async def generate_audio_overview(notebook_id: str):
     summary="Generate mindmap from notebook research",
     description="Creates a mindmap structure from the research content in a completed notebook. The task runs in the background."
 )
-async def generate_mindmap(notebook_id: str):
+async def generate_mindmap(notebook_id: str, idempotency_key: Optional[str] = Header(None, max_length=255)):
     """Generate a mindmap from a notebook's research content."""
     logger.info(f"Generating mindmap for notebook: {notebook_id}")
 
@@ -148,15 +274,19 @@ async def generate_mindmap(notebook_id: str):
 
     try:
         # Submit mindmap task
-        task_id = await task_manager.submit_mindmap_task_async(notebook_id)
+        task_id = await task_manager.submit_mindmap_task_async(notebook_id, idempotency_key=idempotency_key)
         logger.info(f"Mindmap task submitted for notebook: {notebook_id}")
 
+        queue_info = await task_manager.get_queue_info(task_id, task_manager.MINDMAP)
         return TaskResponse(
             task_id=task_id,
             notebook_id=notebook_id,
             status="IN_QUEUE",
-            message="Mindmap task submitted and will be processed."
+            message="Mindmap task submitted and will be processed.",
+            **queue_info
         )
+    except TaskQueueFullError as e:
+        raise queue_full_error(e)
     except Exception as e:
         logger.error(f"Error submitting mindmap task for notebook {notebook_id}: {e}")
         raise HTTPException(
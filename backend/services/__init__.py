@@ -14,7 +14,8 @@ from .db_service import (
     execute_query
 )
 from .task_repository import task_repository
-from .qdrant_service import qdrant_service
+from .checkpoint_repository import checkpoint_repository
+from .vector_store_factory import vector_store
 from .audio_overview_service import audio_overview_service
 from .tts_service import tts_service
 from .storage_factory import storage as storage_service
@@ -23,6 +24,7 @@ from .notebook_repository import notebook_repository
 __all__ = [
     'task_manager',
     'task_repository',
+    'checkpoint_repository',
     'ResearchRequest',
     'TaskResponse',
     'TaskStatusResponse',
@@ -33,8 +35,8 @@ __all__ = [
     'close_db_pool',
     'get_db_session',
     'execute_query',
-    # Qdrant service
-    'qdrant_service',
+    # Vector store
+    'vector_store',
     # Audio overview service
     'audio_overview_service',
     'tts_service',
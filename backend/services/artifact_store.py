@@ -0,0 +1,159 @@
+# backend/services/artifact_store.py
+"""
+Storage of large task results outside the tasks table.
+
+Research results hold the blog post and the full markdown of every scraped
+page, which made ``tasks.result`` rows megabytes large and every status poll
+read and serialize all of it. Top-level result fields larger than
+TASK_RESULT_OFFLOAD_BYTES are instead gzipped and saved through the storage
+backend, and the row keeps a manifest: the small fields inline, plus an
+``_artifacts`` entry describing each offloaded field::
+
+    {
+        "title": "...",
+        "faq": [...],
+        "_artifacts": {
+            "scraped_data": {"key": "tasks/<task_id>/scraped_data.json.gz", "size": 1843211, ...}
+        }
+    }
+
+Readers pass the manifest to ``load``, which fetches only the fields asked for.
+If the manifest is not saved after all (the task was cancelled meanwhile or the
+write failed), ``delete`` removes the fields it offloaded.
+"""
+
+import asyncio
+import gzip
+import json
+from typing import Any, Dict, Iterable, Optional
+
+from loguru import logger
+
+from config.settings import settings
+from .storage_factory import storage
+
+# Key of the offloaded fields in a result manifest
+ARTIFACTS_KEY = "_artifacts"
+
+
+class ArtifactStore:
+    """Offloads large fields of task results to the storage backend."""
+
+    def __init__(self, storage_service: Any, min_bytes: int):
+        """
+        Initialize the artifact store.
+
+        Args:
+            storage_service: Storage backend with put_object, get_object and delete_object
+            min_bytes: Fields whose JSON is at least this large are offloaded (0 disables offloading)
+        """
+        self.storage = storage_service
+        self.min_bytes = min_bytes
+
+    @staticmethod
+    def _key(task_id: str, field: str) -> str:
+        return f"tasks/{task_id}/{field}.json.gz"
+
+    @staticmethod
+    def is_manifest(result: Any) -> bool:
+        """Whether a stored result has offloaded fields."""
+        return isinstance(result, dict) and ARTIFACTS_KEY in result
+
+    async def offload(self, task_id: str, result: Any) -> Any:
+        """Store the large fields of a result and return its manifest.
+
+        A field that cannot be stored is kept inline, so a storage outage
+        costs row size rather than the result.
+
+        Args:
+            task_id: The task the result belongs to
+            result: The task result
+
+        Returns:
+            The manifest to save in ``tasks.result``, or the result itself if nothing was offloaded
+        """
+        if self.min_bytes <= 0 or not isinstance(result, dict) or ARTIFACTS_KEY in result:
+            return result
+
+        manifest: Dict[str, Any] = {}
+        artifacts: Dict[str, Dict[str, Any]] = {}
+        for field, value in result.items():
+            data = json.dumps(value, default=str).encode("utf-8")
+            if len(data) < self.min_bytes:
+                manifest[field] = value
+                continue
+
+            key = self._key(task_id, field)
+            try:
+                compressed = await asyncio.to_thread(gzip.compress, data, 6)
+                await self.storage.put_object(key, compressed, content_type="application/gzip")
+            except Exception as e:
+                logger.warning(f"Could not offload field {field} of task {task_id}, keeping it inline: {e}")
+                manifest[field] = value
+                continue
+
+            artifacts[field] = {
+                "key": key,
+                "encoding": "gzip",
+                "size": len(data),
+                "compressed_size": len(compressed),
+            }
+
+        if not artifacts:
+            return result
+
+        manifest[ARTIFACTS_KEY] = artifacts
+        logger.info(
+            f"Offloaded {', '.join(artifacts)} of task {task_id} "
+            f"({sum(a['size'] for a in artifacts.values())} bytes, "
+            f"{sum(a['compressed_size'] for a in artifacts.values())} compressed)"
+        )
+        return manifest
+
+    async def _load_field(self, artifact: Dict[str, Any]) -> Any:
+        data = await self.storage.get_object(artifact["key"])
+        return json.loads(await asyncio.to_thread(gzip.decompress, data))
+
+    async def load(self, result: Any, fields: Optional[Iterable[str]] = None) -> Any:
+        """Rebuild a result from its manifest.
+
+        Args:
+            result: The result or manifest stored in ``tasks.result``
+            fields: Top-level fields to return (default: all of them)
+
+        Returns:
+            The result, restricted to ``fields`` if given
+        """
+        if not isinstance(result, dict):
+            return result
+
+        artifacts = result.get(ARTIFACTS_KEY, {}) if self.is_manifest(result) else {}
+        names = [name for name in result if name != ARTIFACTS_KEY] + list(artifacts)
+        if fields is not None:
+            wanted = set(fields)
+            names = [name for name in names if name in wanted]
+
+        inline = {name: result[name] for name in names if name not in artifacts}
+        offloaded = [name for name in names if name in artifacts]
+        values = await asyncio.gather(*[self._load_field(artifacts[name]) for name in offloaded])
+        return {**inline, **dict(zip(offloaded, values))}
+
+    async def delete(self, result: Any) -> None:
+        """Delete the offloaded fields of a manifest from storage, e.g. when it was not saved.
+
+        Args:
+            result: The manifest returned by ``offload`` (anything else is ignored)
+        """
+        if not self.is_manifest(result):
+            return
+        keys = [artifact["key"] for artifact in result[ARTIFACTS_KEY].values()]
+        deleted = await asyncio.gather(*[self.storage.delete_object(key) for key in keys], return_exceptions=True)
+        failed = [key for key, outcome in zip(keys, deleted) if isinstance(outcome, BaseException)]
+        if failed:
+            logger.warning(f"Could not delete offloaded task result fields: {', '.join(failed)}")
+        else:
+            logger.info(f"Deleted offloaded task result fields: {', '.join(keys)}")
+
+
+# Singleton instance
+artifact_store = ArtifactStore(storage, settings.TASK_RESULT_OFFLOAD_BYTES)
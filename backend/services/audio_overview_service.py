@@ -11,6 +11,7 @@ from agents.audio_overview_agent import run_audio_overview_agent
 from .tts_service import tts_service
 from .storage_factory import storage
 from .notebook_repository import notebook_repository
+from .task_executor import task_stage
 
 class AudioOverviewService:
     """Service for generating complete audio overviews from notebook content."""
@@ -30,19 +31,22 @@ class AudioOverviewService:
         try:
             # Step 1: Generate transcript using the audio overview agent
             logger.info(f"Generating transcript for notebook: {notebook_id}")
-            transcript = await run_audio_overview_agent(notebook_id)
+            async with task_stage("transcript"):
+                transcript = await run_audio_overview_agent(notebook_id)
 
             # Step 2: Generate TTS audio from transcript
             logger.info(f"Generating TTS audio for notebook: {notebook_id}")
-            audio_content = await tts_service.generate_audio_from_transcript(
-                transcript, notebook_id
-            )
+            async with task_stage("tts"):
+                audio_content = await tts_service.generate_audio_from_transcript(
+                    transcript, notebook_id
+                )
 
             # Step 3: Upload audio file to storage
             logger.info(f"Uploading audio file for notebook: {notebook_id}")
-            audio_url = await storage.upload_audio_file(
-                audio_content, notebook_id
-            )
+            async with task_stage("upload"):
+                audio_url = await storage.upload_audio_file(
+                    audio_content, notebook_id
+                )
 
             # Step 4: Update database with audio URL
             logger.info(f"Updating database with audio URL {audio_url} for notebook: {notebook_id}")
@@ -59,7 +63,7 @@ class AudioOverviewService:
         except Exception as e:
             error_msg = f"Failed to generate complete audio overview for notebook {notebook_id}: {str(e)}"
             logger.error(error_msg)
-            raise Exception(error_msg)
+            raise Exception(error_msg) from e
 
 # Singleton instance
 audio_overview_service = AudioOverviewService()
\ No newline at end of file
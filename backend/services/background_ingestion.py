@@ -0,0 +1,91 @@
+# backend/services/background_ingestion.py
+"""
+Background embedding of a notebook's sources while a task is still running.
+
+Research agents hand over each scraped page or converted file as soon as it
+is available, so embedding overlaps with the research and writing crews
+instead of starting after them. Nothing is deleted here: once the task has
+its final set of sources, TaskManager._embed_sources syncs the notebook,
+finds the chunks embedded in the background already stored, and only embeds
+what is left (such as the blog post) before removing stale points.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional, Set
+
+from loguru import logger
+
+from .vector_store import BaseVectorStore
+from .task_executor import task_progress
+
+class BackgroundIngestion:
+    """Embeds sources in background tasks as they are added.
+
+    Use as an async context manager; leaving the context early (on error or
+    cancellation) cancels the ingestion still in flight.
+    """
+
+    def __init__(self, notebook_id: str, vector_store: BaseVectorStore):
+        """
+        Initialize the ingestion.
+
+        Args:
+            notebook_id: The notebook the sources belong to
+            vector_store: Store to embed the sources into
+        """
+        self.notebook_id = notebook_id
+        self.vector_store = vector_store
+        self.added = 0
+        self.failed = 0
+        self.chunks = 0
+        self._existing: Optional[Dict[str, Dict[str, Any]]] = None
+        self._existing_lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "BackgroundIngestion":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pending = list(self._tasks)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """Start embedding a source in the background.
+
+        Args:
+            item: The source, as for BaseVectorStore.add_sources
+        """
+        task = asyncio.create_task(self._ingest(item))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _get_existing(self) -> Dict[str, Dict[str, Any]]:
+        """Get the notebook's stored points, fetched once for all sources."""
+        async with self._existing_lock:
+            if self._existing is None:
+                self._existing = await self.vector_store.get_point_index(self.notebook_id)
+        return self._existing
+
+    async def _ingest(self, item: Dict[str, Any]) -> None:
+        try:
+            existing = await self._get_existing()
+            [result] = await self.vector_store.add_sources(self.notebook_id, [item], existing=existing)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        if result["success"]:
+            self.added += 1
+            self.chunks += len(result["chunk_ids"])
+            task_progress(sources_embedded=self.added, chunks_embedded=self.chunks)
+        else:
+            # The final sync embeds the source again
+            self.failed += 1
+            logger.warning(f"Background embedding of a source for notebook {self.notebook_id} failed: {result['error']}")
+
+    async def wait(self) -> None:
+        """Wait until every source added so far is embedded (or failed)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        logger.info(f"Embedded {self.added} sources in the background for notebook {self.notebook_id} ({self.failed} failed)")
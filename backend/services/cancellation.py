@@ -0,0 +1,58 @@
+"""
+Cooperative cancellation of running tasks.
+
+Cancelling a task's asyncio task stops its coroutines and aborts the aiohttp,
+httpx and OpenAI requests they await, and ``with MCPServerAdapter(...)``
+blocks exit, stopping the MCP server subprocess. CrewAI crews however run in
+threads (``kickoff_async`` uses ``asyncio.to_thread``), which asyncio cannot
+interrupt. Each task therefore runs in a cancellation scope holding an event,
+and crews get ``check_cancelled`` as their step callback so their threads stop
+at the next agent step once the event is set. Scopes nest: code is cancelled
+when the event of any enclosing scope is set, so a timed out stage can stop
+its own threads without cancelling the whole task.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Tuple
+
+# Events of the enclosing scopes; context variables are copied into the threads started by asyncio.to_thread
+_cancel_events: ContextVar[Tuple[threading.Event, ...]] = ContextVar("task_cancel_events", default=())
+
+
+class TaskCancelledError(BaseException):
+    """Raised in a crew thread once its task (or stage) was cancelled.
+
+    Like asyncio.CancelledError it is not an Exception, so the retry and
+    error handling of CrewAI agents and tasks does not swallow it.
+    """
+
+
+@contextmanager
+def cancellation_scope(cancel_event: threading.Event) -> Iterator[threading.Event]:
+    """Run the enclosed code (and the threads it starts) under a cancel event.
+
+    Args:
+        cancel_event: Event set when the enclosed code is cancelled
+    """
+    token = _cancel_events.set(_cancel_events.get() + (cancel_event,))
+    try:
+        yield cancel_event
+    finally:
+        _cancel_events.reset(token)
+
+
+def is_cancelled() -> bool:
+    """Whether the code running was cancelled, by any enclosing scope."""
+    return any(cancel_event.is_set() for cancel_event in _cancel_events.get())
+
+
+def check_cancelled(*_args: Any, **_kwargs: Any) -> None:
+    """Raise TaskCancelledError if the current task was cancelled.
+
+    Accepts and ignores any arguments so it can be used as a CrewAI
+    ``step_callback``.
+    """
+    if is_cancelled():
+        raise TaskCancelledError("Task was cancelled")
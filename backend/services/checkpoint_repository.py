@@ -0,0 +1,114 @@
+"""
+Repository module for task stage checkpoints.
+
+Long tasks save the output of each completed stage (see models.db.TaskCheckpoint).
+When the task is run again, after a failed attempt or when a worker died and
+another worker claimed its job, stages with a checkpoint are skipped.
+"""
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from loguru import logger
+
+from models.db import TaskCheckpoint
+from .db_service import get_db_session
+
+class CheckpointRepository:
+    """Repository for task checkpoint database operations."""
+
+    @staticmethod
+    async def save_checkpoint(task_id: str, stage: str, data: Any, key: str = "") -> None:
+        """Save (or replace) the output of a task stage.
+
+        Args:
+            task_id: The ID of the task
+            stage: Name of the stage
+            data: JSON serializable stage output
+            key: Item the output belongs to, for stages with one output per item
+        """
+        async with get_db_session() as session:
+            stmt = insert(TaskCheckpoint).values(task_id=task_id, stage=stage, key=key, data=data)
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[TaskCheckpoint.task_id, TaskCheckpoint.stage, TaskCheckpoint.key],
+                set_={"data": stmt.excluded.data, "created_at": stmt.excluded.created_at},
+            ))
+            await session.commit()
+
+    @staticmethod
+    async def get_checkpoints(task_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get all checkpoints of a task.
+
+        Args:
+            task_id: The ID of the task
+
+        Returns:
+            Stage outputs by stage name, then by key
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(TaskCheckpoint.stage, TaskCheckpoint.key, TaskCheckpoint.data)
+                .where(TaskCheckpoint.task_id == task_id)
+            )
+            checkpoints: Dict[str, Dict[str, Any]] = {}
+            for stage, key, data in result.all():
+                checkpoints.setdefault(stage, {})[key] = data
+            return checkpoints
+
+    @staticmethod
+    async def delete_checkpoints(task_id: str) -> int:
+        """Delete all checkpoints of a task, e.g. once it completed.
+
+        Args:
+            task_id: The ID of the task
+
+        Returns:
+            int: Number of deleted checkpoints
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                delete(TaskCheckpoint).where(TaskCheckpoint.task_id == task_id)
+            )
+            await session.commit()
+            return result.rowcount
+
+
+class TaskCheckpoints:
+    """Checkpoints of one task, loaded once and saved as stages complete."""
+
+    def __init__(self, task_id: str, checkpoints: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Initialize the checkpoints.
+
+        Args:
+            task_id: The ID of the task
+            checkpoints: Checkpoints already saved, as returned by get_checkpoints
+        """
+        self.task_id = task_id
+        self.checkpoints = checkpoints or {}
+
+    @classmethod
+    async def load(cls, task_id: str) -> "TaskCheckpoints":
+        """Load the saved checkpoints of a task."""
+        checkpoints = await checkpoint_repository.get_checkpoints(task_id)
+        if checkpoints:
+            logger.info(f"Resuming task {task_id} from checkpoints: {', '.join(checkpoints)}")
+        return cls(task_id, checkpoints)
+
+    def get(self, stage: str, key: str = "") -> Optional[Any]:
+        """Get the saved output of a stage (or of one of its items), or None."""
+        return self.checkpoints.get(stage, {}).get(key)
+
+    def get_all(self, stage: str) -> Dict[str, Any]:
+        """Get the saved outputs of all items of a stage, by key."""
+        return dict(self.checkpoints.get(stage, {}))
+
+    async def save(self, stage: str, data: Any, key: str = "") -> None:
+        """Save the output of a stage (or of one of its items)."""
+        await checkpoint_repository.save_checkpoint(self.task_id, stage, data, key)
+        self.checkpoints.setdefault(stage, {})[key] = data
+
+
+# Singleton instance
+checkpoint_repository = CheckpointRepository()
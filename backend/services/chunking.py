@@ -0,0 +1,313 @@
+# backend/services/chunking.py
+"""
+Text chunking for embedding.
+
+Chunkers turn a source document into chunks sized for the embedding model.
+MarkdownChunker counts real tokens with the model's tokenizer and prefers to
+break at markdown headings, then paragraphs, then sentences, keeping tables
+and code blocks intact where they fit. WordWindowChunker is the plain
+fixed-size word window splitter. Both yield chunks lazily.
+"""
+
+import io
+import re
+from typing import Iterator, List, Optional, Protocol, Tuple
+
+import tiktoken
+from loguru import logger
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=\S)")
+
+
+class Chunker(Protocol):
+    """Interface for text chunkers."""
+
+    def chunk(self, text: str) -> Iterator[str]:
+        """Yield the chunks of a text in order."""
+        ...
+
+
+class TokenCounter:
+    """Counts tokens with the tokenizer of an OpenAI model."""
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        self.model = model
+        self._encoding = None
+
+    def _load(self):
+        """Load the tokenizer lazily.
+
+        Falls back to a ~4 characters per token estimate when the tokenizer
+        files cannot be loaded (e.g. no network access to fetch them).
+        """
+        if self._encoding is None:
+            try:
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer for {self.model}, estimating token counts: {e}")
+                self._encoding = False
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        """Count the tokens in a text."""
+        encoding = self._load()
+        if encoding is False:
+            return len(text) // 4 + 1
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def split(self, text: str, max_tokens: int) -> Iterator[str]:
+        """Split a text into pieces of at most ``max_tokens`` tokens."""
+        encoding = self._load()
+        if encoding is False:
+            step = max_tokens * 4
+            for start in range(0, len(text), step):
+                yield text[start:start + step]
+            return
+
+        tokens = encoding.encode(text, disallowed_special=())
+        for start in range(0, len(tokens), max_tokens):
+            yield encoding.decode(tokens[start:start + max_tokens])
+
+
+class WordWindowChunker:
+    """Splits text into fixed-size windows of whitespace separated words."""
+
+    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 50):
+        """
+        Args:
+            chunk_size: Number of words per chunk
+            chunk_overlap: Number of words shared by consecutive chunks
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def chunk(self, text: str) -> Iterator[str]:
+        window: List[str] = []
+        new_words = 0
+        for line in io.StringIO(text):
+            for word in line.split():
+                window.append(word)
+                new_words += 1
+                if len(window) == self.chunk_size:
+                    yield " ".join(window)
+                    window = window[self.chunk_size - self.chunk_overlap:]
+                    new_words = 0
+
+        # Only emit the tail if it contains words not already in the last chunk
+        if new_words:
+            yield " ".join(window)
+
+
+class MarkdownChunker:
+    """Token-aware chunker that respects markdown structure."""
+
+    def __init__(
+        self,
+        max_tokens: int = 512,
+        overlap_tokens: int = 50,
+        token_counter: Optional[TokenCounter] = None,
+        min_heading_split_tokens: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_tokens: Maximum tokens per chunk
+            overlap_tokens: Maximum tokens of trailing context repeated at the start of the next chunk
+            token_counter: Token counter for the embedding model
+            min_heading_split_tokens: Start a new chunk at a heading once the current chunk
+                has at least this many tokens (default: a quarter of ``max_tokens``)
+        """
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.token_counter = token_counter or TokenCounter()
+        self.min_heading_split_tokens = (
+            min_heading_split_tokens if min_heading_split_tokens is not None else max_tokens // 4
+        )
+
+    def chunk(self, text: str) -> Iterator[str]:
+        # A chunk is built from units of (text, tokens, separator before the unit)
+        units: List[Tuple[str, int, str]] = []
+        tokens = 0
+        new_units = 0
+        heading = None
+
+        def add(piece: str, separator: str) -> Iterator[str]:
+            nonlocal units, tokens, new_units
+            # Count the separator joining units as one token
+            piece_tokens = self.token_counter.count(piece) + 1
+            if units and tokens + piece_tokens > self.max_tokens:
+                if new_units:
+                    yield self._join(units)
+                units = self._overlap(units, self.max_tokens - piece_tokens)
+                tokens = sum(unit[1] for unit in units)
+                new_units = 0
+            units.append((piece, piece_tokens, separator))
+            tokens += piece_tokens
+            new_units += 1
+
+        for kind, block in self._iter_blocks(text):
+            if kind == "heading":
+                if new_units and tokens >= self.min_heading_split_tokens:
+                    yield self._join(units)
+                    # Do not carry context across a section boundary
+                    units, tokens, new_units = [], 0, 0
+                heading = block if heading is None else f"{heading}\n\n{block}"
+                continue
+
+            # Leave room for a pending heading, so the block splits where the heading fits with its first piece
+            budget = self.max_tokens
+            if heading is not None:
+                heading_tokens = self.token_counter.count(heading) + 1
+                if heading_tokens < self.max_tokens // 2:
+                    budget -= heading_tokens
+
+            for index, piece in enumerate(self._split_block(kind, block, budget)):
+                separator = " " if index and kind == "paragraph" else "\n\n"
+                # Keep a heading together with the first piece of its section when it fits
+                if heading is not None:
+                    with_heading = f"{heading}\n\n{piece}"
+                    if self.token_counter.count(with_heading) < self.max_tokens:
+                        piece = with_heading
+                    else:
+                        yield from add(heading, "\n\n")
+                    heading = None
+                yield from add(piece, separator)
+
+        if heading is not None:
+            yield from add(heading, "\n\n")
+
+        # The final chunk is only emitted if it adds units beyond the carried overlap
+        if new_units:
+            yield self._join(units)
+
+    @staticmethod
+    def _join(units: List[Tuple[str, int, str]]) -> str:
+        parts = [units[0][0]]
+        for text, _, separator in units[1:]:
+            parts.append(separator)
+            parts.append(text)
+        return "".join(parts)
+
+    def _overlap(self, units: List[Tuple[str, int, str]], budget: int) -> List[Tuple[str, int, str]]:
+        """Get the trailing units to repeat at the start of the next chunk."""
+        budget = min(self.overlap_tokens, budget)
+        carried: List[Tuple[str, int, str]] = []
+        total = 0
+        for unit in reversed(units):
+            if total + unit[1] > budget:
+                break
+            carried.insert(0, unit)
+            total += unit[1]
+        return carried
+
+    def _iter_blocks(self, text: str) -> Iterator[Tuple[str, str]]:
+        """Yield (kind, text) blocks: heading, paragraph, table or code."""
+        lines: List[str] = []
+        kind = None
+        in_code = False
+
+        def flush():
+            block = "\n".join(lines).strip()
+            return (kind, block) if block else None
+
+        for line in io.StringIO(text):
+            line = line.rstrip("\n")
+            stripped = line.strip()
+
+            if in_code:
+                lines.append(line)
+                if stripped.startswith("```") or stripped.startswith("~~~"):
+                    in_code = False
+                    block = flush()
+                    if block:
+                        yield block
+                    lines, kind = [], None
+                continue
+
+            if stripped.startswith("```") or stripped.startswith("~~~"):
+                block = flush()
+                if block:
+                    yield block
+                lines, kind, in_code = [line], "code", True
+            elif stripped.startswith("#"):
+                block = flush()
+                if block:
+                    yield block
+                yield "heading", stripped
+                lines, kind = [], None
+            elif stripped.startswith("|"):
+                if kind != "table":
+                    block = flush()
+                    if block:
+                        yield block
+                    lines, kind = [], "table"
+                lines.append(line)
+            elif not stripped:
+                block = flush()
+                if block:
+                    yield block
+                lines, kind = [], None
+            else:
+                if kind == "table":
+                    block = flush()
+                    if block:
+                        yield block
+                    lines = []
+                kind = "paragraph"
+                lines.append(line)
+
+        block = flush()
+        if block:
+            yield block
+
+    def _split_block(self, kind: str, block: str, max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Split a block that does not fit in ``max_tokens`` (default: a chunk) into smaller pieces."""
+        max_tokens = max_tokens or self.max_tokens
+        if self.token_counter.count(block) < max_tokens:
+            yield block
+            return
+
+        if kind in ("table", "code"):
+            # Split on line boundaries, repeating a table's header rows in every piece
+            rows = block.split("\n")
+            header = rows[:2] if kind == "table" and len(rows) > 2 else []
+            header_tokens = self.token_counter.count("\n".join(header)) if header else 0
+            if header_tokens >= max_tokens // 2:
+                header, header_tokens = [], 0
+            yield from self._pack(rows[len(header):], max_tokens - 1 - header_tokens, header)
+        else:
+            # Sentences become separate units so chunks break between them
+            for sentence in _SENTENCE_BOUNDARY.split(block):
+                if self.token_counter.count(sentence) < max_tokens:
+                    yield sentence
+                else:
+                    yield from self.token_counter.split(sentence, max_tokens - 1)
+
+    def _pack(self, rows: List[str], budget: int, header: List[str]) -> Iterator[str]:
+        """Greedily pack lines into pieces that fit ``budget`` tokens, each prefixed by ``header``."""
+        current: List[str] = []
+        tokens = 0
+        for row in rows:
+            # Count the newline joining rows as one token
+            row_tokens = self.token_counter.count(row) + 1
+            if row_tokens > budget:
+                if current:
+                    yield "\n".join(header + current)
+                    current, tokens = [], 0
+                # A single row that is still too long is split on token boundaries
+                for piece in self.token_counter.split(row, budget):
+                    yield "\n".join(header + [piece])
+                continue
+            if current and tokens + row_tokens > budget:
+                yield "\n".join(header + current)
+                current, tokens = [], 0
+            current.append(row)
+            tokens += row_tokens
+        if current:
+            yield "\n".join(header + current)
@@ -0,0 +1,294 @@
+# backend/services/embedding_cache.py
+"""
+Caches for text embeddings.
+
+EmbeddingCache is a persistent, content-addressed cache: embeddings are stored
+in a local SQLite database keyed by the embedding model and the SHA-256 of the
+embedded text, so identical chunks are only ever sent to the embeddings API
+once. It is capped in size and evicts the least recently used entries first.
+The API and worker processes share the database file, so the total size is
+kept in the database itself, updated by triggers in the same transaction as
+the inserts and deletes, and read by writers after taking the write lock.
+
+QueryEmbeddingCache is a small in-process LRU cache with a TTL for search
+query embeddings.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+class EmbeddingCache:
+    """On-disk LRU cache of embeddings keyed by (model, sha256 of text)."""
+
+    def __init__(self, path: str = "cache/embeddings.sqlite3", max_size_mb: int = 512):
+        """
+        Initialize the embedding cache. The database is opened lazily on first use.
+
+        Args:
+            path: Path of the SQLite database file
+            max_size_mb: Maximum total size of stored vectors before LRU eviction
+        """
+        self.path = Path(path)
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Build the cache key for a text embedded with a given model."""
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Get cache statistics."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "size_bytes": self._size_bytes,
+            "max_size_bytes": self.max_size_bytes,
+        }
+
+    async def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            Mapping of text to embedding for the texts found in the cache
+        """
+        if not texts:
+            return {}
+        return await asyncio.to_thread(self._get_many, model, texts)
+
+    async def set_many(self, model: str, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Store embeddings, evicting least recently used entries if over the size cap.
+
+        Args:
+            model: Embedding model name
+            embeddings: Mapping of text to embedding
+        """
+        if not embeddings:
+            return
+        await asyncio.to_thread(self._set_many, model, embeddings)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and create the schema if needed."""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+            # Size row and its triggers are created together, under the write lock,
+            # so inserts by other processes are counted exactly once
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO cache_size (id, bytes) SELECT 0, COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            )
+            connection.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS embeddings_size_insert AFTER INSERT ON embeddings
+                BEGIN
+                    UPDATE cache_size SET bytes = bytes + LENGTH(NEW.vector) WHERE id = 0;
+                END
+                """
+            )
+            connection.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS embeddings_size_delete AFTER DELETE ON embeddings
+                BEGIN
+                    UPDATE cache_size SET bytes = bytes - LENGTH(OLD.vector) WHERE id = 0;
+                END
+                """
+            )
+            self._size_bytes = self._read_size(connection)
+            connection.commit()
+            self._connection = connection
+            logger.info(f"Embedding cache opened at {self.path} ({self._size_bytes} bytes)")
+        return self._connection
+
+    @staticmethod
+    def _read_size(connection: sqlite3.Connection) -> int:
+        """Total size of the stored vectors, across all processes sharing the database."""
+        return connection.execute("SELECT bytes FROM cache_size WHERE id = 0").fetchone()[0]
+
+    def _get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        keys = {self.make_key(model, text): text for text in texts}
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            connection = self._connect()
+            key_list = list(keys)
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(key_list), 500):
+                batch = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[keys[key]] = vector.tolist()
+
+                hit_keys = [key for key, _ in rows]
+                if hit_keys:
+                    connection.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [time.time(), *hit_keys],
+                    )
+            connection.commit()
+
+        unique_texts = len(set(texts))
+        self.hits += len(found)
+        self.misses += unique_texts - len(found)
+        return found
+
+    def _set_many(self, model: str, embeddings: Dict[str, List[float]]) -> None:
+        now = time.time()
+        rows = [
+            (self.make_key(model, text), array("f", embedding).tobytes(), now)
+            for text, embedding in embeddings.items()
+        ]
+
+        with self._lock:
+            connection = self._connect()
+            # Take the write lock first, so the size read below includes every other process's writes
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._size_bytes = self._read_size(connection)
+                if self._size_bytes > self.max_size_bytes:
+                    self._evict(connection)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the cache is under 90% of its cap."""
+        target = int(self.max_size_bytes * 0.9)
+        evicted = 0
+        while self._size_bytes > target:
+            rows = connection.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used ASC LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+
+            batch = []
+            excess = self._size_bytes - target
+            for key, size in rows:
+                batch.append(key)
+                excess -= size
+                if excess <= 0:
+                    break
+
+            connection.execute(
+                f"DELETE FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            evicted += len(batch)
+            self._size_bytes = self._read_size(connection)
+
+        logger.info(f"Evicted {evicted} entries from embedding cache ({self._size_bytes} bytes remaining)")
+
+
+class QueryEmbeddingCache:
+    """Bounded in-memory LRU cache of query embeddings with a TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        """
+        Initialize the query embedding cache.
+
+        Args:
+            max_entries: Maximum number of cached queries
+            ttl_seconds: How long a cached embedding stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize query text so trivially different queries share an entry."""
+        return " ".join(query.casefold().split())
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Get cache statistics."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        """Get the cached embedding for a query, or None if missing or expired."""
+        key = (model, self.normalize(query))
+        entry = self._entries.get(key)
+
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, model: str, query: str, embedding: List[float]) -> None:
+        """Cache the embedding for a query, evicting the least recently used entry if full."""
+        key = (model, self.normalize(query))
+        self._entries[key] = (time.monotonic(), embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,187 @@
+# backend/services/embedding_provider.py
+"""
+Embedding providers used by the vector stores.
+
+EmbeddingProvider is the interface BaseVectorStore embeds texts through:
+
+- OpenAIEmbeddingProvider calls the OpenAI embeddings API (the default).
+- SentenceTransformerEmbeddingProvider runs a sentence-transformers model on
+  the local CPU/GPU. It needs the optional ``sentence-transformers`` package,
+  which is not installed by default as it pulls in PyTorch.
+- HashingEmbeddingProvider hashes words into a fixed-size vector. It needs no
+  model or network and is deterministic, for tests, benchmarks and offline
+  development. Texts sharing words get similar vectors, but it has no notion
+  of meaning.
+
+Vectors from different providers (or models) live in different spaces, so a
+collection can only be searched with the provider it was filled with; switch
+providers together with QDRANT_COLLECTION_NAME or LOCAL_VECTOR_STORE_PATH.
+"""
+
+import asyncio
+import re
+import zlib
+from typing import List, Optional, Protocol
+
+import numpy as np
+from loguru import logger
+from openai import AsyncOpenAI
+
+# Embedding dimensions of known models, so setup does not spend an embeddings call to learn them
+EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingProvider(Protocol):
+    """Interface for turning texts into embedding vectors."""
+
+    # Name identifying the vector space, used to key embedding caches
+    model: str
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, returning one vector per text in the same order."""
+        ...
+
+    async def get_dimension(self) -> int:
+        """Get the length of the vectors returned by embed."""
+        ...
+
+
+class EmbeddingProviderType:
+    OPENAI = "openai"
+    LOCAL = "local"
+    HASHING = "hashing"
+
+
+class OpenAIEmbeddingProvider:
+    """Embeddings from the OpenAI embeddings API."""
+
+    def __init__(self, model: str = "text-embedding-3-small", api_key: Optional[str] = None):
+        """
+        Initialize the OpenAI client.
+
+        Args:
+            model: OpenAI embedding model name
+            api_key: OpenAI API key
+        """
+        self.model = model
+        logger.info("Initializing OpenAI client")
+        # Retries are left to the vector store's rate limiter, which has to see every 429
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with a single list-input request."""
+        response = await self.client.embeddings.create(input=texts, model=self.model)
+        embeddings: List[List[float]] = [[] for _ in texts]
+        for item in response.data:
+            embeddings[item.index] = item.embedding
+        return embeddings
+
+    async def get_dimension(self) -> int:
+        """Get the model's dimension, requesting a test embedding for unknown models."""
+        if self.model in EMBEDDING_DIMENSIONS:
+            return EMBEDDING_DIMENSIONS[self.model]
+
+        logger.info(f"Unknown embedding dimension for {self.model}, requesting a test embedding")
+        embeddings = await self.embed(["Test"])
+        return len(embeddings[0])
+
+
+class SentenceTransformerEmbeddingProvider:
+    """Embeddings from a sentence-transformers model run in-process."""
+
+    def __init__(
+        self,
+        model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        device: Optional[str] = None,
+        batch_size: int = 32,
+    ):
+        """
+        Initialize the provider. The model is loaded lazily on first use.
+
+        Args:
+            model: sentence-transformers model name or local path
+            device: Torch device such as 'cpu' or 'cuda' (default: picked by sentence-transformers)
+            batch_size: Texts encoded per forward pass
+        """
+        self.model = model
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+        self._load_lock = asyncio.Lock()
+
+    async def _load(self):
+        """Load the model once, off the event loop."""
+        if self._model is None:
+            async with self._load_lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError as e:
+                        raise ImportError(
+                            "EMBEDDING_PROVIDER=local requires the sentence-transformers package "
+                            "(uv pip install sentence-transformers)"
+                        ) from e
+                    logger.info(f"Loading local embedding model {self.model}")
+                    self._model = await asyncio.to_thread(SentenceTransformer, self.model, device=self.device)
+        return self._model
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts on a worker thread so the event loop stays responsive."""
+        model = await self._load()
+        embeddings = await asyncio.to_thread(
+            model.encode,
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return embeddings.tolist()
+
+    async def get_dimension(self) -> int:
+        """Get the model's output dimension."""
+        model = await self._load()
+        return model.get_sentence_embedding_dimension()
+
+
+class HashingEmbeddingProvider:
+    """Deterministic bag-of-words embeddings built by feature hashing.
+
+    Each lowercased word is hashed to a dimension and a sign, and the counts
+    are L2 normalized, so cosine similarity reflects word overlap.
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = 384):
+        """
+        Initialize the provider.
+
+        Args:
+            dimension: Length of the produced vectors
+        """
+        self.dimension = dimension
+        self.model = f"hashing-{dimension}"
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in self.TOKEN_PATTERN.findall(text.lower()):
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            # Empty texts still get a valid, non-zero vector
+            vector[0] = 1.0
+            return vector
+        return vector / norm
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts locally; no I/O, so it runs inline."""
+        return [self._embed_one(text).tolist() for text in texts]
+
+    async def get_dimension(self) -> int:
+        """Get the configured dimension."""
+        return self.dimension
@@ -0,0 +1,439 @@
+"""
+Repository module for the durable task queue.
+
+Tasks are executed by workers (see services.task_worker) rather than inside
+the request that submitted them. Each task gets a row in ``task_jobs``;
+workers claim rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of
+worker processes can poll the same table without handing out a job twice.
+A claimed job is leased to its worker, which renews the lease with heartbeats.
+Jobs whose lease runs out (the worker crashed or was redeployed) are claimed
+again, up to ``max_attempts`` times. A job whose lease runs out on its last
+attempt is claimed once more as ``exhausted``, so the claiming worker fails
+its task through the task's failure handling (see TaskWorker).
+
+Duplicate submissions are coalesced: a partial unique index allows one queued
+or running job per dedupe key (task type, notebook and input), and client
+idempotency keys are unique, so equivalent submissions share one task.
+
+Cancelled jobs get the status ``cancelled``; workers running them poll for
+it (see TaskWorker) and stop them within seconds.
+
+Claims can be capped by the number of jobs running across all workers, in
+total and per task type. Claims take a transaction-level advisory lock so
+concurrent workers see each other's claims when checking those limits.
+
+All timestamps are taken from the database clock so workers on different
+hosts agree on lease expiry.
+"""
+
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, delete, extract, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from loguru import logger
+
+from models.db import Task, TaskJob
+from .db_service import get_db_session
+
+# Advisory lock key serializing claims, so running job limits hold across workers
+CLAIM_LOCK_KEY = 7_350_214_081
+
+# Job statuses covered by the dedupe key's unique index
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class LeaseExpiredError(Exception):
+    """Error a job is failed with when its lease expired on its last attempt."""
+
+    def __init__(self, job_id: str, attempts: int):
+        super().__init__("Task was interrupted too many times")
+        self.job_id = job_id
+        self.attempts = attempts
+
+
+class JobQueue:
+    """Repository for enqueueing, claiming and settling task jobs."""
+
+    @staticmethod
+    async def enqueue(
+        task_id: str,
+        task_type: str,
+        max_attempts: int = 3,
+        dedupe_key: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> str:
+        """Add a job for a task to the queue.
+
+        If an equivalent job was enqueued concurrently (see find_equivalent),
+        no job is added, the task is deleted and the equivalent job's task is
+        returned instead.
+
+        Args:
+            task_id: The ID of the task to execute
+            task_type: Kind of task, selects the handler ('research', 'audio_overview' or 'mindmap')
+            max_attempts: Times the job is started before it is given up
+            dedupe_key: Hash of the work, shared by equivalent submissions
+            idempotency_key: Key sent by the client to make retries of a submission safe
+
+        Returns:
+            str: The ID of the task that will do the work
+        """
+        async with get_db_session() as session:
+            job = TaskJob(
+                task_id=task_id,
+                task_type=task_type,
+                max_attempts=max_attempts,
+                dedupe_key=dedupe_key,
+                idempotency_key=idempotency_key,
+            )
+            session.add(job)
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                existing = await JobQueue._find_equivalent(session, dedupe_key, idempotency_key)
+                if existing is None:
+                    raise
+                await session.execute(delete(Task).where(Task.id == task_id))
+                await session.commit()
+                logger.info(f"Task {task_id} coalesced into equivalent task {existing}")
+                return existing
+            logger.info(f"Enqueued {task_type} job {job.id} for task {task_id}")
+            return task_id
+
+    @staticmethod
+    async def find_equivalent(dedupe_key: Optional[str] = None, idempotency_key: Optional[str] = None) -> Optional[str]:
+        """Find the task of a job equivalent to a new submission.
+
+        A job is equivalent if it was submitted with the same idempotency key
+        (whatever its status), or if it has the same dedupe key and is still
+        queued or running.
+
+        Args:
+            dedupe_key: Hash of the submitted work
+            idempotency_key: Key sent by the client
+
+        Returns:
+            The ID of the equivalent job's task, or None
+        """
+        async with get_db_session() as session:
+            return await JobQueue._find_equivalent(session, dedupe_key, idempotency_key)
+
+    @staticmethod
+    async def _find_equivalent(session, dedupe_key: Optional[str], idempotency_key: Optional[str]) -> Optional[str]:
+        # An idempotency key identifies the submission itself, so it wins over the dedupe key
+        if idempotency_key:
+            task_id = (await session.execute(
+                select(TaskJob.task_id).where(TaskJob.idempotency_key == idempotency_key)
+            )).scalar_one_or_none()
+            if task_id is not None:
+                return task_id
+        if dedupe_key:
+            return (await session.execute(
+                select(TaskJob.task_id).where(TaskJob.dedupe_key == dedupe_key, TaskJob.status.in_(ACTIVE_STATUSES))
+            )).scalar_one_or_none()
+        return None
+
+    @staticmethod
+    async def claim(
+        worker_id: str,
+        lease_seconds: int,
+        task_types: Optional[List[str]] = None,
+        max_running: Optional[int] = None,
+        max_running_by_type: Optional[Dict[str, int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Claim the oldest available job, if any.
+
+        Available jobs are queued jobs that are due and running jobs whose lease
+        has expired. A job whose lease expired on its last attempt is claimed
+        without starting another attempt and returned with ``exhausted`` set:
+        the worker must fail it rather than run it. If that worker dies too,
+        the job is claimed as exhausted again.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+            lease_seconds: How long the job is leased before it can be claimed again
+            task_types: Only claim jobs of these types (default: any)
+            max_running: Maximum jobs running across all workers (None or 0: unlimited)
+            max_running_by_type: Maximum jobs of a type running across all workers (types missing or 0: unlimited)
+
+        Returns:
+            The claimed job (``id``, ``task_id``, ``task_type``, ``attempts``,
+            ``max_attempts`` and ``exhausted``), or None if no job is available
+        """
+        now = func.now()
+        available = or_(
+            and_(TaskJob.status == "queued", TaskJob.available_at <= now),
+            and_(TaskJob.status == "running", TaskJob.lease_expires_at < now),
+        )
+        if task_types is not None:
+            available = and_(available, TaskJob.task_type.in_(task_types))
+
+        # Limits of 0 (or less) mean unlimited
+        max_running = max_running if max_running and max_running > 0 else None
+        type_limits = {task_type: limit for task_type, limit in (max_running_by_type or {}).items() if limit and limit > 0}
+
+        async with get_db_session() as session:
+            if max_running or type_limits:
+                # Released at commit
+                await session.execute(select(func.pg_advisory_xact_lock(CLAIM_LOCK_KEY)))
+                running = await JobQueue._running_counts(session)
+                if max_running and sum(running.values()) >= max_running:
+                    await session.commit()
+                    return None
+                full_types = [
+                    task_type for task_type, limit in type_limits.items()
+                    if running.get(task_type, 0) >= limit
+                ]
+                if full_types:
+                    available = and_(available, TaskJob.task_type.not_in(full_types))
+
+            job = (await session.execute(
+                select(TaskJob)
+                .where(available)
+                .order_by(TaskJob.available_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )).scalar_one_or_none()
+            if job is None:
+                await session.commit()
+                return None
+
+            exhausted = False
+            lease = {
+                "locked_by": worker_id,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "heartbeat_at": now,
+            }
+            if job.status == "running":
+                logger.warning(f"Lease of job {job.id} held by {job.locked_by} expired (attempt {job.attempts}/{job.max_attempts})")
+                exhausted = job.attempts >= job.max_attempts
+            if not exhausted:
+                lease.update(status="running", attempts=TaskJob.attempts + 1, started_at=now)
+
+            result = await session.execute(
+                update(TaskJob)
+                .where(TaskJob.id == job.id)
+                .values(**lease)
+                .returning(TaskJob.id, TaskJob.task_id, TaskJob.task_type, TaskJob.attempts, TaskJob.max_attempts)
+            )
+            claimed = dict(result.one()._mapping)
+            claimed["exhausted"] = exhausted
+            await session.commit()
+            if exhausted:
+                logger.info(f"Worker {worker_id} claimed exhausted {claimed['task_type']} job {claimed['id']} for task {claimed['task_id']} to fail it")
+            else:
+                logger.info(f"Worker {worker_id} claimed {claimed['task_type']} job {claimed['id']} for task {claimed['task_id']} (attempt {claimed['attempts']}/{claimed['max_attempts']})")
+            return claimed
+
+    @staticmethod
+    async def heartbeat(job_id: str, worker_id: str, lease_seconds: int) -> bool:
+        """Extend the lease of a running job.
+
+        Args:
+            job_id: The ID of the job
+            worker_id: Identifier of the worker holding the lease
+            lease_seconds: New lease duration from now
+
+        Returns:
+            bool: True if the lease was extended, False if the worker no longer holds it
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                update(TaskJob)
+                .where(TaskJob.id == job_id, TaskJob.locked_by == worker_id, TaskJob.status == "running")
+                .values(
+                    lease_expires_at=func.now() + timedelta(seconds=lease_seconds),
+                    heartbeat_at=func.now(),
+                )
+                .returning(TaskJob.id)
+            )
+            await session.commit()
+            return result.scalar_one_or_none() is not None
+
+    @staticmethod
+    async def complete(job_id: str, worker_id: str) -> bool:
+        """Mark a job completed.
+
+        Args:
+            job_id: The ID of the job
+            worker_id: Identifier of the worker holding the lease
+
+        Returns:
+            bool: True if the job was updated, False if the worker no longer holds it
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                update(TaskJob)
+                .where(TaskJob.id == job_id, TaskJob.locked_by == worker_id, TaskJob.status == "running")
+                .values(status="completed", locked_by=None, lease_expires_at=None, finished_at=func.now())
+                .returning(TaskJob.id)
+            )
+            await session.commit()
+            updated = result.scalar_one_or_none()
+            if updated:
+                logger.info(f"Completed job {job_id}")
+                return True
+            logger.warning(f"Job {job_id} completed but its lease was lost by {worker_id}")
+            return False
+
+    @staticmethod
+    async def fail(job_id: str, worker_id: str, error: str, retry_delay_seconds: int = 30) -> bool:
+        """Record a failed attempt, queueing the job again if attempts remain.
+
+        Args:
+            job_id: The ID of the job
+            worker_id: Identifier of the worker holding the lease
+            error: The error message
+            retry_delay_seconds: Delay before the job becomes available again
+
+        Returns:
+            bool: True if the job was queued for another attempt
+        """
+        async with get_db_session() as session:
+            job = (await session.execute(
+                select(TaskJob)
+                .where(TaskJob.id == job_id, TaskJob.locked_by == worker_id, TaskJob.status == "running")
+                .with_for_update()
+            )).scalar_one_or_none()
+            if job is None:
+                logger.warning(f"Job {job_id} failed but its lease was lost by {worker_id}")
+                return False
+
+            retry = job.attempts < job.max_attempts
+            job.status = "queued" if retry else "failed"
+            job.locked_by = None
+            job.lease_expires_at = None
+            job.last_error = error
+            job.finished_at = func.now()
+            if retry:
+                job.available_at = func.now() + timedelta(seconds=retry_delay_seconds)
+            await session.commit()
+            logger.warning(f"Job {job_id} failed (attempt {job.attempts}/{job.max_attempts})" + (f", retrying in {retry_delay_seconds}s" if retry else "") + f": {error}")
+            return retry
+
+    @staticmethod
+    async def cancel(task_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a task's job if it is queued or running.
+
+        Args:
+            task_id: The ID of the task
+
+        Returns:
+            dict with the job's ``id``, ``task_type`` and ``status`` before
+            cancelling, or None if the task has no queued or running job
+        """
+        async with get_db_session() as session:
+            job = (await session.execute(
+                select(TaskJob)
+                .where(TaskJob.task_id == task_id, TaskJob.status.in_(ACTIVE_STATUSES))
+                .with_for_update()
+            )).scalar_one_or_none()
+            if job is None:
+                return None
+
+            cancelled = {"id": job.id, "task_type": job.task_type, "status": job.status}
+            job.status = "cancelled"
+            job.lease_expires_at = None
+            job.finished_at = func.now()
+            await session.commit()
+            logger.info(f"Cancelled {cancelled['status']} job {job.id} for task {task_id}")
+            return cancelled
+
+    @staticmethod
+    async def get_cancelled(job_ids: List[str]) -> List[str]:
+        """Get which of the given jobs were cancelled.
+
+        Args:
+            job_ids: IDs of the jobs to check
+
+        Returns:
+            IDs of the cancelled jobs
+        """
+        if not job_ids:
+            return []
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(TaskJob.id).where(TaskJob.id.in_(job_ids), TaskJob.status == "cancelled")
+            )
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def _running_counts(session) -> Dict[str, int]:
+        """Count jobs with a live lease, by task type."""
+        result = await session.execute(
+            select(TaskJob.task_type, func.count())
+            .where(TaskJob.status == "running", TaskJob.lease_expires_at >= func.now())
+            .group_by(TaskJob.task_type)
+        )
+        return {task_type: count for task_type, count in result.all()}
+
+    @staticmethod
+    async def count_queued(task_type: Optional[str] = None) -> int:
+        """Count jobs waiting to be claimed.
+
+        Args:
+            task_type: Only count jobs of this type (default: all)
+
+        Returns:
+            int: Number of queued jobs
+        """
+        async with get_db_session() as session:
+            stmt = select(func.count()).select_from(TaskJob).where(TaskJob.status == "queued")
+            if task_type is not None:
+                stmt = stmt.where(TaskJob.task_type == task_type)
+            return (await session.execute(stmt)).scalar_one()
+
+    @staticmethod
+    async def get_queue_position(task_id: str) -> Optional[int]:
+        """Get the 1-based position of a task's job among queued jobs of its type.
+
+        Args:
+            task_id: The ID of the task
+
+        Returns:
+            The position, or None if the job is not queued
+        """
+        async with get_db_session() as session:
+            job = (await session.execute(
+                select(TaskJob).where(TaskJob.task_id == task_id)
+            )).scalar_one_or_none()
+            if job is None or job.status != "queued":
+                return None
+            ahead = (await session.execute(
+                select(func.count())
+                .select_from(TaskJob)
+                .where(
+                    TaskJob.status == "queued",
+                    TaskJob.task_type == job.task_type,
+                    TaskJob.available_at < job.available_at,
+                )
+            )).scalar_one()
+            return ahead + 1
+
+    @staticmethod
+    async def average_duration(task_type: str, sample_size: int = 20) -> Optional[float]:
+        """Get the average run time of recently completed jobs of a type.
+
+        Args:
+            task_type: The task type
+            sample_size: Number of most recent completed jobs averaged
+
+        Returns:
+            Average duration in seconds, or None without completed jobs
+        """
+        async with get_db_session() as session:
+            recent = (
+                select((extract("epoch", TaskJob.finished_at) - extract("epoch", TaskJob.started_at)).label("seconds"))
+                .where(TaskJob.task_type == task_type, TaskJob.status == "completed", TaskJob.started_at.is_not(None))
+                .order_by(TaskJob.finished_at.desc())
+                .limit(sample_size)
+                .subquery()
+            )
+            average = (await session.execute(select(func.avg(recent.c.seconds)))).scalar_one()
+            return float(average) if average is not None else None
+
+
+# Singleton instance
+job_queue = JobQueue()
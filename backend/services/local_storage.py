@@ -12,22 +12,25 @@ from loguru import logger
 class LocalStorageService:
     """Service for handling file storage on the local filesystem."""
     
-    def __init__(self, base_path: str = "uploads"):
+    def __init__(self, base_path: str = "uploads", objects_path: str = "objects"):
         """
         Initialize local storage service.
         
         Args:
             base_path: Base directory for storing all files
+            objects_path: Directory for private objects, which unlike base_path is not served under /uploads
         """
         self.base_path = Path(base_path).resolve()
         self.audios_path = self.base_path / "audios"
         self.documents_path = self.base_path / "documents"
+        self.objects_path = Path(objects_path).resolve()
         self.setup_directories()
         
     def setup_directories(self):
         """Ensure all required directories exist."""
         self.audios_path.mkdir(parents=True, exist_ok=True)
         self.documents_path.mkdir(parents=True, exist_ok=True)
+        self.objects_path.mkdir(parents=True, exist_ok=True)
         logger.info(f"Local storage initialized at: {self.base_path}")
     
     async def upload_file(
@@ -137,6 +140,78 @@ class LocalStorageService:
             logger.error(error_msg)
             return False
     
+    def _object_path(self, key: str) -> Path:
+        """Resolve an object key, refusing keys outside the objects directory."""
+        path = (self.objects_path / key).resolve()
+        if not path.is_relative_to(self.objects_path):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    async def put_object(self, key: str, content: bytes, content_type: str = "application/octet-stream") -> str:
+        """
+        Save a private object under a key, replacing any object with that key.
+        
+        Args:
+            key: The object key, such as "tasks/<task_id>/result.json.gz"
+            content: The object content as bytes
+            content_type: MIME type of the content
+            
+        Returns:
+            The object key
+        """
+        path = self._object_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so readers never see a partial object
+            tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            return key
+        except Exception as e:
+            error_msg = f"Failed to save object {key}: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg) from e
+    
+    async def get_object(self, key: str) -> bytes:
+        """
+        Retrieve a private object's content.
+        
+        Args:
+            key: The object key
+            
+        Returns:
+            Object content as bytes
+        """
+        path = self._object_path(key)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except Exception as e:
+            error_msg = f"Failed to read object {key}: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg) from e
+    
+    async def delete_object(self, key: str) -> bool:
+        """
+        Delete a private object.
+        
+        Args:
+            key: The object key
+            
+        Returns:
+            bool: True if the object existed and was deleted
+        """
+        path = self._object_path(key)
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Failed to delete object {key}: {str(e)}")
+            return False
+    
     def get_public_url(self, file_path: str) -> str:
         """
         Get URL for a locally stored file.
@@ -0,0 +1,497 @@
+# backend/services/local_vector_store.py
+"""
+Embedded vector store backed by memory-mapped NumPy matrices.
+
+Each notebook gets a directory holding its vectors as a float32 matrix in a
+memory-mapped file (``vectors.f32``) and its point IDs and payloads in an
+append-only log (see _NotebookIndex). Vectors are normalized on write, so a
+search is a single matrix-vector product followed by a partial sort, with no
+network round trip. Meant for single-node installs, development and offline
+benchmarks; the Qdrant backend remains the choice for large deployments.
+
+Several processes (API processes and workers) may share the store directory:
+operations on a notebook hold an ``fcntl`` lock on its lock file, exclusive
+for writes and shared for reads, so writers never lose each other's updates
+and readers never see a matrix being compacted. The directory must be on a
+local filesystem where ``flock`` works (not NFS).
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from .vector_store import BaseVectorStore, Point
+
+
+class _NotebookIndex:
+    """Vectors and payloads of one notebook, persisted in its directory.
+
+    Point IDs and payloads are appended to a log (``points.<generation>.jsonl``)
+    as ``[row, point_id, payload]`` lines, so storing a batch writes data
+    proportional to the batch rather than to the notebook. ``index.json`` only
+    records the matrix shape, the point count and how much of the log is
+    committed; bytes past that (from a writer that crashed) are ignored and
+    overwritten. Deleting points, which compacts the matrix, and a log grown
+    mostly stale rewrite the log in full under the next generation.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.json"
+    NOTEBOOK_ID_FILE = "notebook_id"
+    # The log is rewritten once it exceeds both this size and twice its size when last rewritten
+    LOG_COMPACTION_MIN_BYTES = 1 << 20
+
+    def __init__(self, directory: Path, notebook_id: str):
+        self.directory = directory
+        self.notebook_id = notebook_id
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+        self.vectors: Optional[np.memmap] = None
+        self.dimension = 0
+        self.capacity = 0
+        self.generation = 0
+        self.log_bytes = 0
+        self.base_log_bytes = 0
+        self._signature = None
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _log_path(self, generation: int) -> Path:
+        return self.directory / f"points.{generation}.jsonl"
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.directory / self.INDEX_FILE)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _reset(self) -> None:
+        self.ids, self.payloads, self.rows = [], [], {}
+        self.vectors, self.dimension, self.capacity = None, 0, 0
+        self.generation, self.log_bytes, self.base_log_bytes = 0, 0, 0
+
+    def _apply(self, row: int, point_id: str, payload: Dict[str, Any]) -> None:
+        if row == self.count:
+            self.ids.append(point_id)
+            self.payloads.append(payload)
+        else:
+            self.ids[row] = point_id
+            self.payloads[row] = payload
+        self.rows[point_id] = row
+
+    def refresh(self) -> None:
+        """Load the notebook's changes from disk since it was last read."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        if signature is None:
+            self._reset()
+            self._signature = None
+            return
+
+        with open(self.directory / self.INDEX_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        # Appends to the same log only need the new lines to be read
+        if self._signature is None or data["generation"] != self.generation or data["log_bytes"] < self.log_bytes:
+            self._reset()
+        if data["log_bytes"] > self.log_bytes:
+            with open(self._log_path(data["generation"]), "rb") as f:
+                f.seek(self.log_bytes)
+                for line in f.read(data["log_bytes"] - self.log_bytes).splitlines():
+                    self._apply(*json.loads(line))
+
+        self.generation = data["generation"]
+        self.log_bytes = data["log_bytes"]
+        self.base_log_bytes = data["base_log_bytes"]
+        if data["capacity"] != self.capacity or data["dimension"] != self.dimension:
+            self.vectors = None
+            self.dimension = data["dimension"]
+            self.capacity = data["capacity"]
+            if self.capacity:
+                self.vectors = np.memmap(
+                    self.directory / self.VECTORS_FILE,
+                    dtype=np.float32,
+                    mode="r+",
+                    shape=(self.capacity, self.dimension),
+                )
+        self._signature = signature
+
+    def _append(self, entries: List[list]) -> None:
+        """Append ``[row, point_id, payload]`` entries after the committed end of the log."""
+        data = b"".join(json.dumps(entry).encode("utf-8") + b"\n" for entry in entries)
+        path = self._log_path(self.generation)
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(self.log_bytes)
+            f.truncate()
+            f.write(data)
+        self.log_bytes += len(data)
+
+    def _rewrite_log(self) -> None:
+        """Write the current points to the log of the next generation."""
+        self.generation += 1
+        self.log_bytes = 0
+        self._append([[row, point_id, payload] for row, (point_id, payload) in enumerate(zip(self.ids, self.payloads))])
+        self.base_log_bytes = self.log_bytes
+
+    def _save(self, rewrite_log: bool = False) -> None:
+        """Flush the vectors, then atomically replace the index file, committing the log."""
+        if self.vectors is not None:
+            self.vectors.flush()
+        old_generation = self.generation
+        if rewrite_log or self.log_bytes > max(self.LOG_COMPACTION_MIN_BYTES, 2 * self.base_log_bytes):
+            self._rewrite_log()
+
+        tmp_path = self.directory / f"{self.INDEX_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "dimension": self.dimension,
+                "capacity": self.capacity,
+                "count": self.count,
+                "generation": self.generation,
+                "log_bytes": self.log_bytes,
+                "base_log_bytes": self.base_log_bytes,
+            }, f)
+        os.replace(tmp_path, self.directory / self.INDEX_FILE)
+        self._signature = self._file_signature()
+        if self.generation != old_generation:
+            self._log_path(old_generation).unlink(missing_ok=True)
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the vector file so it holds at least ``rows`` rows, doubling its capacity."""
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, self.capacity * 2, 64)
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        path = self.directory / self.VECTORS_FILE
+        with open(path, "a+b") as f:
+            f.truncate(capacity * self.dimension * 4)
+        self.vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self.capacity = capacity
+
+    def upsert(self, points: List[Point]) -> None:
+        matrix = np.asarray([vector for _, vector, _ in points], dtype=np.float32)
+        if not self.dimension:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / self.NOTEBOOK_ID_FILE).write_text(self.notebook_id, encoding="utf-8")
+            self.dimension = matrix.shape[1]
+        elif matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got {matrix.shape[1]}")
+
+        # Store unit vectors so the dot product is the cosine similarity
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        new_ids = {point_id for point_id, _, _ in points if point_id not in self.rows}
+        self._reserve(self.count + len(new_ids))
+        entries = []
+        for (point_id, _, payload), vector in zip(points, matrix):
+            row = self.rows.get(point_id, self.count)
+            self._apply(row, point_id, payload)
+            self.vectors[row] = vector
+            entries.append([row, point_id, payload])
+        self._append(entries)
+        self._save()
+
+    def overwrite_payloads(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        entries = []
+        for point_id, payload in payloads.items():
+            row = self.rows.get(point_id)
+            if row is not None:
+                self.payloads[row] = payload
+                entries.append([row, point_id, payload])
+        if entries:
+            self._append(entries)
+            self._save()
+
+    def delete(self, point_ids: List[str]) -> int:
+        """Delete points, compacting the remaining rows to the front of the matrix."""
+        doomed = {point_id for point_id in point_ids if point_id in self.rows}
+        if not doomed:
+            return 0
+        keep = [row for row, point_id in enumerate(self.ids) if point_id not in doomed]
+        if keep:
+            self.vectors[:len(keep)] = self.vectors[keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.payloads = [self.payloads[row] for row in keep]
+        self.rows = {point_id: row for row, point_id in enumerate(self.ids)}
+        self._save(rewrite_log=True)
+        return len(doomed)
+
+    def search(self, queries: np.ndarray, limit: int, with_vectors: bool = False) -> List[List[Tuple[str, float, Dict[str, Any], Any]]]:
+        """Score a matrix of unit query vectors against all rows with one matrix product."""
+        if not self.count or limit <= 0:
+            return [[] for _ in queries]
+        if queries.shape[1] != self.dimension:
+            raise ValueError(f"Expected queries of dimension {self.dimension}, got {queries.shape[1]}")
+
+        all_scores = self.vectors[:self.count] @ queries.T
+        results = []
+        for scores in all_scores.T:
+            if limit < self.count:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                top = top[np.argsort(-scores[top])]
+            else:
+                top = np.argsort(-scores)
+            results.append([
+                (self.ids[row], float(scores[row]), self.payloads[row], np.array(self.vectors[row]) if with_vectors else None)
+                for row in top
+            ])
+        return results
+
+
+class LocalVectorStore(BaseVectorStore):
+    """Vector store keeping each notebook's vectors in memory-mapped files on local disk."""
+
+    def __init__(self, path: str = "data/vectors", max_open_notebooks: int = 64, **kwargs: Any):
+        """Initialize the local vector store. Notebooks are loaded lazily on first use.
+
+        Args:
+            path: Directory holding one subdirectory per notebook
+            max_open_notebooks: Maximum number of notebooks kept loaded in memory
+            **kwargs: Embedding and chunking options, see BaseVectorStore
+        """
+        logger.info(f"Initializing LocalVectorStore at {path}")
+        super().__init__(**kwargs)
+
+        self.path = Path(path)
+        self.max_open_notebooks = max_open_notebooks
+        self._notebooks: "OrderedDict[str, _NotebookIndex]" = OrderedDict()
+        # Locks are dropped once no operation holds or waits for them
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def _setup(self) -> None:
+        """Create the store directory."""
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _directory_name(self, notebook_id: str) -> str:
+        return hashlib.sha256(notebook_id.encode("utf-8")).hexdigest()[:32]
+
+    def _directory(self, notebook_id: str) -> Path:
+        return self.path / self._directory_name(notebook_id)
+
+    def _lock(self, notebook_id: str) -> asyncio.Lock:
+        lock = self._locks.get(notebook_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[notebook_id] = lock
+        return lock
+
+    @contextmanager
+    def _file_lock(self, notebook_id: str, exclusive: bool) -> Iterator[None]:
+        """Lock a notebook against other processes; blocks, so only call it in a worker thread.
+
+        Lock files live outside the notebook directories, which deleting a notebook removes.
+        """
+        lock_path = self.path / ".locks" / f"{self._directory_name(notebook_id)}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open(self, notebook_id: str) -> _NotebookIndex:
+        """Get a notebook's index, loading it from disk if needed."""
+        notebook = self._notebooks.get(notebook_id)
+        if notebook is None:
+            notebook = _NotebookIndex(self._directory(notebook_id), notebook_id)
+            self._notebooks[notebook_id] = notebook
+            while len(self._notebooks) > self.max_open_notebooks:
+                self._notebooks.popitem(last=False)
+        self._notebooks.move_to_end(notebook_id)
+        # Pick up writes made by other processes
+        notebook.refresh()
+        return notebook
+
+    def _notebook_ids(self) -> List[str]:
+        """List the IDs of all notebooks stored on disk."""
+        if not self.path.exists():
+            return []
+        return [
+            notebook_id_file.read_text(encoding="utf-8")
+            for notebook_id_file in self.path.glob(f"*/{_NotebookIndex.NOTEBOOK_ID_FILE}")
+        ]
+
+    async def _run(self, notebook_id: str, function, *args, write: bool = False):
+        """Run an operation on a notebook in a worker thread, serialized per notebook.
+
+        Operations of this process take turns on the asyncio lock; the file
+        lock then keeps out writers in other processes (and, for writes, readers).
+        """
+        def run():
+            with self._file_lock(notebook_id, exclusive=write):
+                return function(self._open(notebook_id), *args)
+
+        async with self._lock(notebook_id):
+            return await asyncio.to_thread(run)
+
+    async def _upsert_points(self, points: List[Point]) -> None:
+        """Store points, grouped by notebook, in batches of ``upsert_batch_size``."""
+        by_notebook: Dict[str, List[Point]] = {}
+        for point in points:
+            by_notebook.setdefault(point[2]["notebook_id"], []).append(point)
+
+        for notebook_id, notebook_points in by_notebook.items():
+            for start in range(0, len(notebook_points), self.upsert_batch_size):
+                batch = notebook_points[start:start + self.upsert_batch_size]
+                logger.info(f"Storing points {start + 1}-{start + len(batch)}/{len(notebook_points)} for notebook {notebook_id}")
+                await self._run(notebook_id, _NotebookIndex.upsert, batch, write=True)
+
+    async def _overwrite_payloads(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        by_notebook: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for point_id, payload in payloads.items():
+            by_notebook.setdefault(payload["notebook_id"], {})[point_id] = payload
+
+        for notebook_id, notebook_payloads in by_notebook.items():
+            await self._run(notebook_id, _NotebookIndex.overwrite_payloads, notebook_payloads, write=True)
+
+    async def get_point_index(self, notebook_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get the IDs and payloads (without chunk text) of a notebook's stored points.
+
+        Args:
+            notebook_id: Notebook ID to index
+
+        Returns:
+            Mapping of point ID to payload, for use as ``existing`` in add_source(s)
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        index = await self._run(notebook_id, lambda notebook: {
+            point_id: self._without_content(payload)
+            for point_id, payload in zip(notebook.ids, notebook.payloads)
+        })
+        logger.info(f"Found {len(index)} stored points for notebook {notebook_id}")
+        return index
+
+    async def delete_points(self, point_ids: List[str], notebook_id: Optional[str] = None) -> None:
+        """Delete points by ID.
+
+        Args:
+            point_ids: IDs of the points to delete
+            notebook_id: Notebook the points belong to (default: look in every notebook)
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        notebook_ids = [notebook_id] if notebook_id else await asyncio.to_thread(self._notebook_ids)
+        deleted = 0
+        for candidate in notebook_ids:
+            deleted += await self._run(candidate, _NotebookIndex.delete, point_ids, write=True)
+        logger.info(f"Deleted {deleted} points")
+
+    async def _search_by_vector(
+        self,
+        vector: List[float],
+        notebook_id: Optional[str],
+        limit: int,
+        query: Optional[str] = None,
+        with_vectors: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Score the query against the notebook's vectors (dense only)."""
+        result_lists = await self._search_many_by_vector([(query, vector)], notebook_id, limit, with_vectors, fields)
+        return result_lists[0]
+
+    async def _search_many_by_vector(
+        self,
+        searches: List[Tuple[Optional[str], List[float]]],
+        notebook_id: Optional[str],
+        limit: int,
+        with_vectors: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Score all queries against the notebook's vectors with one matrix product.
+
+        Payloads are already in memory, so ``fields`` does not save any reads here.
+        """
+        queries = np.asarray([vector for _, vector in searches], dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries /= np.where(norms == 0, 1, norms)
+
+        notebook_ids = [notebook_id] if notebook_id else await asyncio.to_thread(self._notebook_ids)
+        hits: List[List[Tuple[str, float, Dict[str, Any], Any]]] = [[] for _ in searches]
+        for candidate in notebook_ids:
+            notebook_hits = await self._run(candidate, _NotebookIndex.search, queries, limit, with_vectors)
+            for search_hits, new_hits in zip(hits, notebook_hits):
+                search_hits.extend(new_hits)
+
+        results = []
+        for search_hits in hits:
+            search_hits.sort(key=lambda hit: hit[1], reverse=True)
+            results.append([self._format_result(*hit) for hit in search_hits[:limit]])
+        return results
+
+    async def iter_chunks_by_notebook_id(
+        self,
+        notebook_id: str,
+        page_size: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all chunks for a specific notebook ID in chunk_index order.
+
+        Args:
+            notebook_id: Notebook ID to retrieve chunks for
+            page_size: Unused, the notebook is read from the local index
+            fields: Unused, payloads are already in memory
+
+        Yields:
+            Chunks for the notebook with their metadata
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        points = await self._run(notebook_id, lambda notebook: sorted(
+            zip(notebook.ids, notebook.payloads),
+            key=lambda point: point[1].get("chunk_index", 0),
+        ))
+        for point_id, payload in points:
+            yield self._format_chunk(point_id, payload)
+
+        logger.info(f"Retrieved {len(points)} chunks for notebook {notebook_id}")
+
+    async def delete_by_notebook_id(self, notebook_id: str) -> int:
+        """Delete all sources for a specific notebook ID.
+
+        Args:
+            notebook_id: Notebook ID to delete
+
+        Returns:
+            Number of deleted points
+        """
+        if not self._initialized:
+            await self.initialize()
+        logger.info(f"Deleting all sources for notebook: {notebook_id}")
+
+        def delete() -> int:
+            with self._file_lock(notebook_id, exclusive=True):
+                notebook = self._notebooks.pop(notebook_id, None) or _NotebookIndex(self._directory(notebook_id), notebook_id)
+                notebook.refresh()
+                deleted = notebook.count
+                notebook.vectors = None
+                shutil.rmtree(notebook.directory, True)
+                return deleted
+
+        async with self._lock(notebook_id):
+            deleted = await asyncio.to_thread(delete)
+
+        logger.info(f"Deleted {deleted} points for notebook {notebook_id}")
+        return deleted
@@ -1,43 +1,66 @@
-from typing import List, Dict, Any, Optional
-import uuid
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from loguru import logger
-from openai import AsyncOpenAI
 from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models as rest
 from qdrant_client.http.models import Distance, VectorParams
-import os
-import asyncio
-class QdrantSourceStore:
+from .sparse_encoder import BM25SparseEncoder
+from .vector_store import BaseVectorStore, Point, CONTENT_FIELD, COMPRESSED_CONTENT_FIELD
+
+class QdrantSourceStore(BaseVectorStore):
     """Service for storing and retrieving source documents using Qdrant and OpenAI embeddings."""
 
+    # Vector names in hybrid collections
+    DENSE_VECTOR = "dense"
+    SPARSE_VECTOR = "bm25"
+
     def __init__(
         self,
         qdrant_url: str = "localhost",
         qdrant_api_key: Optional[str] = None,
         collection_name: str = "sources",
-        embedding_model: str = "text-embedding-3-small",
-        openai_api_key: Optional[str] = None,
-        chunk_size: int = 512,
-        chunk_overlap: int = 50,
+        vectors_on_disk: bool = False,
+        quantization: Optional[str] = None,
+        quantization_oversampling: float = 2.0,
+        hnsw_m: Optional[int] = None,
+        hnsw_ef_construct: Optional[int] = None,
+        hnsw_ef: Optional[int] = None,
+        hybrid: bool = False,
+        hybrid_prefetch_limit: int = 20,
+        **kwargs: Any,
     ):
         """Initialize Qdrant source store.
 
         Args:
             qdrant_url: URL of Qdrant server
             qdrant_api_key: API key for Qdrant
-            collection_name: Name of the collection to store sources
-            embedding_model: OpenAI embedding model name
-            openai_api_key: OpenAI API key
-            chunk_size: Size of chunks for text splitting
-            chunk_overlap: Overlap between chunks
+            collection_name: Name (or alias) of the collection to store sources
+            vectors_on_disk: Keep original vectors on disk instead of in RAM
+            quantization: 'int8' for scalar quantization kept in RAM, or None
+            quantization_oversampling: Candidates fetched per result with quantized
+                vectors before rescoring with the originals
+            hnsw_m: Edges per node in the HNSW graph (default: Qdrant's)
+            hnsw_ef_construct: Neighbours considered while building the HNSW graph (default: Qdrant's)
+            hnsw_ef: Neighbours considered at search time (default: Qdrant's)
+            hybrid: Create collections with BM25 sparse vectors next to the dense ones
+                and fuse both rankings in search
+            hybrid_prefetch_limit: Candidates fetched from each ranking before fusion
+            **kwargs: Embedding and chunking options, see BaseVectorStore
         """
         logger.info(f"Initializing QdrantSourceStore with collection: {collection_name}")
+        super().__init__(**kwargs)
 
         self.collection_name = collection_name
-        self.embedding_model = embedding_model
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
-        self._initialized = False
+        self.vectors_on_disk = vectors_on_disk
+        self.quantization = quantization
+        self.quantization_oversampling = quantization_oversampling
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.hnsw_ef = hnsw_ef
+        self.hybrid = hybrid
+        self.hybrid_prefetch_limit = hybrid_prefetch_limit
+        self.sparse_encoder = BM25SparseEncoder(average_length=max(self.chunk_size / 2, 1))
+        # Whether the existing collection has the hybrid schema, detected on initialize
+        self._hybrid_collection = False
 
         # Initialize Qdrant client
         logger.info(f"Connecting to Qdrant at {qdrant_url}")
@@ -47,15 +70,9 @@ class QdrantSourceStore:
             prefer_grpc=True,
         )
 
-        # Initialize OpenAI client
-        logger.info("Initializing OpenAI client")
-        self.openai_client = AsyncOpenAI(api_key=openai_api_key)
-
-    async def initialize(self) -> None:
+    async def _setup(self) -> None:
         """Initialize the Qdrant collection asynchronously."""
-        if not self._initialized:
-            await self._create_collection_if_not_exists()
-            self._initialized = True
+        await self._create_collection_if_not_exists()
 
     async def _create_collection_if_not_exists(self) -> None:
         """Create collection if it doesn't exist."""
@@ -64,260 +81,424 @@ class QdrantSourceStore:
         collections = collections_response.collections
 
         collection_names = [collection.name for collection in collections]
+        # The collection may be an alias to a versioned collection (see migrate_vector_collection.py)
+        aliases_response = await self.qdrant_client.get_aliases()
+        collection_names += [alias.alias_name for alias in aliases_response.aliases]
 
         if self.collection_name not in collection_names:
             logger.info(f"Collection {self.collection_name} does not exist, creating...")
             # Get vector size from embedding model
             vector_size = await self._get_embedding_size()
-
-            # Create collection
-            await self.qdrant_client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=vector_size,
-                    distance=Distance.COSINE,
-                ),
+            try:
+                await self.create_collection(self.collection_name, vector_size)
+            except Exception:
+                # Another process may have created it in the meantime
+                if not await self.qdrant_client.collection_exists(self.collection_name):
+                    raise
+                logger.info(f"Collection {self.collection_name} was created concurrently")
+
+        collection_info = await self.qdrant_client.get_collection(self.collection_name)
+        self._hybrid_collection = self._is_hybrid(collection_info)
+        if self.hybrid and not self._hybrid_collection:
+            logger.warning(
+                f"Collection {self.collection_name} has no sparse vectors, searching dense only. "
+                "Run migrate_vector_collection.py to enable hybrid search."
             )
 
-            # Create payload index for notebook_id for faster filtering
-            logger.info("Creating payload index for notebook_id")
-            await self.qdrant_client.create_payload_index(
-                collection_name=self.collection_name,
-                field_name="notebook_id",
-                field_schema=rest.PayloadSchemaType.KEYWORD,
-            )
+        await self._ensure_payload_indexes()
+
+    @classmethod
+    def _is_hybrid(cls, collection_info: rest.CollectionInfo) -> bool:
+        """Check whether a collection has the named dense and sparse vectors used for hybrid search."""
+        params = collection_info.config.params
+        return (
+            isinstance(params.vectors, dict)
+            and cls.DENSE_VECTOR in params.vectors
+            and cls.SPARSE_VECTOR in (params.sparse_vectors or {})
+        )
 
-            logger.info(f"Created collection: {self.collection_name}")
+    async def create_collection(self, collection_name: str, vector_size: int) -> None:
+        """Create a collection with the configured storage, quantization and HNSW settings.
 
-    async def _get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using OpenAI."""
-        if not self._initialized:
-            await self.initialize()
-        logger.info(f"Getting embedding using model {self.embedding_model}")
-        response = await self.openai_client.embeddings.create(
-            input=text,
-            model=self.embedding_model,
+        Args:
+            collection_name: Name of the collection to create
+            vector_size: Dimension of the embeddings
+        """
+        quantization_config = None
+        if self.quantization == "int8":
+            quantization_config = rest.ScalarQuantization(
+                scalar=rest.ScalarQuantizationConfig(
+                    type=rest.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True,
+                )
+            )
+        elif self.quantization:
+            raise ValueError(f"Unsupported quantization: {self.quantization}")
+
+        vectors_config = VectorParams(
+            size=vector_size,
+            distance=Distance.COSINE,
+            on_disk=self.vectors_on_disk,
         )
-        return response.data[0].embedding
-
-    async def _get_embedding_size(self) -> int:
-        """Get embedding size for the model."""
-        # Simple text to get embedding size
-        test_text = "Test"
-        embedding = await self.openai_client.embeddings.create(
-            input=test_text,
-            model=self.embedding_model,
+        sparse_vectors_config = None
+        if self.hybrid:
+            vectors_config = {self.DENSE_VECTOR: vectors_config}
+            sparse_vectors_config = {
+                # Qdrant applies the IDF half of BM25 at query time
+                self.SPARSE_VECTOR: rest.SparseVectorParams(modifier=rest.Modifier.IDF),
+            }
+
+        await self.qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config,
+            sparse_vectors_config=sparse_vectors_config,
+            hnsw_config=rest.HnswConfigDiff(
+                m=self.hnsw_m,
+                ef_construct=self.hnsw_ef_construct,
+            ),
+            quantization_config=quantization_config,
         )
-        return len(embedding.data[0].embedding)
 
+        logger.info(
+            f"Created collection: {collection_name} (hybrid: {self.hybrid}, on-disk vectors: {self.vectors_on_disk}, "
+            f"quantization: {self.quantization}, m: {self.hnsw_m}, ef_construct: {self.hnsw_ef_construct})"
+        )
 
-    def _chunk_text(self, text: str) -> List[str]:
-        """Split text into chunks based on chunk size and overlap.
+    async def _ensure_payload_indexes(self, collection_name: Optional[str] = None) -> None:
+        """Create the payload indexes used for filtering and ordering if missing.
 
         Args:
-            text: The text to split into chunks
-
-        Returns:
-            List of text chunks with specified size and overlap
+            collection_name: Collection to index (default: ``collection_name``)
         """
-        if not text:
-            logger.warning("Empty text provided for chunking")
-            return []
-
-        logger.info(f"Chunking text with size {self.chunk_size} and overlap {self.chunk_overlap}")
-        # Use list comprehension for cleaner chunk creation
-        tokens = text.split()
-        chunk_starts = range(0, len(tokens), self.chunk_size - self.chunk_overlap)
-        chunks = [
-            " ".join(tokens[i:i + self.chunk_size])
-            for i in chunk_starts
-            if i + self.chunk_size <= len(tokens)
-        ]
+        collection_name = collection_name or self.collection_name
+        collection_info = await self.qdrant_client.get_collection(collection_name)
+        payload_schema = collection_info.payload_schema or {}
+
+        indexes = {
+            # notebook_id for faster filtering
+            "notebook_id": rest.PayloadSchemaType.KEYWORD,
+            # chunk_index for ordered scrolling
+            "chunk_index": rest.PayloadSchemaType.INTEGER,
+        }
+        for field_name, field_schema in indexes.items():
+            if field_name not in payload_schema:
+                logger.info(f"Creating payload index for {field_name}")
+                await self.qdrant_client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                )
 
-        # Handle remaining tokens if any
-        if tokens[chunk_starts[-1]:]:
-            chunks.append(" ".join(tokens[chunk_starts[-1]:]))
+    @staticmethod
+    def _notebook_filter(notebook_id: str) -> rest.Filter:
+        """Build a filter matching the points of a notebook."""
+        return rest.Filter(
+            must=[
+                rest.FieldCondition(
+                    key="notebook_id",
+                    match=rest.MatchValue(value=notebook_id),
+                )
+            ]
+        )
 
-        logger.info(f"Created {len(chunks)} chunks")
-        return chunks
+    def _point_vector(self, vector: List[float], payload: Dict[str, Any], hybrid: Optional[bool] = None) -> Any:
+        """Build the vector(s) of a point for the collection schema.
 
-    async def add_source(
-        self,
-        content: str,
-        notebook_id: str,
-        metadata: Optional[Dict[str, Any]] = None,
-    ) -> List[str]:
-        """Add source document to Qdrant.
+        Args:
+            vector: Dense embedding
+            payload: Point payload, whose chunk text is encoded as the sparse vector
+            hybrid: Build named dense and sparse vectors (default: match the current collection)
+        """
+        if hybrid is None:
+            hybrid = self._hybrid_collection
+        if not hybrid:
+            return vector
+        indices, values = self.sparse_encoder.encode_document(self._decode_payload(payload).get(CONTENT_FIELD) or "")
+        return {
+            self.DENSE_VECTOR: vector,
+            self.SPARSE_VECTOR: rest.SparseVector(indices=indices, values=values),
+        }
+
+    async def _upsert_points(self, points: List[Point]) -> None:
+        """Upsert points into Qdrant in bulk batches of ``upsert_batch_size``."""
+        for start in range(0, len(points), self.upsert_batch_size):
+            batch = [
+                rest.PointStruct(id=point_id, vector=self._point_vector(vector, payload), payload=payload)
+                for point_id, vector, payload in points[start:start + self.upsert_batch_size]
+            ]
+            logger.info(f"Storing points {start + 1}-{start + len(batch)}/{len(points)} in Qdrant")
+            await self._with_retries(
+                lambda batch=batch: self.qdrant_client.upsert(
+                    collection_name=self.collection_name,
+                    points=batch,
+                ),
+                f"Qdrant upsert of points {start + 1}-{start + len(batch)}",
+            )
+
+    async def _overwrite_payloads(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        """Overwrite the payloads of stored points in a single batch request."""
+        await self._with_retries(
+            lambda: self.qdrant_client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=[
+                    rest.OverwritePayloadOperation(
+                        overwrite_payload=rest.SetPayload(
+                            payload=payload,
+                            points=[point_id],
+                        )
+                    )
+                    for point_id, payload in payloads.items()
+                ],
+            ),
+            f"Qdrant payload update of {len(payloads)} points",
+        )
+
+    async def get_point_index(self, notebook_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get the IDs and payloads (without chunk text) of a notebook's stored points.
 
         Args:
-            content: Source content
-            notebook_id: Notebook ID for filtering
-            metadata: Additional metadata
+            notebook_id: Notebook ID to index
 
         Returns:
-            List of IDs for the stored chunks
+            Mapping of point ID to payload, for use as ``existing`` in add_source(s)
         """
         if not self._initialized:
             await self.initialize()
-        logger.info(f"Adding source document for notebook {notebook_id}")
-
-        if metadata is None:
-            metadata = {}
-
-        # Chunk content for better retrieval
-        chunks = self._chunk_text(content)
-
-        # Store IDs of added chunks
-        chunk_ids = []
-
-        # Process each chunk
-        logger.info(f"Processing {len(chunks)} chunks")
-        for i, chunk in enumerate(chunks):
-            # Generate unique ID
-            chunk_id = str(uuid.uuid4())
-            chunk_ids.append(chunk_id)
-
-            # Create payload
-            payload = {
-                "content_chunk": chunk,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "notebook_id": notebook_id,
-                **metadata,
-            }
-
-            # Get embedding
-            embedding = await self._get_embedding(chunk)
 
-            # Store in Qdrant
-            logger.info(f"Storing chunk {i+1}/{len(chunks)} in Qdrant")
-            await self.qdrant_client.upsert(
+        index: Dict[str, Dict[str, Any]] = {}
+        offset = None
+        while True:
+            points, offset = await self.qdrant_client.scroll(
                 collection_name=self.collection_name,
-                points=[
-                    rest.PointStruct(
-                        id=chunk_id,
-                        vector=embedding,
-                        payload=payload,
-                    )
-                ],
+                scroll_filter=self._notebook_filter(notebook_id),
+                limit=self.scroll_page_size,
+                offset=offset,
+                with_payload=rest.PayloadSelectorExclude(exclude=[CONTENT_FIELD, COMPRESSED_CONTENT_FIELD]),
+                with_vectors=False,
             )
+            for point in points:
+                index[str(point.id)] = point.payload
+            if offset is None:
+                break
 
-        logger.info(f"Added source with {len(chunks)} chunks for notebook {notebook_id}")
-        return chunk_ids
+        logger.info(f"Found {len(index)} stored points for notebook {notebook_id}")
+        return index
 
-    async def search(
-        self,
-        query: str,
-        notebook_id: Optional[str] = None,
-        limit: int = 5,
-    ) -> List[Dict[str, Any]]:
-        """Search for sources based on query and notebook ID.
+    async def delete_points(self, point_ids: List[str], notebook_id: Optional[str] = None) -> None:
+        """Delete points by ID.
 
         Args:
-            query: Search query
-            notebook_id: Optional notebook ID to filter results
-            limit: Maximum number of results
-
-        Returns:
-            List of matching sources with scores
+            point_ids: IDs of the points to delete
+            notebook_id: Notebook the points belong to (unused, IDs are collection-wide)
         """
         if not self._initialized:
             await self.initialize()
-        logger.info(f"Searching for: '{query}' in notebook: {notebook_id}")
 
-        # Get query embedding
-        query_embedding = await self._get_embedding(query)
+        for start in range(0, len(point_ids), self.upsert_batch_size):
+            batch = point_ids[start:start + self.upsert_batch_size]
+            await self._with_retries(
+                lambda batch=batch: self.qdrant_client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=rest.PointIdsList(points=batch),
+                ),
+                f"Qdrant delete of {len(batch)} points",
+            )
+        logger.info(f"Deleted {len(point_ids)} points")
+
+    async def _search_by_vector(
+        self,
+        vector: List[float],
+        notebook_id: Optional[str],
+        limit: int,
+        query: Optional[str] = None,
+        with_vectors: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search the collection with a query vector."""
+        result_lists = await self._search_many_by_vector([(query, vector)], notebook_id, limit, with_vectors, fields)
+        return result_lists[0]
 
+    async def _search_many_by_vector(
+        self,
+        searches: List[Tuple[Optional[str], List[float]]],
+        notebook_id: Optional[str],
+        limit: int,
+        with_vectors: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Run all searches in a single Qdrant batch query request."""
         # Set up filter if notebook_id is provided
         filter_param = None
         if notebook_id:
             logger.info(f"Applying notebook filter: {notebook_id}")
-            filter_param = rest.Filter(
-                must=[
-                    rest.FieldCondition(
-                        key="notebook_id",
-                        match=rest.MatchValue(value=notebook_id),
-                    )
-                ]
-            )
+            filter_param = self._notebook_filter(notebook_id)
 
-        # Search in Qdrant
-        logger.info(f"Executing search with limit: {limit}")
-        search_result = await self.qdrant_client.search(
+        responses = await self.qdrant_client.query_batch_points(
             collection_name=self.collection_name,
-            query_vector=query_embedding,
+            requests=[
+                self._query_request(vector, query, filter_param, limit, with_vectors, fields)
+                for query, vector in searches
+            ],
+        )
+
+        return [
+            [
+                self._format_result(
+                    scored_point.id,
+                    scored_point.score,
+                    scored_point.payload,
+                    self._dense_vector(scored_point.vector) if with_vectors else None,
+                )
+                for scored_point in response.points
+            ]
+            for response in responses
+        ]
+
+    def _query_request(
+        self,
+        vector: List[float],
+        query: Optional[str],
+        filter_param: Optional[rest.Filter],
+        limit: int,
+        with_vectors: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> rest.QueryRequest:
+        """Build the query for one search.
+
+        On hybrid collections the dense ranking and the BM25 ranking of the
+        query text are fused with reciprocal rank fusion.
+        """
+        with_vector = False
+        if with_vectors:
+            with_vector = [self.DENSE_VECTOR] if self._hybrid_collection else True
+        with_payload = self._payload_selector(fields)
+
+        if self._hybrid_collection and query:
+            indices, values = self.sparse_encoder.encode_query(query)
+            prefetch_limit = max(limit, self.hybrid_prefetch_limit)
+            return rest.QueryRequest(
+                prefetch=[
+                    rest.Prefetch(
+                        query=vector,
+                        using=self.DENSE_VECTOR,
+                        filter=filter_param,
+                        params=self._search_params(),
+                        limit=prefetch_limit,
+                    ),
+                    rest.Prefetch(
+                        query=rest.SparseVector(indices=indices, values=values),
+                        using=self.SPARSE_VECTOR,
+                        filter=filter_param,
+                        limit=prefetch_limit,
+                    ),
+                ],
+                query=rest.FusionQuery(fusion=rest.Fusion.RRF),
+                limit=limit,
+                with_payload=with_payload,
+                with_vector=with_vector,
+            )
+
+        return rest.QueryRequest(
+            query=vector,
+            using=self.DENSE_VECTOR if self._hybrid_collection else None,
+            filter=filter_param,
+            params=self._search_params(),
             limit=limit,
-            query_filter=filter_param,
+            with_payload=with_payload,
+            with_vector=with_vector,
+        )
+
+    def _payload_selector(self, fields: Optional[List[str]]) -> Any:
+        """Get the payload selector fetching only the given fields (all if None)."""
+        if fields is None:
+            return True
+        return rest.PayloadSelectorInclude(include=self._payload_fields(fields))
+
+    def _dense_vector(self, vector: Any) -> Optional[List[float]]:
+        """Get the dense embedding from a returned point vector in either layout."""
+        if isinstance(vector, dict):
+            return vector.get(self.DENSE_VECTOR)
+        return vector
+
+    def _search_params(self) -> rest.SearchParams:
+        """Get the HNSW and quantization parameters used for searches."""
+        return rest.SearchParams(
+            hnsw_ef=self.hnsw_ef,
+            # Rescore candidates found with quantized vectors using the original vectors
+            quantization=rest.QuantizationSearchParams(
+                rescore=True,
+                oversampling=self.quantization_oversampling,
+            ) if self.quantization else None,
         )
 
-        # Format results
-        results = []
-        for scored_point in search_result:
-            results.append({
-                "id": scored_point.id,
-                "score": scored_point.score,
-                "content_chunk": scored_point.payload.get("content_chunk"),
-                "notebook_id": scored_point.payload.get("notebook_id"),
-                "metadata": scored_point.payload.get("metadata"),
-                "url": scored_point.payload.get("url"),
-                "page_title": scored_point.payload.get("page_title"),
-            })
-
-        logger.info(f"Found {len(results)} matching results")
-        return results
-
-    async def get_all_chunks_by_notebook_id(self, notebook_id: str) -> List[Dict[str, Any]]:
-        """Get all chunks for a specific notebook ID.
+    async def iter_chunks_by_notebook_id(
+        self,
+        notebook_id: str,
+        page_size: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all chunks for a specific notebook ID in chunk_index order.
+
+        Pages through the notebook's points ordered by ``chunk_index`` so large
+        notebooks are never truncated or loaded into memory at once.
 
         Args:
             notebook_id: Notebook ID to retrieve chunks for
+            page_size: Number of points fetched per request (default: ``scroll_page_size``)
+            fields: Payload fields to fetch, e.g. ``["content_chunk"]`` (default: all)
 
-        Returns:
-            List of all chunks for the notebook with their metadata
+        Yields:
+            Chunks for the notebook with their metadata
         """
         if not self._initialized:
             await self.initialize()
-        logger.info(f"Retrieving all chunks for notebook: {notebook_id}")
-
-        # Set up filter for notebook_id
-        filter_param = rest.Filter(
-            must=[
-                rest.FieldCondition(
-                    key="notebook_id",
-                    match=rest.MatchValue(value=notebook_id),
-                )
-            ]
-        )
+        page_size = page_size or self.scroll_page_size
+        logger.info(f"Scrolling through all chunks for notebook: {notebook_id} (page size {page_size})")
+
+        filter_param = self._notebook_filter(notebook_id)
+        # chunk_index is always fetched, it positions the next page
+        with_payload = self._payload_selector(None if fields is None else [*fields, "chunk_index"])
+
+        # Ordered scrolling pages with start_from, which is inclusive. Points at the
+        # boundary chunk_index that were already yielded are skipped on the next page.
+        start_from = None
+        boundary_ids = set()
+        total = 0
+
+        while True:
+            limit = page_size + len(boundary_ids)
+            points, _ = await self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=filter_param,
+                limit=limit,
+                order_by=rest.OrderBy(
+                    key="chunk_index",
+                    direction=rest.Direction.ASC,
+                    start_from=start_from,
+                ),
+                with_payload=with_payload,
+                with_vectors=False,
+            )
 
-        # Use scroll to get all points for the notebook
-        logger.info(f"Scrolling through all chunks for notebook: {notebook_id}")
-        scroll_result = await self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=filter_param,
-            limit=10000,
-            with_payload=True,
-            with_vectors=False,
-        )
+            new_points = [point for point in points if point.id not in boundary_ids]
+            for point in new_points:
+                yield self._format_chunk(point.id, point.payload)
+            total += len(new_points)
+
+            if not new_points or len(points) < limit:
+                break
+
+            last_index = new_points[-1].payload.get("chunk_index", 0)
+            if last_index != start_from:
+                boundary_ids = set()
+            start_from = last_index
+            boundary_ids.update(
+                point.id for point in new_points
+                if point.payload.get("chunk_index", 0) == last_index
+            )
 
-        # Format results
-        results = []
-        for point in scroll_result[0]:
-            results.append({
-                "id": point.id,
-                "content_chunk": point.payload.get("content_chunk"),
-                "chunk_index": point.payload.get("chunk_index"),
-                "total_chunks": point.payload.get("total_chunks"),
-                "notebook_id": point.payload.get("notebook_id"),
-                "metadata": point.payload.get("metadata"),
-                "url": point.payload.get("url"),
-                "page_title": point.payload.get("page_title"),
-            })
-
-        # Sort by chunk_index to maintain order
-        results.sort(key=lambda x: x.get("chunk_index", 0))
-
-        logger.info(f"Retrieved {len(results)} chunks for notebook {notebook_id}")
-        return results
+        logger.info(f"Retrieved {total} chunks for notebook {notebook_id}")
 
     async def delete_by_notebook_id(self, notebook_id: str) -> int:
         """Delete all sources for a specific notebook ID.
@@ -332,28 +513,10 @@ class QdrantSourceStore:
             await self.initialize()
         logger.info(f"Deleting all sources for notebook: {notebook_id}")
 
-        filter_param = rest.Filter(
-            must=[
-                rest.FieldCondition(
-                    key="notebook_id",
-                    match=rest.MatchValue(value=notebook_id),
-                )
-            ]
-        )
-
         result = await self.qdrant_client.delete(
             collection_name=self.collection_name,
-            points_selector=rest.FilterSelector(filter=filter_param),
+            points_selector=rest.FilterSelector(filter=self._notebook_filter(notebook_id)),
         )
 
         logger.info(f"Deleted points for notebook {notebook_id}")
         return result.status
-
-# Create an instance without initialization
-qdrant_service = QdrantSourceStore(
-    qdrant_url=os.getenv("QDRANT_API_URL"),
-    qdrant_api_key=os.getenv("QDRANT_API_KEY"),
-    collection_name="notebook_sources",
-    embedding_model="text-embedding-3-small",
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-)
@@ -2,6 +2,7 @@
 Cloudflare R2 storage service.
 """
 
+import asyncio
 import os
 import boto3
 from typing import Optional
@@ -86,6 +87,71 @@ class R2Service:
             logger.error(error_msg)
             raise Exception(error_msg)
 
+    async def put_object(self, key: str, content: bytes, content_type: str = "application/octet-stream") -> str:
+        """
+        Upload a private object to R2, replacing any object with that key.
+
+        Args:
+            key: The object key, such as "tasks/<task_id>/result.json.gz"
+            content: The object content as bytes
+            content_type: MIME type of the content
+
+        Returns:
+            The object key
+        """
+        try:
+            # boto3 is blocking
+            await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=content,
+                ContentType=content_type,
+            )
+            return key
+        except ClientError as e:
+            error_msg = f"Failed to upload object {key} to R2: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg) from e
+
+    async def get_object(self, key: str) -> bytes:
+        """
+        Download an object from R2.
+
+        Args:
+            key: The object key
+
+        Returns:
+            Object content as bytes
+        """
+        def download() -> bytes:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            return response["Body"].read()
+
+        try:
+            return await asyncio.to_thread(download)
+        except ClientError as e:
+            error_msg = f"Failed to download object {key} from R2: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg) from e
+
+    async def delete_object(self, key: str) -> bool:
+        """
+        Delete an object from R2.
+
+        Args:
+            key: The object key
+
+        Returns:
+            bool: True if the deletion was successful
+        """
+        try:
+            await asyncio.to_thread(self.s3_client.delete_object, Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError as e:
+            logger.error(f"Failed to delete object {key} from R2: {str(e)}")
+            return False
+
     def get_public_url(self, file_key: str) -> str:
         """
         Get public URL for a file in R2.
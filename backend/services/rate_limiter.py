@@ -0,0 +1,287 @@
+# backend/services/rate_limiter.py
+"""
+Process-wide rate limiting for calls to rate limited APIs.
+
+AdaptiveRateLimiter combines:
+
+- token buckets for requests per minute and tokens per minute, so callers
+  wait locally instead of being rejected by the API;
+- a concurrency limit adjusted AIMD style: it grows by one after a run of
+  successful calls and halves when the API answers with rate limit or server
+  errors;
+- retries with exponential backoff and full jitter, honoring ``Retry-After``
+  on rate limit responses. A ``Retry-After`` pauses every caller, not just the
+  one that received it. Errors a retry cannot fix (client errors and
+  programming errors, see is_retryable_error) are raised at once.
+
+One limiter is shared by everything that calls the same API with the same
+key, see services.vector_store_factory.
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+from loguru import logger
+
+T = TypeVar("T")
+
+# Client errors that a retry cannot fix
+NON_RETRYABLE_STATUS_CODES = {400, 401, 403, 404, 422}
+
+# Errors caused by bugs or bad input, which a retry cannot fix
+NON_RETRYABLE_ERRORS = (TypeError, AttributeError, KeyError, NameError)
+
+# Timeouts and failed connections; the OpenAI client wraps its own in APIConnectionError
+CONNECTION_ERRORS = (TimeoutError, ConnectionError, openai.APIConnectionError)
+
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """Get the HTTP status code of an API error (OpenAI, httpx, aiohttp), if any."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is None:
+        # aiohttp.ClientResponseError
+        status_code = getattr(error, "status", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def _unwrap(error: BaseException) -> BaseException:
+    """Get the cause of an error wrapped in a plain Exception (``raise Exception(...) from e``)."""
+    while type(error) is Exception and error.__cause__ is not None:
+        error = error.__cause__
+    return error
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Classify an error as transient (worth retrying) or permanent.
+
+    Timeouts, connection errors, rate limits and server errors are retryable;
+    client errors and programming errors are not. Other errors, such as LLM
+    output failing validation, are retried.
+    """
+    error = _unwrap(error)
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code not in NON_RETRYABLE_STATUS_CODES
+    return not isinstance(error, NON_RETRYABLE_ERRORS)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether an error signals an overloaded API: rate limits, server errors, timeouts and failed connections."""
+    error = _unwrap(error)
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    status_code = get_status_code(error)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``capacity`` tokens per minute."""
+
+    def __init__(self, capacity: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            capacity: Tokens available per minute, also the maximum burst
+        """
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Wait until ``amount`` tokens are available and take them.
+
+        Requests larger than the capacity wait for a full bucket instead of
+        waiting forever. Waiters are served in arrival order.
+        """
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) * 60 / self.capacity)
+
+
+class AdaptiveRateLimiter:
+    """Rate, token and concurrency limiter with adaptive concurrency and retries."""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        increase_after: int = 10,
+        name: str = "API",
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Maximum requests started per minute (None: unlimited)
+            tokens_per_minute: Maximum tokens sent per minute (None: unlimited)
+            max_concurrency: Upper bound (and starting value) of concurrent calls
+            min_concurrency: Lower bound of concurrent calls
+            max_retries: Attempts per call before giving up
+            base_delay: Backoff delay after the first failure, doubled per attempt
+            max_delay: Maximum backoff delay
+            increase_after: Consecutive successes before concurrency grows by one
+            name: Name used in log messages
+        """
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.increase_after = increase_after
+        self.name = name
+
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self._in_flight = 0
+        self._consecutive_successes = 0
+        self._paused_until = 0.0
+        self._lowered_at = 0.0
+        self._condition = asyncio.Condition()
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Get the delay requested by a ``Retry-After`` (or ``retry-after-ms``) header, in seconds."""
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if not headers:
+            return None
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except ValueError:
+            # HTTP-date values are rare for rate limits; fall back to backoff
+            pass
+        return None
+
+    async def _acquire_slot(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.concurrency)
+            self._in_flight += 1
+
+    async def _release_slot(self) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    async def _wait_for_pause(self) -> None:
+        delay = self._paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until - time.monotonic()
+
+    async def _on_success(self) -> None:
+        self.successes += 1
+        self._consecutive_successes += 1
+        if self._consecutive_successes >= self.increase_after and self.concurrency < self.max_concurrency:
+            async with self._condition:
+                self.concurrency += 1
+                self._consecutive_successes = 0
+                self._condition.notify_all()
+            logger.debug(f"{self.name} concurrency raised to {self.concurrency}")
+
+    def _on_overload(self) -> None:
+        self._consecutive_successes = 0
+        # Calls in flight when the API started pushing back fail together; count them once
+        now = time.monotonic()
+        if now - self._lowered_at < self.base_delay:
+            return
+        self._lowered_at = now
+        previous = self.concurrency
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+        if self.concurrency != previous:
+            logger.warning(f"{self.name} concurrency lowered from {previous} to {self.concurrency}")
+
+    async def run(self, operation: Callable[[], Awaitable[T]], tokens: int = 0, description: str = "Request") -> T:
+        """Run an API call within the limits, retrying failed attempts.
+
+        Args:
+            operation: Zero-argument callable returning a fresh awaitable per attempt
+            tokens: Tokens the call consumes, counted against tokens per minute
+            description: Human readable description used in log messages
+
+        Returns:
+            The result of the operation
+
+        Raises:
+            Exception: The operation's error, at once if it is not retryable
+                (see is_retryable_error), otherwise after ``max_retries`` attempts
+        """
+        attempt = 0
+        while True:
+            await self._wait_for_pause()
+            if self.request_bucket:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket and tokens:
+                await self.token_bucket.acquire(tokens)
+
+            await self._acquire_slot()
+            try:
+                result = await operation()
+            except Exception as e:
+                error = e
+            else:
+                await self._on_success()
+                return result
+            finally:
+                await self._release_slot()
+
+            attempt += 1
+            self.failures += 1
+            if not is_retryable_error(error):
+                logger.error(f"{description} failed, not retrying: {error!r}")
+                raise error
+
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.random()
+            if get_status_code(error) == 429:
+                self.rate_limited += 1
+                retry_after = self._retry_after(error)
+                if retry_after is not None:
+                    delay = retry_after + random.uniform(0, self.base_delay)
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            if is_overload_error(error):
+                self._on_overload()
+
+            if attempt >= self.max_retries:
+                logger.error(f"{description} failed after {attempt} attempts: {error}")
+                raise error
+            logger.warning(f"{description} failed (attempt {attempt}/{self.max_retries}), retrying in {delay:.1f}s: {error}")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, int]:
+        """Get limiter statistics."""
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self._in_flight,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+        }
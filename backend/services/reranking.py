@@ -0,0 +1,73 @@
+# backend/services/reranking.py
+"""
+Redundancy-aware selection of search results.
+
+Notebooks often hold the same passage several times (a blog post and the
+pages it was written from), so the top hits of a search tend to be near
+copies of each other. select_diverse picks results with maximal marginal
+relevance (MMR): each pick trades relevance against similarity to the
+results already picked, and candidates nearly identical to a picked result
+are dropped altogether.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+def select_diverse(
+    candidates: List[Dict[str, Any]],
+    limit: int,
+    lambda_mult: float = 0.7,
+    duplicate_threshold: float = 0.95,
+) -> List[Dict[str, Any]]:
+    """Select up to ``limit`` relevant, mutually dissimilar results.
+
+    Args:
+        candidates: Search results with ``score`` and ``vector``, best first
+        limit: Maximum number of results to select
+        lambda_mult: Weight of relevance against diversity, from 0 (only
+            diversity) to 1 (only relevance)
+        duplicate_threshold: Cosine similarity above which a candidate counts
+            as a duplicate of a selected result and is dropped
+
+    Returns:
+        Selected results in selection order, without their vectors
+    """
+    candidates = [candidate for candidate in candidates if candidate.get("vector") is not None]
+    if not candidates or limit <= 0:
+        return []
+
+    vectors = np.asarray([candidate["vector"] for candidate in candidates], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+    similarity = vectors @ vectors.T
+
+    # Normalize scores to [0, 1] so dense and fused (RRF) scores weigh the same
+    scores = np.asarray([candidate["score"] for candidate in candidates], dtype=np.float32)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+
+    available = np.ones(len(candidates), dtype=bool)
+    # Highest similarity of each candidate to any selected result
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    selected: List[int] = []
+
+    while len(selected) < limit and available.any():
+        if selected:
+            mmr = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            mmr = relevance.copy()
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        # Collapse near duplicates of the new pick
+        available &= redundancy < duplicate_threshold
+
+    return [
+        {key: value for key, value in candidates[index].items() if key != "vector"}
+        for index in selected
+    ]
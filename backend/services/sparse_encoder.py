@@ -0,0 +1,80 @@
+# backend/services/sparse_encoder.py
+"""
+Sparse lexical vectors for hybrid search.
+
+BM25SparseEncoder turns text into sparse vectors holding the BM25 term
+frequency component of each token. Tokens are hashed into a fixed index
+space, so no vocabulary has to be stored or shared between processes. The
+inverse document frequency half of BM25 is applied by Qdrant at query time
+(sparse vectors configured with the IDF modifier), which keeps document
+vectors valid as the collection grows.
+"""
+
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+_TOKEN = re.compile(r"\w+(?:[.'’-]\w+)*")
+
+# Very common English words that carry no lexical signal
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in into is it its
+may might me my no not of on or our she should so than that the their them then there these they this
+those to us was we were what when where which who whom why will with would you your
+""".split())
+
+
+class BM25SparseEncoder:
+    """Encodes text as hashed BM25 term frequency sparse vectors."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, average_length: float = 256.0):
+        """
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization strength
+            average_length: Expected average document length in tokens
+        """
+        self.k1 = k1
+        self.b = b
+        self.average_length = average_length
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Split text into lowercase word tokens, keeping numbers, versions and acronyms intact."""
+        return [
+            token for token in _TOKEN.findall(text.casefold())
+            if token not in STOPWORDS
+        ]
+
+    @staticmethod
+    def token_index(token: str) -> int:
+        """Map a token to its sparse vector index."""
+        return zlib.crc32(token.encode("utf-8"))
+
+    def _to_sparse(self, weights: Dict[int, float]) -> Tuple[List[int], List[float]]:
+        indices = sorted(weights)
+        return indices, [weights[index] for index in indices]
+
+    def encode_document(self, text: str) -> Tuple[List[int], List[float]]:
+        """Encode a stored chunk.
+
+        Returns:
+            Sorted indices and their BM25 term frequency weights
+        """
+        tokens = self.tokenize(text)
+        length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.average_length)
+        weights: Dict[int, float] = {}
+        for token, frequency in Counter(tokens).items():
+            index = self.token_index(token)
+            # Hash collisions simply add up
+            weights[index] = weights.get(index, 0.0) + frequency * (self.k1 + 1) / (frequency + length_norm)
+        return self._to_sparse(weights)
+
+    def encode_query(self, text: str) -> Tuple[List[int], List[float]]:
+        """Encode a search query, weighting each distinct term once.
+
+        Returns:
+            Sorted indices and their weights
+        """
+        return self._to_sparse({self.token_index(token): 1.0 for token in set(self.tokenize(text))})
@@ -0,0 +1,208 @@
+# backend/services/task_events.py
+"""
+Progress events of running tasks, streamed to clients as server-sent events.
+
+Tasks publish events (status changes, stage transitions and progress
+counters) on the process-wide ``task_events`` bus. Subscribers in the same
+process, such as a ``GET /research/{task_id}/events`` stream served next to
+the embedded worker, receive them immediately. Every event is also sent with
+Postgres ``NOTIFY`` on the ``task_events`` channel, and each API process
+``LISTEN``s on a dedicated connection, so events of tasks running in
+standalone workers reach the streams of every API process.
+
+Events are best effort: a subscriber that falls behind loses its oldest
+events, and notifications sent while a listener reconnects are lost. The
+event stream therefore re-reads the task status when it has been idle for a
+while, so the final status is never missed.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import asyncpg
+from loguru import logger
+from sqlalchemy import text
+
+from .db_service import DATABASE_URL, get_db_session
+
+# Postgres channel carrying the events between processes
+CHANNEL = "task_events"
+# NOTIFY payloads must be shorter than 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+MAX_ERROR_LENGTH = 1000
+
+# Task statuses after which no more events follow
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Format an event as a server-sent event message."""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+class TaskEventBus:
+    """In-process pub/sub of task events, fanned out across processes with LISTEN/NOTIFY."""
+
+    def __init__(self, max_queue_size: int = 256, reconnect_delay: float = 5.0):
+        """
+        Initialize the event bus.
+
+        Args:
+            max_queue_size: Events buffered per subscriber (and for sending) before the oldest are dropped
+            reconnect_delay: Seconds between attempts to reconnect the listener
+        """
+        # Identifies this process's notifications, which it already delivered locally
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.max_queue_size = max_queue_size
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, listen: bool = True) -> None:
+        """Start sending events to other processes, and receiving theirs.
+
+        Args:
+            listen: Whether to receive events of other processes (only needed where clients subscribe)
+        """
+        if self._tasks:
+            return
+        self._outbox = asyncio.Queue(self.max_queue_size)
+        self._tasks.append(asyncio.create_task(self._send_loop()))
+        if listen:
+            self._tasks.append(asyncio.create_task(self._listen_loop()))
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Send the events still queued (up to ``timeout`` seconds) and stop."""
+        if self._outbox is not None and not self._outbox.empty():
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._outbox.join()
+            except TimeoutError:
+                logger.warning(f"Dropping {self._outbox.qsize()} unsent task events")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._outbox = None
+
+    def publish(self, task_id: str, event_type: str, **data: Any) -> None:
+        """Publish an event of a task.
+
+        Does not block: local subscribers get the event right away, and it is
+        sent to other processes in the background.
+
+        Args:
+            task_id: The task the event belongs to
+            event_type: ``status``, ``stage`` or ``progress``
+            **data: The event's data, such as ``status="completed"``
+        """
+        if isinstance(data.get("error"), str):
+            data["error"] = data["error"][:MAX_ERROR_LENGTH]
+        event = {
+            "task_id": task_id,
+            "type": event_type,
+            "data": data,
+            "time": datetime.now(timezone.utc).isoformat(),
+        }
+        self._deliver(event)
+        if self._outbox is not None:
+            self._put(self._outbox, event)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        """Queue an event, dropping the oldest one if the queue is full."""
+        if queue.full():
+            queue.get_nowait()
+            queue.task_done()
+        queue.put_nowait(event)
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(event["task_id"], ()):
+            self._put(queue, event)
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Receive the events of a task while in the context.
+
+        Args:
+            task_id: The task to receive events of
+
+        Yields:
+            Queue the task's events are put on
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.max_queue_size)
+        self._subscribers[task_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers[task_id]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[task_id]
+
+    async def _send_loop(self) -> None:
+        """Send queued events to other processes with NOTIFY, in batches."""
+        while True:
+            batch = [await self._outbox.get()]
+            while not self._outbox.empty() and len(batch) < 100:
+                batch.append(self._outbox.get_nowait())
+            try:
+                async with get_db_session() as session:
+                    for event in batch:
+                        payload = json.dumps({**event, "origin": self.origin}, default=str)
+                        if len(payload.encode("utf-8")) > MAX_PAYLOAD_BYTES:
+                            logger.warning(f"Not notifying {event['type']} event of task {event['task_id']}: payload too large")
+                            continue
+                        await session.execute(
+                            text("SELECT pg_notify(:channel, :payload)"),
+                            {"channel": CHANNEL, "payload": payload}
+                        )
+                    await session.commit()
+            except Exception as e:
+                logger.warning(f"Failed to notify {len(batch)} task events: {e}")
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed task event: {payload[:200]}")
+            return
+        if event.pop("origin", None) == self.origin:
+            return
+        self._deliver(event)
+
+    async def _listen_loop(self) -> None:
+        """Receive the events of other processes, reconnecting when the connection is lost."""
+        # A dedicated asyncpg connection, kept out of the SQLAlchemy pool
+        dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                terminated = asyncio.Event()
+                connection.add_termination_listener(lambda _: terminated.set())
+                await connection.add_listener(CHANNEL, self._on_notification)
+                logger.info(f"Listening for task events on channel {CHANNEL}")
+                await terminated.wait()
+                logger.warning("Task event listener connection lost")
+            except Exception as e:
+                logger.warning(f"Task event listener failed: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+# Singleton instance
+task_events = TaskEventBus()
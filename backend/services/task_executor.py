@@ -0,0 +1,325 @@
+# backend/services/task_executor.py
+"""
+Generic execution of tasks: retries, deadlines, stage timings and cleanup.
+
+Task types register a runner with TaskExecutor together with their hooks,
+deadline, per-stage deadlines and retry policy. The executor then runs a task:
+
+- it marks the task running and calls the type's ``on_start`` hook;
+- it runs attempts under the type's deadline, retrying errors classified as
+  retryable with exponential backoff and full jitter (InvalidTaskError, for
+  tasks whose input cannot be run, never is);
+- when attempts run out on a retryable error and the job queue will run the
+  job again, the error is raised so the queue retries the task later (after
+  ``on_retry``); otherwise the task is marked failed and ``on_failure`` cleans
+  up;
+- on success it stores the result and calls ``on_success``;
+- if storing the task's status, result or error finds the task cancelled
+  (see task_repository), it stops there without calling further hooks.
+
+Runners (and the agents and services they call) split their work with
+``task_stage(name)``, which applies the deadline registered for the stage and
+records how long it took. Timings of every attempt are saved with the task.
+Status changes, stage transitions and the counters reported with
+``task_progress`` are published as task events (see services.task_events).
+A stage or attempt that times out also stops the crew threads it started
+(see services.cancellation), so a hung LLM or TTS call frees its slot.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from .cancellation import cancellation_scope
+from .rate_limiter import is_retryable_error
+from .task_repository import task_repository
+from .task_events import task_events
+
+TaskRunner = Callable[[Dict[str, Any]], Awaitable[Any]]
+TaskHook = Callable[..., Awaitable[None]]
+
+
+class InvalidTaskError(ValueError):
+    """Raised by a runner when the task's input cannot be run; never retried."""
+
+
+class StageTimeoutError(TimeoutError):
+    """Raised when a task stage (or attempt) exceeds its deadline."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage '{stage}' timed out after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def is_retryable_task_error(error: BaseException) -> bool:
+    """Classify a failed attempt with is_retryable_error, never retrying InvalidTaskError."""
+    return not isinstance(error, InvalidTaskError) and is_retryable_error(error)
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how soon a failed task attempt is retried in-process."""
+
+    max_attempts: int = 1
+    base_delay: float = 5.0
+    max_delay: float = 60.0
+    is_retryable: Callable[[BaseException], bool] = is_retryable_task_error
+
+    def get_delay(self, attempt: int) -> float:
+        """Backoff before the attempt after ``attempt``: exponential with full jitter."""
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.random()
+
+
+@dataclass
+class TaskDefinition:
+    """A registered task type."""
+
+    name: str
+    run: TaskRunner
+    timeout: Optional[float] = None
+    stage_timeouts: Dict[str, float] = field(default_factory=dict)
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    on_start: Optional[TaskHook] = None
+    on_success: Optional[TaskHook] = None
+    on_retry: Optional[TaskHook] = None
+    on_failure: Optional[TaskHook] = None
+
+
+@dataclass
+class TaskExecution:
+    """State of a task being executed, shared with task_stage."""
+
+    task_id: str
+    definition: TaskDefinition
+    attempt: int = 0
+    timings: List[Dict[str, Any]] = field(default_factory=list)
+    progress: Dict[str, int] = field(default_factory=dict)
+
+
+_current_execution: ContextVar[Optional[TaskExecution]] = ContextVar("task_execution", default=None)
+
+
+@asynccontextmanager
+async def task_stage(name: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+    """Run a stage of the current task under its deadline and record its duration.
+
+    Outside of a task execution this only logs the duration.
+
+    Args:
+        name: Name of the stage
+        timeout: Deadline in seconds (default: the one registered for the stage, if any)
+
+    Raises:
+        StageTimeoutError: If the stage exceeds its deadline
+    """
+    execution = _current_execution.get()
+    if timeout is None and execution is not None:
+        timeout = execution.definition.stage_timeouts.get(name)
+
+    stage_event = threading.Event()
+    deadline = asyncio.timeout(timeout)
+    outcome = "completed"
+    started = time.monotonic()
+    if execution is not None:
+        task_events.publish(execution.task_id, "stage", stage=name, outcome="started", attempt=execution.attempt)
+    try:
+        with cancellation_scope(stage_event):
+            async with deadline:
+                yield
+    except TimeoutError as e:
+        if not deadline.expired():
+            # Raised by the stage itself, or by a nested stage's deadline
+            outcome = "timed_out" if isinstance(e, StageTimeoutError) else "failed"
+            raise
+        outcome = "timed_out"
+        # Stop the crew threads of the stage, which the timeout cannot interrupt
+        stage_event.set()
+        raise StageTimeoutError(name, timeout) from e
+    except BaseException:
+        outcome = "failed"
+        raise
+    finally:
+        seconds = round(time.monotonic() - started, 3)
+        logger.info(f"Stage {name} {outcome} in {seconds}s")
+        if execution is not None:
+            timing = {
+                "stage": name,
+                "attempt": execution.attempt,
+                "seconds": seconds,
+                "outcome": outcome,
+            }
+            execution.timings.append(timing)
+            task_events.publish(execution.task_id, "stage", **timing)
+
+
+def task_progress(**counters: int) -> None:
+    """Report progress counters of the current task, such as ``pages_scraped=3``.
+
+    Counters are absolute values; every report publishes all counters of the
+    task so far. Outside of a task execution this does nothing.
+    """
+    execution = _current_execution.get()
+    if execution is None:
+        return
+    execution.progress.update(counters)
+    task_events.publish(execution.task_id, "progress", **execution.progress)
+
+
+class TaskExecutor:
+    """Registry of task types and the loop executing them."""
+
+    def __init__(self):
+        self._definitions: Dict[str, TaskDefinition] = {}
+
+    def register(
+        self,
+        name: str,
+        run: TaskRunner,
+        timeout: Optional[float] = None,
+        stage_timeouts: Optional[Dict[str, float]] = None,
+        retry: Optional[RetryPolicy] = None,
+        on_start: Optional[TaskHook] = None,
+        on_success: Optional[TaskHook] = None,
+        on_retry: Optional[TaskHook] = None,
+        on_failure: Optional[TaskHook] = None,
+    ) -> None:
+        """Register a task type.
+
+        Args:
+            name: The task type
+            run: Coroutine function running one attempt on the task dict, returning its result
+            timeout: Deadline of one attempt in seconds
+            stage_timeouts: Deadlines of the task's stages by stage name
+            retry: In-process retry policy (default: a single attempt)
+            on_start: Called with the task before the first attempt
+            on_success: Called with the task and its result after it was stored
+            on_retry: Called with the task and error before the job queue retries the task
+            on_failure: Called with the task and error after it was marked failed
+        """
+        self._definitions[name] = TaskDefinition(
+            name=name,
+            run=run,
+            timeout=timeout,
+            stage_timeouts=stage_timeouts or {},
+            retry=retry or RetryPolicy(),
+            on_start=on_start,
+            on_success=on_success,
+            on_retry=on_retry,
+            on_failure=on_failure,
+        )
+
+    async def execute(self, task_type: str, task: Dict[str, Any], final_attempt: bool = True) -> None:
+        """Execute a task of a registered type.
+
+        Args:
+            task_type: The task type
+            task: The task, as returned by task_repository.get_task
+            final_attempt: Whether the job queue will not run the task again
+
+        Raises:
+            ValueError: If the task type is not registered
+            Exception: The last retryable error, if the job queue will retry the task
+        """
+        definition = self._definitions.get(task_type)
+        if definition is None:
+            raise ValueError(f"Unsupported task type: {task_type}")
+
+        task_id = task["task_id"]
+        execution = TaskExecution(task_id=task_id, definition=definition)
+        token = _current_execution.set(execution)
+        try:
+            with logger.contextualize(task_id=task_id):
+                await self._execute(definition, execution, task, final_attempt)
+        finally:
+            _current_execution.reset(token)
+            try:
+                await task_repository.update_task_timings(task_id, execution.timings)
+            except Exception as e:
+                logger.warning(f"Could not save stage timings of task {task_id}: {e}")
+
+    async def fail(self, task_type: str, task: Dict[str, Any], error: Exception) -> None:
+        """Mark a task failed without running it, e.g. when its job was interrupted too often.
+
+        Args:
+            task_type: The task type
+            task: The task, as returned by task_repository.get_task
+            error: Why the task failed, passed to the type's ``on_failure`` hook
+
+        Raises:
+            ValueError: If the task type is not registered
+        """
+        definition = self._definitions.get(task_type)
+        if definition is None:
+            raise ValueError(f"Unsupported task type: {task_type}")
+        with logger.contextualize(task_id=task["task_id"]):
+            await self._fail(definition, task, error)
+
+    async def _fail(self, definition: TaskDefinition, task: Dict[str, Any], error: Exception) -> None:
+        """Store a task's error and run the type's failure cleanup."""
+        task_id = task["task_id"]
+        if not await task_repository.update_task_error(task_id, str(error)):
+            logger.info(f"{definition.name} task {task_id} was cancelled, not marking it failed")
+            return
+        if definition.on_failure is not None:
+            await definition.on_failure(task, error)
+        task_events.publish(task_id, "status", status="failed", error=str(error))
+
+    async def _execute(
+        self,
+        definition: TaskDefinition,
+        execution: TaskExecution,
+        task: Dict[str, Any],
+        final_attempt: bool,
+    ) -> None:
+        """Run the attempts of a task and store its outcome."""
+        task_type = definition.name
+        task_id = execution.task_id
+        if not await task_repository.update_task_status(task_id, "running"):
+            logger.info(f"{task_type} task {task_id} was cancelled or already finished, not running it")
+            return
+        task_events.publish(task_id, "status", status="running")
+        if definition.on_start is not None:
+            await definition.on_start(task)
+
+        policy = definition.retry
+        while True:
+            execution.attempt += 1
+            logger.info(f"{task_type} task {task_id} started (attempt {execution.attempt}/{policy.max_attempts})")
+            try:
+                async with task_stage("attempt", timeout=definition.timeout):
+                    result = await definition.run(task)
+            except Exception as e:
+                retryable = policy.is_retryable(e)
+                if retryable and execution.attempt < policy.max_attempts:
+                    delay = policy.get_delay(execution.attempt)
+                    logger.warning(f"{task_type} task {task_id} failed (attempt {execution.attempt}/{policy.max_attempts}), retrying in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+                    continue
+
+                if retryable and not final_attempt:
+                    logger.warning(f"{task_type} task {task_id} failed, leaving it to the job queue to retry: {e}")
+                    task_events.publish(task_id, "status", status="queued", retrying=True, error=str(e))
+                    if definition.on_retry is not None:
+                        await definition.on_retry(task, e)
+                    raise
+
+                logger.opt(exception=True).error(f"{task_type} task {task_id} failed after {execution.attempt} attempts: {e}")
+                await self._fail(definition, task, e)
+                return
+
+            if not await task_repository.update_task_result(task_id, result, "completed"):
+                logger.info(f"{task_type} task {task_id} was cancelled, discarding its result")
+                return
+            if definition.on_success is not None:
+                await definition.on_success(task, result)
+            task_events.publish(task_id, "status", status="completed")
+            logger.success(f"{task_type} task {task_id} completed successfully")
+            return
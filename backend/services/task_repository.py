@@ -1,15 +1,31 @@
 """
 Repository module for task-related database operations.
+
+Status, result and error writes leave cancelled tasks alone, so a task
+finishing while it is being cancelled cannot overwrite the cancellation.
 """
 
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
-from sqlalchemy import select, update
+from sqlalchemy import exists, or_, select, update
 from loguru import logger
 
-from models.db import Task
+from models.db import Task, TaskJob
 from .db_service import get_db_session
+from .artifact_store import artifact_store
+
+# Statuses a task keeps once it reached them
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _is_cancelled():
+    """Condition matching cancelled tasks, including those whose job was cancelled but not yet the task."""
+    return or_(
+        Task.status == "cancelled",
+        exists().where(TaskJob.task_id == Task.id, TaskJob.status == "cancelled"),
+    )
+
 
 class TaskRepository:
     """Repository for task-related database operations."""
@@ -43,21 +59,40 @@ class TaskRepository:
             logger.info(f"Created task {task.id} for notebook {notebook_id}")
             return task.id
 
+    @staticmethod
+    async def get_task(task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a task by ID.
+
+        Args:
+            task_id: The ID of the task
+
+        Returns:
+            The task as a dict, or None if it does not exist
+        """
+        async with get_db_session() as session:
+            task = await session.get(Task, task_id)
+            return task.to_dict() if task else None
+
     @staticmethod
     async def update_task_status(task_id: str, status: str) -> bool:
-        """Update the status of a task.
+        """Update the status of a task that has not finished yet.
+
+        Only ``cancelled`` can be set on a task whose job was cancelled.
 
         Args:
             task_id: The ID of the task
             status: The new status
 
         Returns:
-            bool: True if the task was updated, False otherwise
+            bool: True if the task was updated, False if it does not exist, finished or was cancelled
         """
+        conditions = [Task.id == task_id, Task.status.not_in(FINAL_STATUSES)]
+        if status != "cancelled":
+            conditions.append(~_is_cancelled())
         async with get_db_session() as session:
             result = await session.execute(
                 update(Task)
-                .where(Task.id == task_id)
+                .where(*conditions)
                 .values(status=status)
                 .returning(Task.id)
             )
@@ -66,7 +101,7 @@ class TaskRepository:
             if updated:
                 logger.info(f"Updated task {task_id} status to {status}")
                 return True
-            logger.warning(f"Failed to update task {task_id} status")
+            logger.warning(f"Not updating task {task_id} status to {status}: it does not exist, finished or was cancelled")
             return False
 
     @staticmethod
@@ -74,38 +109,50 @@ class TaskRepository:
                                status: str = "completed") -> bool:
         """Update the result of a task.
 
+        Large fields of the result are stored through the storage backend,
+        keeping only a manifest in the row (see services.artifact_store). They
+        are deleted again if the row is not updated.
+
         Args:
             task_id: The ID of the task
             result: The task result
             status: The new status (default: "completed")
 
         Returns:
-            bool: True if the task was updated, False otherwise
+            bool: True if the task was updated, False if it does not exist or was cancelled
         """
-        async with get_db_session() as session:
-            update_values = {
-                "status": status,
-                "result": result,
-            }
-
-            if status == "completed":
-                update_values["completed_at"] = datetime.now()
-            elif status == "failed":
-                update_values["failed_at"] = datetime.now()
-
-            result = await session.execute(
-                update(Task)
-                .where(Task.id == task_id)
-                .values(**update_values)
-                .returning(Task.id)
-            )
-            await session.commit()
-            updated = result.scalar_one_or_none()
-            if updated:
-                logger.info(f"Updated task {task_id} with result and status {status}")
-                return True
-            logger.warning(f"Failed to update task {task_id} result")
-            return False
+        manifest = await artifact_store.offload(task_id, result)
+        # Offloaded by this call, so nothing else refers to them if the row is not updated
+        uploaded = manifest if manifest is not result else None
+        update_values = {
+            "status": status,
+            "result": manifest,
+        }
+
+        if status == "completed":
+            update_values["completed_at"] = datetime.now()
+        elif status == "failed":
+            update_values["failed_at"] = datetime.now()
+
+        try:
+            async with get_db_session() as session:
+                updated = (await session.execute(
+                    update(Task)
+                    .where(Task.id == task_id, ~_is_cancelled())
+                    .values(**update_values)
+                    .returning(Task.id)
+                )).scalar_one_or_none()
+                await session.commit()
+        except Exception:
+            await artifact_store.delete(uploaded)
+            raise
+
+        if updated:
+            logger.info(f"Updated task {task_id} with result and status {status}")
+            return True
+        logger.warning(f"Not updating task {task_id} result: it does not exist or was cancelled")
+        await artifact_store.delete(uploaded)
+        return False
 
     @staticmethod
     async def update_task_error(task_id: str, error: str) -> bool:
@@ -116,12 +163,12 @@ class TaskRepository:
             error: The error message
 
         Returns:
-            bool: True if the task was updated, False otherwise
+            bool: True if the task was updated, False if it does not exist or was cancelled
         """
         async with get_db_session() as session:
             result = await session.execute(
                 update(Task)
-                .where(Task.id == task_id)
+                .where(Task.id == task_id, ~_is_cancelled())
                 .values(
                     status="failed",
                     error=error,
@@ -134,8 +181,32 @@ class TaskRepository:
             if updated:
                 logger.info(f"Updated task {task_id} with error")
                 return True
-            logger.warning(f"Failed to update task {task_id} error")
+            logger.warning(f"Not updating task {task_id} error: it does not exist or was cancelled")
+            return False
+
+    @staticmethod
+    async def update_task_timings(task_id: str, timings: List[Dict[str, Any]]) -> bool:
+        """Append stage timings to a task.
+
+        Timings of earlier runs of the task (by the job queue) are kept.
+
+        Args:
+            task_id: The ID of the task
+            timings: The stage timings of the run
+
+        Returns:
+            bool: True if the task was updated, False otherwise
+        """
+        if not timings:
             return False
+        async with get_db_session() as session:
+            task = await session.get(Task, task_id, with_for_update=True)
+            if task is None:
+                logger.warning(f"Failed to update task {task_id} stage timings")
+                return False
+            task.stage_timings = [*(task.stage_timings or []), *timings]
+            await session.commit()
+            return True
 
 
 # Singleton instance
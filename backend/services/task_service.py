@@ -1,20 +1,280 @@
 import asyncio
-from typing import Dict, Optional, List, Any
+import hashlib
+import json
+import math
+from typing import Dict, Optional, List, Any, Set, Tuple
 from loguru import logger
 from sqlalchemy import select
 
 from agents import topic_research_agent, sources_research_agent
 from models.db import NotebookProcessingStatusValue, Task
+from models.task_models import ResearchSource
+from config.settings import settings
 from .task_repository import task_repository
+from .job_queue import job_queue
 from .notebook_repository import notebook_repository
-from .qdrant_service import qdrant_service
+from .vector_store_factory import vector_store
 from .audio_overview_service import audio_overview_service
+from .checkpoint_repository import TaskCheckpoints, checkpoint_repository
+from .background_ingestion import BackgroundIngestion
+from .cancellation import is_cancelled
+from .task_executor import InvalidTaskError, RetryPolicy, TaskExecutor, task_progress, task_stage
+from .task_events import task_events
+from .artifact_store import artifact_store
 from .db_service import get_db_session
 
+class TaskQueueFullError(Exception):
+    """Raised when a task is submitted while the task queue is full."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SourceEmbeddingError(Exception):
+    """Raised when sources of a notebook could still not be embedded after retries."""
+
+    def __init__(self, notebook_id: str, source_keys: List[str], errors: List[str]):
+        super().__init__(
+            f"Failed to embed {len(source_keys)} sources for notebook {notebook_id}: "
+            f"{', '.join(source_keys)} (first error: {errors[0] if errors else 'unknown'})"
+        )
+        self.notebook_id = notebook_id
+        self.source_keys = source_keys
+        self.errors = errors
+
+
 class TaskManager:
 
-    async def _delete_notebook_data(self, notebook_id: str) -> None:
-        """Delete FAQs and embeddings for a notebook.
+    # Job types in the task queue
+    RESEARCH = "research"
+    AUDIO_OVERVIEW = "audio_overview"
+    MINDMAP = "mindmap"
+
+    # Assumed run time of a task type without completed tasks to average
+    DEFAULT_TASK_SECONDS = 300
+
+    # Fields of a task status, selectable with GET /research/{task_id}?fields=
+    STATUS_FIELDS = (
+        "notebook_id", "topic", "sources", "status", "created_at",
+        "completed_at", "failed_at", "result", "error", "stage_timings",
+    )
+
+    # Deadlines of task stages in seconds; a stage exceeding its deadline fails the attempt
+    RESEARCH_STAGE_TIMEOUTS = {
+        "planning": 300,
+        "link_collection": 600,
+        "scraping": 1200,
+        "file_conversion": 600,
+        "research_crew": 900,
+        "content_crew": 900,
+        "embedding": 600,
+    }
+    AUDIO_OVERVIEW_STAGE_TIMEOUTS = {
+        "transcript": 900,
+        "tts": 900,
+        "upload": 300,
+    }
+    MINDMAP_STAGE_TIMEOUTS = {
+        "mindmap_crew": 600,
+    }
+
+    def __init__(self):
+        # Worker embedded in this process, woken up when a task is submitted
+        self.worker = None
+        # Tasks of a type running at once across all workers
+        self.max_running_by_type = {
+            self.RESEARCH: settings.MAX_RUNNING_RESEARCH_TASKS,
+            self.AUDIO_OVERVIEW: settings.MAX_RUNNING_AUDIO_OVERVIEW_TASKS,
+            self.MINDMAP: settings.MAX_RUNNING_MINDMAP_TASKS,
+        }
+
+        retry = RetryPolicy(
+            max_attempts=settings.TASK_MAX_ATTEMPTS,
+            base_delay=settings.TASK_RETRY_BASE_DELAY_SECONDS,
+        )
+        self.executor = TaskExecutor()
+        self.executor.register(
+            self.RESEARCH,
+            self._run_research_task,
+            timeout=settings.RESEARCH_TASK_TIMEOUT_SECONDS,
+            stage_timeouts=self.RESEARCH_STAGE_TIMEOUTS,
+            retry=retry,
+            on_start=self._on_research_started,
+            on_success=self._on_research_completed,
+            on_retry=self._on_research_retry,
+            on_failure=self._on_research_failed,
+        )
+        self.executor.register(
+            self.AUDIO_OVERVIEW,
+            self._run_audio_overview_task,
+            timeout=settings.AUDIO_OVERVIEW_TASK_TIMEOUT_SECONDS,
+            stage_timeouts=self.AUDIO_OVERVIEW_STAGE_TIMEOUTS,
+            retry=retry,
+            on_start=self._on_audio_overview_started,
+            on_failure=self._on_audio_overview_failed,
+        )
+        self.executor.register(
+            self.MINDMAP,
+            self._run_mindmap_task,
+            timeout=settings.MINDMAP_TASK_TIMEOUT_SECONDS,
+            stage_timeouts=self.MINDMAP_STAGE_TIMEOUTS,
+            retry=retry,
+            on_failure=self._on_mindmap_failed,
+        )
+
+    async def _admit(self, task_type: str) -> None:
+        """Check that the task queue has room for another task.
+
+        Raises:
+            TaskQueueFullError: If MAX_QUEUED_TASKS tasks are already waiting
+        """
+        if not settings.MAX_QUEUED_TASKS:
+            return
+        queued = await job_queue.count_queued()
+        if queued >= settings.MAX_QUEUED_TASKS:
+            average = await job_queue.average_duration(task_type) or self.DEFAULT_TASK_SECONDS
+            logger.warning(f"Rejecting {task_type} task: {queued} tasks already queued")
+            raise TaskQueueFullError(
+                f"Too many tasks are waiting ({queued}). Please try again later.",
+                retry_after=math.ceil(average),
+            )
+
+    async def get_queue_info(self, task_id: str, task_type: str) -> Dict[str, Any]:
+        """Get a task's position in the queue and its estimated wait.
+
+        The wait assumes the task's type runs its maximum number of tasks in
+        parallel, each taking as long as recent tasks of that type did.
+
+        Args:
+            task_id: The ID of the task
+            task_type: The task's type
+
+        Returns:
+            dict with ``queue_position`` and ``estimated_wait_seconds`` (None once the task runs)
+        """
+        position = await job_queue.get_queue_position(task_id)
+        if position is None:
+            return {"queue_position": None, "estimated_wait_seconds": None}
+
+        average = await job_queue.average_duration(task_type) or self.DEFAULT_TASK_SECONDS
+        slots = self.max_running_by_type.get(task_type) or settings.MAX_RUNNING_TASKS or 1
+        # Tasks ahead finish in waves of `slots`; the task starts after the last wave ahead
+        return {
+            "queue_position": position,
+            "estimated_wait_seconds": math.ceil((position - 1) / slots) * average,
+        }
+
+    @staticmethod
+    def _dedupe_key(task_type: str, notebook_id: str, topic: Optional[str], sources: Optional[List[Dict[str, Any]]]) -> str:
+        """Hash everything that determines a task's work."""
+        data = json.dumps(
+            {"task_type": task_type, "notebook_id": notebook_id, "topic": topic, "sources": sources},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _scope_idempotency_key(task_type: str, notebook_id: str, idempotency_key: str) -> str:
+        """Scope a client idempotency key to the notebook and task type it was sent for."""
+        return hashlib.sha256(f"{task_type}:{notebook_id}:{idempotency_key}".encode("utf-8")).hexdigest()
+
+    async def _submit(
+        self,
+        task_type: str,
+        notebook_id: str,
+        topic: Optional[str] = None,
+        sources: Optional[List] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> str:
+        """Create a task and queue it for execution by a worker.
+
+        Submissions equivalent to a queued or running task (same type, notebook
+        and input), or repeating an idempotency key, are attached to the
+        existing task instead of starting the same work twice.
+
+        Args:
+            task_type: The task type
+            notebook_id: The notebook the task works on
+            topic: The task's topic
+            sources: The task's sources
+            idempotency_key: Optional key sent by the client
+
+        Returns:
+            str: The ID of the task doing the work
+
+        Raises:
+            TaskQueueFullError: If the task queue is full
+        """
+        source_data = [
+            source.model_dump() if hasattr(source, 'model_dump') else source
+            for source in sources
+        ] if sources else None
+        dedupe_key = self._dedupe_key(task_type, notebook_id, topic, source_data)
+        if idempotency_key:
+            idempotency_key = self._scope_idempotency_key(task_type, notebook_id, idempotency_key)
+
+        existing = await job_queue.find_equivalent(dedupe_key, idempotency_key)
+        if existing is not None:
+            logger.info(f"Attaching {task_type} submission for notebook {notebook_id} to equivalent task {existing}")
+            return existing
+
+        await self._admit(task_type)
+
+        task_id = await task_repository.create_task(notebook_id, topic, sources)
+        task_id = await job_queue.enqueue(
+            task_id,
+            task_type,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            dedupe_key=dedupe_key,
+            idempotency_key=idempotency_key,
+        )
+        if self.worker is not None:
+            self.worker.wake()
+        return task_id
+
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        """Execute a job claimed from the task queue.
+
+        Args:
+            job: The claimed job, with ``task_id`` and ``task_type``.
+        """
+        task = await task_repository.get_task(job["task_id"])
+        if task is None:
+            logger.error(f"Task {job['task_id']} of job {job['id']} no longer exists")
+            return
+
+        try:
+            await self.executor.execute(
+                job["task_type"],
+                task,
+                final_attempt=job["attempts"] >= job["max_attempts"],
+            )
+        except asyncio.CancelledError:
+            if is_cancelled():
+                # cancel_task deleted the checkpoints, but the task may have saved more before it stopped
+                await checkpoint_repository.delete_checkpoints(task["task_id"])
+            raise
+
+    async def give_up_job(self, job: Dict[str, Any], error: Exception) -> None:
+        """Fail the task of a job that was interrupted on its last attempt.
+
+        Args:
+            job: The exhausted job, with ``task_id`` and ``task_type``.
+            error: The error the task is failed with
+        """
+        task = await task_repository.get_task(job["task_id"])
+        if task is None:
+            logger.error(f"Task {job['task_id']} of job {job['id']} no longer exists")
+            return
+
+        await self.executor.fail(job["task_type"], task, error)
+
+    async def _delete_notebook_faqs(self, notebook_id: str) -> None:
+        """Delete FAQs for a notebook.
+
+        Embeddings are not deleted here; _embed_sources replaces them incrementally.
 
         Args:
             notebook_id: The ID of the notebook to delete data for.
@@ -23,346 +283,416 @@ class TaskManager:
             # Delete faqs from db
             logger.info(f"Deleting existing FAQs for notebook: {notebook_id}")
             await notebook_repository.delete_notebook_faqs(notebook_id)
-
-            # Delete embeddings from qdrant
-            logger.info(f"Deleting existing embeddings for notebook: {notebook_id}")
-            await qdrant_service.delete_by_notebook_id(notebook_id)
         except Exception as e:
-            logger.error(f"Error deleting existing FAQs and embeddings for notebook: {notebook_id}")
+            logger.error(f"Error deleting existing FAQs for notebook: {notebook_id}")
             logger.error(e)
 
-    async def _execute_task(self, task_id: str, topic: Optional[str], notebook_id: str, sources: Optional[List] = None):
-        """Internal method to run the research task and update status."""
-        max_retries = 1
-        retry_count = 0
+    @staticmethod
+    def _scraped_page_item(page: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the embedding source of a scraped page, identical whether embedded early or in the final sync."""
+        metadata = {"url": page["url"]}
+        if "page_title" in page:
+            metadata["page_title"] = page["page_title"]
+        return {"content": page["content"], "metadata": metadata}
+
+    @staticmethod
+    def _file_item(file_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the embedding source of a converted file."""
+        return {
+            "content": file_data["content"],
+            "metadata": {"url": file_data["file_name"]},
+            "source_key": f"file:{file_data['file_name']}",
+        }
+
+    async def _embed_sources(self, notebook_id: str, items: List[Dict[str, Any]]) -> None:
+        """Embed sources into Qdrant incrementally, retrying only the sources that failed.
+
+        Chunks already stored for the notebook are not embedded again. Once every
+        source is stored, points that no longer belong to any source are deleted.
 
-        await notebook_repository.update_notebook_status(
-            notebook_id,
-            NotebookProcessingStatusValue.IN_PROGRESS,
-            "Research task started"
-        )
-
-        while retry_count < max_retries:
-            try:
-
-                await task_repository.update_task_status(task_id, "running")
-
-                logger.info(f"Task {task_id} started for notebook: {notebook_id}" +
-                           (f" on topic: {topic}" if topic else "") +
-                           (f" (retry {retry_count}/{max_retries-1})" if retry_count > 0 else ""))
-
-                with logger.contextualize(task_id=task_id):
-                    if topic and topic != "" and (not sources or len(sources) == 0):
-                        # Run topic research agent
-                        logger.info(f"Running topic research agent for topic: {topic}")
-                        result = await topic_research_agent.run_research_crew(topic)
-                        # Save notebook output
-                        logger.info(f"Saving notebook output for notebook: {notebook_id}")
-                        await notebook_repository.save_notebook_output(notebook_id, result["blog_post"])
-
-                        # Update notebook title and topic
-                        logger.info(f"Updating notebook title and topic for notebook: {notebook_id}")
-                        title = result["title"]
-                        await notebook_repository.update_notebook(
-                            notebook_id,
-                            title=title,
-                            topic=topic
-                        )
-
-                        await self._delete_notebook_data(notebook_id)
-
-                        # Save faqs in db
-                        await notebook_repository.save_notebook_faqs(notebook_id, result["faq"])
-                        # Save embeddings for blog post
-                        max_embedding_retries = 3
-                        embedding_retry_count = 0
-
-                        while embedding_retry_count < max_embedding_retries:
-                            try:
-                                # Save sources in Qdrant
-                                logger.info(f"Embedding blog post for notebook: {notebook_id} (attempt {embedding_retry_count + 1}/{max_embedding_retries})")
-                                await qdrant_service.add_source(
-                                    content=result["blog_post"],
-                                    notebook_id=notebook_id,
-                                    metadata={
-                                        "title": result["title"],
-                                    }
-                                )
-
-                                logger.info(f"Embedding scraped data for notebook: {notebook_id} (attempt {embedding_retry_count + 1}/{max_embedding_retries})")
-                                for source in result["scraped_data"]:
-                                    await qdrant_service.add_source(
-                                        content=source["content"],
-                                        notebook_id=notebook_id,
-                                        metadata={
-                                            "url": source["url"],
-                                            "page_title": source["page_title"],
-                                        }
-                                    )
-                                break  # Success - exit retry loop
-
-                            except Exception as e:
-                                embedding_retry_count += 1
-                                if embedding_retry_count < max_embedding_retries:
-                                    logger.warning(f"Error embedding sources for notebook: {notebook_id} (attempt {embedding_retry_count}/{max_embedding_retries})")
-                                    logger.warning(e)
-                                    continue
-                                logger.error(f"Error embedding sources for notebook: {notebook_id} after {max_embedding_retries} attempts")
-                                logger.error(e)
-
-
-                    elif  sources and len(sources) > 0:
-                        # Run sources research agent
-                        logger.info(f"Running sources research agent for sources: {sources}")
-                        result = await sources_research_agent.run_sources_research_crew(sources)
-                        # Save notebook output
-                        logger.info(f"Saving notebook output for notebook: {notebook_id}")
-                        await notebook_repository.save_notebook_output(notebook_id, result["blog_post"])
-
-                        # Update notebook title and topic
-                        logger.info(f"Updating notebook title and topic for notebook: {notebook_id}")
-                        title = result["title"]
-                        await notebook_repository.update_notebook(
-                            notebook_id,
-                            title=title
-                        )
-
-                        await self._delete_notebook_data(notebook_id)
-
-                        # Save faqs in db
-                        await notebook_repository.save_notebook_faqs(notebook_id, result["faq"])
-
-                        max_embedding_retries = 3
-                        embedding_retry_count = 0
-
-                        while embedding_retry_count < max_embedding_retries:
-                            try:
-                                # Save textual content in Qdrant
-                                logger.info(f"Embedding textual content for notebook: {notebook_id} (attempt {embedding_retry_count + 1}/{max_embedding_retries})")
-
-                                for source in sources:
-                                    if source.source_type == "MANUAL":
-                                        await qdrant_service.add_source(
-                                            content=source.source_content,
-                                            notebook_id=notebook_id
-                                        )
-
-                                # Save file content in Qdrant
-                                logger.info(f"Embedding file content for notebook: {notebook_id} (attempt {embedding_retry_count + 1}/{max_embedding_retries})")
-                                for file_data in result["file_data"]:
-                                    await qdrant_service.add_source(
-                                        content=file_data["content"],
-                                        notebook_id=notebook_id,
-                                        metadata={
-                                            "url": file_data["file_name"]
-                                        }
-                                    )
-
-                                # Save sources in Qdrant
-                                logger.info(f"Embedding blog post for notebook: {notebook_id} (attempt {embedding_retry_count + 1}/{max_embedding_retries})")
-                                await qdrant_service.add_source(
-                                    content=result["blog_post"],
-                                    notebook_id=notebook_id,
-                                    metadata={
-                                        "title": result["title"],
-                                    }
-                                )
-
-                                logger.info(f"Embedding scraped data for notebook: {notebook_id} (attempt {embedding_retry_count + 1}/{max_embedding_retries})")
-                                for source in result["scraped_data"]:
-                                    await qdrant_service.add_source(
-                                        content=source["content"],
-                                        notebook_id=notebook_id,
-                                        metadata={
-                                            "url": source["url"]
-                                        }
-                                    )
-
-                                break
-
-                            except Exception as e:
-                                embedding_retry_count += 1
-                                if embedding_retry_count < max_embedding_retries:
-                                    logger.warning(f"Error embedding sources for notebook: {notebook_id} (attempt {embedding_retry_count}/{max_embedding_retries})")
-                                    logger.warning(e)
-                                    continue
-                                logger.error(f"Error embedding sources for notebook: {notebook_id} after {max_embedding_retries} attempts")
-                                logger.error(e)
-                    else:
-                        logger.error("Not supported research type")
-                        return
-
-
-                await task_repository.update_task_result(task_id, result, "completed")
-
-                await notebook_repository.update_notebook_status(
-                    notebook_id,
-                    NotebookProcessingStatusValue.PROCESSED,
-                    "Research completed successfully"
-                )
+        Args:
+            notebook_id: The ID of the notebook the sources belong to.
+            items: Sources to embed, each a dict with ``content`` and optional ``metadata`` and ``source_key``.
 
-                logger.success(f"Task {task_id} completed successfully")
+        Raises:
+            SourceEmbeddingError: If sources still fail after SOURCE_EMBEDDING_MAX_ATTEMPTS attempts;
+                the task is then retried and embeds only the sources not stored yet
+        """
+        max_embedding_retries = settings.SOURCE_EMBEDDING_MAX_ATTEMPTS
+        existing = await vector_store.get_point_index(notebook_id)
+        keep = set()
+        pending = items
+
+        for attempt in range(1, max_embedding_retries + 1):
+            logger.info(f"Embedding {len(pending)} sources for notebook: {notebook_id} (attempt {attempt}/{max_embedding_retries})")
+            results = await vector_store.add_sources(notebook_id, pending, existing=existing)
+
+            failed = []
+            for item, result in zip(pending, results):
+                if result["success"]:
+                    keep.update(result["chunk_ids"])
+                else:
+                    failed.append((item, result))
+
+            if not failed:
+                task_progress(sources_embedded=len(items), chunks_embedded=len(keep))
+                stale = [point_id for point_id in existing if point_id not in keep]
+                if stale:
+                    logger.info(f"Deleting {len(stale)} stale embeddings for notebook: {notebook_id}")
+                    await vector_store.delete_points(stale, notebook_id=notebook_id)
                 return
 
-            except Exception as e:
-                retry_count += 1
-                # Log the error but keep retrying if we haven't hit the limit
-                if retry_count < max_retries:
-                    logger.warning(f"Task {task_id} failed (attempt {retry_count}/{max_retries-1}): {e}")
-                    continue
+            pending = [item for item, _ in failed]
+            if attempt < max_embedding_retries:
+                logger.warning(f"Error embedding {len(pending)} sources for notebook: {notebook_id} (attempt {attempt}/{max_embedding_retries})")
 
-                logger.opt(exception=True).error(f"Task {task_id} failed after {retry_count} attempts: {e}")
+        # Stale embeddings are kept so chat search still has content for the failed sources
+        errors = [str(result["error"]) for _, result in failed]
+        for error in errors:
+            logger.error(error)
+        raise SourceEmbeddingError(
+            notebook_id,
+            [item.get("source_key") or (item.get("metadata") or {}).get("url") or "manual" for item, _ in failed],
+            errors,
+        )
 
-                await task_repository.update_task_error(task_id, str(e))
+    async def _run_research_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one attempt of a research task.
 
-                await notebook_repository.update_notebook_status(
+        Topic research saves checkpoints as its stages complete, so a retried
+        attempt, in this job or a later one, resumes from the checkpoints.
+        """
+        task_id = task["task_id"]
+        topic = task["topic"]
+        notebook_id = task["notebook_id"]
+        sources = [ResearchSource(**source) for source in task["sources"]] if task["sources"] else None
+
+        logger.info(f"Task {task_id} started for notebook: {notebook_id}" +
+                   (f" on topic: {topic}" if topic else ""))
+
+        pages_scraped = 0
+
+        def on_page_scraped(page: Dict[str, Any]) -> None:
+            nonlocal pages_scraped
+            pages_scraped += 1
+            task_progress(pages_scraped=pages_scraped)
+            ingestion.add(self._scraped_page_item(page))
+
+        # Scraped pages are embedded while the research and writing crews run
+        async with BackgroundIngestion(notebook_id, vector_store) as ingestion:
+            if topic and topic != "" and (not sources or len(sources) == 0):
+                # Run topic research agent
+                logger.info(f"Running topic research agent for topic: {topic}")
+                checkpoints = await TaskCheckpoints.load(task_id)
+                result = await topic_research_agent.run_research_crew(
+                    topic,
+                    checkpoints,
+                    on_page_scraped=on_page_scraped,
+                )
+                # Save notebook output
+                logger.info(f"Saving notebook output for notebook: {notebook_id}")
+                await notebook_repository.save_notebook_output(notebook_id, result["blog_post"])
+
+                # Update notebook title and topic
+                logger.info(f"Updating notebook title and topic for notebook: {notebook_id}")
+                title = result["title"]
+                await notebook_repository.update_notebook(
                     notebook_id,
-                    NotebookProcessingStatusValue.ERROR,
-                    f"Research failed. Please try again."
+                    title=title,
+                    topic=topic
                 )
 
-                return
-
-    async def submit_task_async(self, notebook_id: str, topic: Optional[str] = None, sources: Optional[List] = None) -> str:
-        """Async implementation for submitting a new research task."""
+                await self._delete_notebook_faqs(notebook_id)
+
+                # Save faqs in db
+                await notebook_repository.save_notebook_faqs(notebook_id, result["faq"])
+                # Save embeddings for blog post and scraped pages
+                async with task_stage("embedding"):
+                    await ingestion.wait()
+                    await self._embed_sources(notebook_id, [
+                        {
+                            "content": result["blog_post"],
+                            "metadata": {"title": result["title"]},
+                            "source_key": "blog_post",
+                        },
+                        *[self._scraped_page_item(source) for source in result["scraped_data"]],
+                    ])
+
+            elif  sources and len(sources) > 0:
+                # Run sources research agent
+                logger.info(f"Running sources research agent for sources: {sources}")
+                manual_items = [
+                    {"content": source.source_content}
+                    for source in sources
+                    if source.source_type == "MANUAL"
+                ]
+                for item in manual_items:
+                    ingestion.add(item)
+                result = await sources_research_agent.run_sources_research_crew(
+                    sources,
+                    on_page_scraped=on_page_scraped,
+                    on_file_converted=lambda file_data: ingestion.add(self._file_item(file_data)),
+                )
+                # Save notebook output
+                logger.info(f"Saving notebook output for notebook: {notebook_id}")
+                await notebook_repository.save_notebook_output(notebook_id, result["blog_post"])
+
+                # Update notebook title and topic
+                logger.info(f"Updating notebook title and topic for notebook: {notebook_id}")
+                title = result["title"]
+                await notebook_repository.update_notebook(
+                    notebook_id,
+                    title=title
+                )
 
-        task_id = await task_repository.create_task(notebook_id, topic, sources)
+                await self._delete_notebook_faqs(notebook_id)
+
+                # Save faqs in db
+                await notebook_repository.save_notebook_faqs(notebook_id, result["faq"])
+
+                # Save textual content, file content, blog post and scraped pages
+                async with task_stage("embedding"):
+                    await ingestion.wait()
+                    await self._embed_sources(notebook_id, [
+                        *manual_items,
+                        *[self._file_item(file_data) for file_data in result["file_data"]],
+                        {
+                            "content": result["blog_post"],
+                            "metadata": {"title": result["title"]},
+                            "source_key": "blog_post",
+                        },
+                        *[self._scraped_page_item(source) for source in result["scraped_data"]],
+                    ])
+            else:
+                # Rejected by submit_task_async, so only tasks queued before it checked get here
+                raise InvalidTaskError("Research task has neither a topic nor sources")
+
+        return result
+
+    async def _on_research_started(self, task: Dict[str, Any]) -> None:
+        await notebook_repository.update_notebook_status(
+            task["notebook_id"],
+            NotebookProcessingStatusValue.IN_PROGRESS,
+            "Research task started"
+        )
 
-        asyncio.create_task(self._execute_task(task_id, topic, notebook_id, sources))
+    async def _on_research_completed(self, task: Dict[str, Any], result: Dict[str, Any]) -> None:
+        await notebook_repository.update_notebook_status(
+            task["notebook_id"],
+            NotebookProcessingStatusValue.PROCESSED,
+            "Research completed successfully"
+        )
 
-        logger.info(f"Task {task_id} submitted for notebook: {notebook_id}" + (f" on topic: {topic}" if topic else ""))
-        return task_id
+        # The result holds everything the checkpoints did
+        await checkpoint_repository.delete_checkpoints(task["task_id"])
 
-    async def _execute_audio_overview_task(self, task_id: str, notebook_id: str):
-        """Internal method to run the audio overview task and update status."""
+    async def _on_research_retry(self, task: Dict[str, Any], error: Exception) -> None:
+        # The job queue retries the task, which resumes from its checkpoints
+        await notebook_repository.update_notebook_status(
+            task["notebook_id"],
+            NotebookProcessingStatusValue.IN_PROGRESS,
+            "Research interrupted, retrying shortly"
+        )
 
-        max_retries = 1
-        retry_count = 0
+    async def _on_research_failed(self, task: Dict[str, Any], error: Exception) -> None:
+        await notebook_repository.update_notebook_status(
+            task["notebook_id"],
+            NotebookProcessingStatusValue.ERROR,
+            f"Research failed. Please try again."
+        )
 
-        while retry_count < max_retries:
-            try:
-                await task_repository.update_task_status(task_id, "running")
+        # A new submission starts over, so the checkpoints are never read again
+        await checkpoint_repository.delete_checkpoints(task["task_id"])
 
-                logger.info(f"Audio overview task {task_id} started for notebook: {notebook_id}" +
-                           (f" (retry {retry_count}/{max_retries-1})" if retry_count > 0 else ""))
+    async def submit_task_async(self, notebook_id: str, topic: Optional[str] = None, sources: Optional[List] = None,
+                                idempotency_key: Optional[str] = None) -> str:
+        """Async implementation for submitting a new research task.
 
-                with logger.contextualize(task_id=task_id):
+        Raises:
+            ValueError: If neither a topic nor sources are given
+            TaskQueueFullError: If the task queue is full
+        """
+        if not topic and not sources:
+            raise ValueError("Either topic or sources must be provided.")
 
-                    # Update database with audio URL - IN_PROGRESS
-                    logger.info(f"Updating database with audio URL - IN_PROGRESS for notebook: {notebook_id}")
-                    await notebook_repository.update_audio_overview_url(notebook_id, "IN_PROGRESS")
+        task_id = await self._submit(self.RESEARCH, notebook_id, topic, sources, idempotency_key)
 
-                    # Generate complete audio overview
-                    result = await audio_overview_service.generate_complete_audio_overview(notebook_id)
+        logger.info(f"Task {task_id} submitted for notebook: {notebook_id}" + (f" on topic: {topic}" if topic else ""))
+        return task_id
 
-                await task_repository.update_task_result(task_id, result, "completed")
+    async def _on_audio_overview_started(self, task: Dict[str, Any]) -> None:
+        # Update database with audio URL - IN_PROGRESS
+        logger.info(f"Updating database with audio URL - IN_PROGRESS for notebook: {task['notebook_id']}")
+        await notebook_repository.update_audio_overview_url(task["notebook_id"], "IN_PROGRESS")
 
-                logger.success(f"Audio overview task {task_id} completed successfully")
-                return
+    async def _run_audio_overview_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one attempt of an audio overview task."""
+        logger.info(f"Audio overview task {task['task_id']} started for notebook: {task['notebook_id']}")
 
-            except Exception as e:
-                retry_count += 1
-                # Log the error but keep retrying if we haven't hit the limit
-                if retry_count < max_retries:
-                    logger.warning(f"Audio overview task {task_id} failed (attempt {retry_count}/{max_retries-1}): {e}")
-                    continue
+        # Generate complete audio overview
+        return await audio_overview_service.generate_complete_audio_overview(task["notebook_id"])
 
-                logger.opt(exception=True).error(f"Audio overview task {task_id} failed after {retry_count} attempts: {e}")
+    async def _on_audio_overview_failed(self, task: Dict[str, Any], error: Exception) -> None:
+        # Update database with audio URL - ERROR
+        logger.info(f"Updating database with audio URL - ERROR for notebook: {task['notebook_id']}")
+        await notebook_repository.update_audio_overview_url(task["notebook_id"], "ERROR")
 
-                await task_repository.update_task_error(task_id, str(e))
+    async def submit_audio_overview_task_async(self, notebook_id: str, idempotency_key: Optional[str] = None) -> str:
+        """Async implementation for submitting a new audio overview task.
 
-                # Update database with audio URL - ERROR
-                logger.info(f"Updating database with audio URL - ERROR for notebook: {notebook_id}")
-                await notebook_repository.update_audio_overview_url(notebook_id, "ERROR")
+        Raises:
+            TaskQueueFullError: If the task queue is full
+        """
 
-                return
+        task_id = await self._submit(self.AUDIO_OVERVIEW, notebook_id, topic="audio_overview", idempotency_key=idempotency_key)
 
-    async def submit_audio_overview_task_async(self, notebook_id: str) -> str:
-        """Async implementation for submitting a new audio overview task."""
+        logger.info(f"Audio overview task {task_id} submitted for notebook: {notebook_id}")
+        return task_id
 
-        task_id = await task_repository.create_task(notebook_id, topic="audio_overview")
+    async def _run_mindmap_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one attempt of a mindmap task."""
+        notebook_id = task["notebook_id"]
+        logger.info(f"Mindmap task {task['task_id']} started for notebook: {notebook_id}")
 
-        asyncio.create_task(self._execute_audio_overview_task(task_id, notebook_id))
+        # Import here to avoid circular imports
+        from agents.mindmap_agent import run_mindmap_agent
 
-        logger.info(f"Audio overview task {task_id} submitted for notebook: {notebook_id}")
-        return task_id
+        # Generate mindmap structure
+        async with task_stage("mindmap_crew"):
+            result = await run_mindmap_agent(notebook_id)
 
-    async def _execute_mindmap_task(self, task_id: str, notebook_id: str):
-        """Internal method to run the mindmap task and update status."""
+        # Save mindmap to notebook output
+        logger.info(f"Saving mindmap to database for notebook: {notebook_id}")
+        await notebook_repository.update_notebook_mindmap(notebook_id, result)
+        return result
 
-        max_retries = 1
-        retry_count = 0
+    async def _on_mindmap_failed(self, task: Dict[str, Any], error: Exception) -> None:
+        # Save mindmap to notebook output
+        logger.info(f"Saving mindmap to database for notebook: {task['notebook_id']}")
+        await notebook_repository.update_notebook_mindmap(task["notebook_id"], "ERROR")
 
-        while retry_count < max_retries:
-            try:
-                await task_repository.update_task_status(task_id, "running")
+    async def submit_mindmap_task_async(self, notebook_id: str, idempotency_key: Optional[str] = None) -> str:
+        """Async implementation for submitting a new mindmap task.
 
-                logger.info(f"Mindmap task {task_id} started for notebook: {notebook_id}" +
-                           (f" (retry {retry_count}/{max_retries-1})" if retry_count > 0 else ""))
+        Raises:
+            TaskQueueFullError: If the task queue is full
+        """
 
-                with logger.contextualize(task_id=task_id):
-                    # Import here to avoid circular imports
-                    from agents.mindmap_agent import run_mindmap_agent
+        task_id = await self._submit(self.MINDMAP, notebook_id, topic="mindmap", idempotency_key=idempotency_key)
 
-                    # Generate mindmap structure
-                    result = await run_mindmap_agent(notebook_id)
+        logger.info(f"Mindmap task {task_id} submitted for notebook: {notebook_id}")
+        return task_id
 
-                    # Save mindmap to notebook output
-                    logger.info(f"Saving mindmap to database for notebook: {notebook_id}")
-                    await notebook_repository.update_notebook_mindmap(notebook_id, result)
+    @classmethod
+    def parse_status_fields(cls, fields: Optional[str]) -> Tuple[List[str], Optional[Set[str]]]:
+        """Parse a field selector such as ``"status,error,result.title"``.
 
-                await task_repository.update_task_result(task_id, result, "completed")
+        Args:
+            fields: Comma-separated status fields; ``result.<name>`` selects
+                fields of the result (default: all fields)
 
-                logger.success(f"Mindmap task {task_id} completed successfully")
-                return
+        Returns:
+            The selected status fields, and the selected result fields (None for all of them)
 
-            except Exception as e:
-                retry_count += 1
-                # Log the error but keep retrying if we haven't hit the limit
-                if retry_count < max_retries:
-                    logger.warning(f"Mindmap task {task_id} failed (attempt {retry_count}/{max_retries-1}): {e}")
-                    continue
+        Raises:
+            ValueError: If a field is unknown
+        """
+        if not fields:
+            return list(cls.STATUS_FIELDS), None
+
+        selected: Set[str] = set()
+        result_fields: Optional[Set[str]] = set()
+        for field in (field.strip() for field in fields.split(",")):
+            if not field:
+                continue
+            name, _, subfield = field.partition(".")
+            if name not in cls.STATUS_FIELDS or (subfield and name != "result"):
+                raise ValueError(f"Unknown field: {field}. Valid fields: {', '.join(cls.STATUS_FIELDS)}, result.<name>")
+            selected.add(name)
+            if name == "result" and result_fields is not None:
+                if subfield:
+                    result_fields.add(subfield)
+                else:
+                    # Plain "result" selects the whole result
+                    result_fields = None
+        return [name for name in cls.STATUS_FIELDS if name in selected], result_fields
+
+    async def get_task_status_async(self, task_id: str, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get task status and details by task ID.
+
+        Only the selected columns are read, and offloaded result fields are
+        only fetched from storage when selected, so polling ``fields=status``
+        stays cheap however large the result is.
 
-                logger.opt(exception=True).error(f"Mindmap task {task_id} failed after {retry_count} attempts: {e}")
+        Args:
+            task_id: The ID of the task
+            fields: Field selector, see parse_status_fields (default: all fields)
 
-                await task_repository.update_task_error(task_id, str(e))
+        Returns:
+            The selected fields of the task, or None if it does not exist
 
-                # Save mindmap to notebook output
-                logger.info(f"Saving mindmap to database for notebook: {notebook_id}")
-                await notebook_repository.update_notebook_mindmap(notebook_id, "ERROR")
+        Raises:
+            ValueError: If a field is unknown
+        """
+        selected, result_fields = self.parse_status_fields(fields)
+        async with get_db_session() as session:
+            stmt = select(*[getattr(Task, name) for name in selected]).where(Task.id == task_id)
+            result = await session.execute(stmt)
+            row = result.one_or_none()
 
-                return
+        if row is None:
+            return None
 
-    async def submit_mindmap_task_async(self, notebook_id: str) -> str:
-        """Async implementation for submitting a new mindmap task."""
+        task_info = dict(row._mapping)
+        if "result" in task_info:
+            task_info["result"] = await artifact_store.load(task_info["result"], result_fields)
+        return task_info
 
-        task_id = await task_repository.create_task(notebook_id, topic="mindmap")
+    async def cancel_task(self, task_id: str) -> Optional[bool]:
+        """Cancel a queued or running task.
 
-        asyncio.create_task(self._execute_mindmap_task(task_id, notebook_id))
+        The task's job is cancelled in the queue. The worker running it, in
+        this or another process, stops it within seconds: its coroutines and
+        HTTP requests are cancelled, its MCP server is stopped and its crews
+        stop at their next step.
 
-        logger.info(f"Mindmap task {task_id} submitted for notebook: {notebook_id}")
-        return task_id
+        Args:
+            task_id: The ID of the task
 
-    async def get_task_status_async(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """Get task status and details by task ID."""
-        async with get_db_session() as session:
-            stmt = select(Task).where(Task.id == task_id)
-            result = await session.execute(stmt)
-            task = result.scalar_one_or_none()
-
-            if not task:
-                return None
-
-            return {
-                "notebook_id": task.notebook_id,
-                "topic": task.topic,
-                "status": task.status,
-                "result": task.result,
-                "error": task.error,
-                "created_at": task.created_at,
-                "completed_at": task.completed_at,
-                "failed_at": task.failed_at
-            }
+        Returns:
+            True if the task was cancelled, False if it already finished, None if it does not exist
+        """
+        task = await task_repository.get_task(task_id)
+        if task is None:
+            return None
+        if task["status"] in ("completed", "failed", "cancelled"):
+            return False
+
+        job = await job_queue.cancel(task_id)
+        if job is None:
+            return False
+        if not await task_repository.update_task_status(task_id, "cancelled"):
+            # The task finished before its job was cancelled
+            return False
+        task_events.publish(task_id, "status", status="cancelled")
+
+        if self.worker is not None:
+            self.worker.cancel_task(task_id)
+
+        notebook_id = task["notebook_id"]
+        if job["task_type"] == self.RESEARCH:
+            await notebook_repository.update_notebook_status(
+                notebook_id,
+                NotebookProcessingStatusValue.ERROR,
+                "Research was cancelled."
+            )
+            await checkpoint_repository.delete_checkpoints(task_id)
+        elif job["status"] == "running" and job["task_type"] == self.AUDIO_OVERVIEW:
+            # Only a running task replaced the previous audio overview with IN_PROGRESS
+            await notebook_repository.update_audio_overview_url(notebook_id, "ERROR")
+
+        logger.info(f"Task {task_id} cancelled ({job['status']})")
+        return True
 
 # Singleton instance
 task_manager = TaskManager()
\ No newline at end of file
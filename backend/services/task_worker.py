@@ -0,0 +1,267 @@
+"""
+Worker that executes queued tasks.
+
+TaskWorker polls the job queue (services.job_queue), runs up to
+``concurrency`` jobs at a time and keeps their leases alive with heartbeats.
+It runs either as its own process (``python worker.py``) or embedded in the
+API process (RUN_EMBEDDED_WORKER), and any number of workers can share one
+database. Running jobs that get cancelled in the queue are stopped within a
+poll interval (see services.cancellation). Jobs whose lease expired on their
+last attempt are not run again but failed with ``give_up_handler``, so their
+task gets the same cleanup as one that failed while running.
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+from config.settings import settings
+from .cancellation import cancellation_scope
+from .job_queue import LeaseExpiredError, job_queue
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+GiveUpHandler = Callable[[Dict[str, Any], Exception], Awaitable[None]]
+
+class TaskWorker:
+    """Claims jobs from the queue and runs them with a handler."""
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        concurrency: int = 4,
+        poll_interval: float = 2.0,
+        lease_seconds: int = 60,
+        heartbeat_interval: float = 20.0,
+        retry_delay_seconds: int = 30,
+        task_types: Optional[List[str]] = None,
+        max_running: Optional[int] = None,
+        max_running_by_type: Optional[Dict[str, int]] = None,
+        worker_id: Optional[str] = None,
+        give_up_handler: Optional[GiveUpHandler] = None,
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            handler: Coroutine function executing a claimed job
+            concurrency: Maximum number of jobs run at once
+            poll_interval: Seconds between polls while the queue is empty
+            lease_seconds: Lease taken on claimed jobs, renewed by heartbeats
+            heartbeat_interval: Seconds between lease renewals, well below lease_seconds
+            retry_delay_seconds: Delay before a failed job is retried
+            task_types: Only run jobs of these types (default: any)
+            max_running: Maximum jobs running across all workers (None or 0: unlimited)
+            max_running_by_type: Maximum jobs of a type running across all workers (0: unlimited)
+            worker_id: Identifier recorded on claimed jobs (default: host, pid and a random suffix)
+            give_up_handler: Coroutine function failing the task of a job that ran out of attempts
+        """
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.retry_delay_seconds = retry_delay_seconds
+        self.task_types = task_types
+        self.max_running = max_running
+        self.max_running_by_type = max_running_by_type
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.give_up_handler = give_up_handler
+        self._running: Set[asyncio.Task] = set()
+        # Running jobs by job ID, with their asyncio task and cancel event
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Run the worker in the background of the current event loop."""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self.run())
+
+    def wake(self) -> None:
+        """Poll the queue now instead of after the poll interval, e.g. after enqueueing."""
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        """Claim and run jobs until stop() is called."""
+        logger.info(f"Task worker {self.worker_id} started (concurrency {self.concurrency})")
+        watcher = asyncio.create_task(self._watch_cancellations())
+        try:
+            await self._claim_loop()
+        finally:
+            watcher.cancel()
+
+    async def _claim_loop(self) -> None:
+        while not self._stopping.is_set():
+            if len(self._running) >= self.concurrency:
+                # Time out now and then to notice stop()
+                await asyncio.wait(self._running, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            try:
+                job = await job_queue.claim(
+                    self.worker_id,
+                    self.lease_seconds,
+                    self.task_types,
+                    max_running=self.max_running,
+                    max_running_by_type=self.max_running_by_type,
+                )
+            except Exception as e:
+                logger.error(f"Task worker {self.worker_id} failed to poll the queue: {e}")
+                job = None
+
+            if job is not None:
+                job_task = asyncio.create_task(self._give_up(job) if job["exhausted"] else self._run_job(job))
+                self._running.add(job_task)
+                job_task.add_done_callback(self._running.discard)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        job_task = asyncio.current_task()
+        cancel_event = threading.Event()
+        self._jobs[job["id"]] = {"task_id": job["task_id"], "task": job_task, "cancel_event": cancel_event}
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            with cancellation_scope(cancel_event), logger.contextualize(job_id=job["id"], task_id=job["task_id"]):
+                await self.handler(job)
+            await job_queue.complete(job["id"], self.worker_id)
+        except asyncio.CancelledError:
+            if cancel_event.is_set():
+                logger.info(f"Job {job['id']} for task {job['task_id']} cancelled")
+            else:
+                # Shutdown or lost lease: leave the job to expire and be claimed again
+                logger.warning(f"Job {job['id']} for task {job['task_id']} interrupted")
+            raise
+        except Exception as e:
+            logger.opt(exception=True).error(f"Job {job['id']} for task {job['task_id']} failed: {e}")
+            try:
+                await job_queue.fail(job["id"], self.worker_id, str(e), self.retry_delay_seconds)
+            except Exception as fail_error:
+                logger.error(f"Could not record failure of job {job['id']}: {fail_error}")
+        finally:
+            heartbeat.cancel()
+            self._jobs.pop(job["id"], None)
+
+    async def _give_up(self, job: Dict[str, Any]) -> None:
+        """Fail a job whose lease expired on its last attempt, and its task."""
+        error = LeaseExpiredError(job["id"], job["attempts"])
+        with logger.contextualize(job_id=job["id"], task_id=job["task_id"]):
+            logger.error(f"Job {job['id']} for task {job['task_id']} was interrupted on its last attempt, giving up")
+            try:
+                if self.give_up_handler is not None:
+                    await self.give_up_handler(job, error)
+                await job_queue.fail(job["id"], self.worker_id, str(error))
+            except Exception as e:
+                # The lease expires again and another worker gives the job up
+                logger.error(f"Could not give up job {job['id']}: {e}")
+
+    def _cancel_job(self, job_id: str) -> None:
+        """Stop a running job: its coroutines now, its crew threads at their next step."""
+        running = self._jobs.get(job_id)
+        if running is None or running["cancel_event"].is_set():
+            return
+        running["cancel_event"].set()
+        running["task"].cancel()
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Stop the job of a task if this worker runs it.
+
+        The job must already be cancelled in the queue; otherwise another
+        worker claims it again once its lease expires.
+
+        Args:
+            task_id: The ID of the task
+
+        Returns:
+            bool: True if this worker was running the task
+        """
+        for job_id, running in list(self._jobs.items()):
+            if running["task_id"] == task_id:
+                self._cancel_job(job_id)
+                return True
+        return False
+
+    async def _watch_cancellations(self) -> None:
+        """Stop running jobs that were cancelled in the queue, e.g. by another API process."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self._jobs:
+                continue
+            try:
+                cancelled = await job_queue.get_cancelled(list(self._jobs))
+            except Exception as e:
+                logger.warning(f"Task worker {self.worker_id} failed to check for cancelled jobs: {e}")
+                continue
+            for job_id in cancelled:
+                logger.info(f"Job {job_id} was cancelled, stopping it")
+                self._cancel_job(job_id)
+
+    async def _heartbeat(self, job: Dict[str, Any]) -> None:
+        """Renew the job's lease; stop the job if another worker took it over."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                renewed = await job_queue.heartbeat(job["id"], self.worker_id, self.lease_seconds)
+            except Exception as e:
+                # Keep running; the lease survives until lease_seconds without a heartbeat
+                logger.warning(f"Heartbeat for job {job['id']} failed: {e}")
+                continue
+            if not renewed:
+                logger.error(f"Lease of job {job['id']} was lost or the job was cancelled, stopping it")
+                self._cancel_job(job["id"])
+                return
+
+    def stop(self) -> None:
+        """Stop claiming new jobs."""
+        self._stopping.set()
+        self._wakeup.set()
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """Stop claiming jobs and wait for running jobs to finish.
+
+        Jobs still running after ``timeout`` are cancelled; their leases expire
+        and another worker picks them up.
+
+        Args:
+            timeout: Seconds to wait for running jobs
+        """
+        self.stop()
+        if self._loop_task is not None:
+            await self._loop_task
+        if self._running:
+            logger.info(f"Waiting up to {timeout}s for {len(self._running)} running jobs")
+            _, pending = await asyncio.wait(self._running, timeout=timeout)
+            for job_task in pending:
+                job_task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        logger.info(f"Task worker {self.worker_id} stopped")
+
+
+def create_task_worker() -> TaskWorker:
+    """Create a worker running TaskManager jobs, configured from settings."""
+    # Imported here as the task manager pulls in all agents
+    from .task_service import task_manager
+
+    return TaskWorker(
+        handler=task_manager.run_job,
+        concurrency=settings.WORKER_CONCURRENCY,
+        poll_interval=settings.WORKER_POLL_INTERVAL_SECONDS,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        heartbeat_interval=settings.JOB_HEARTBEAT_SECONDS,
+        retry_delay_seconds=settings.JOB_RETRY_DELAY_SECONDS,
+        max_running=settings.MAX_RUNNING_TASKS or None,
+        max_running_by_type=task_manager.max_running_by_type,
+        give_up_handler=task_manager.give_up_job,
+    )
@@ -0,0 +1,790 @@
+# backend/services/vector_store.py
+"""
+Vector store interface shared by the storage backends.
+
+VectorStore is the protocol the rest of the application codes against.
+BaseVectorStore implements everything that does not depend on where vectors
+live — chunking, embedding (batched, cached and retried through an
+EmbeddingProvider), deterministic point
+IDs, incremental sync and query embedding — on top of a small set of backend
+primitives implemented by QdrantSourceStore and LocalVectorStore.
+"""
+
+import asyncio
+import base64
+import hashlib
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple, TypeVar
+
+import zstandard
+from loguru import logger
+
+from .chunking import Chunker, MarkdownChunker, TokenCounter
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .embedding_provider import EmbeddingProvider, OpenAIEmbeddingProvider
+from .rate_limiter import AdaptiveRateLimiter
+from .reranking import select_diverse
+
+T = TypeVar("T")
+
+# Namespace for deterministic point IDs derived from notebook, source and chunk content
+POINT_ID_NAMESPACE = uuid.UUID("5b7e3c0a-3f1d-4c1e-9a53-0f2d8c6b4e71")
+
+# Payload fields holding the chunk text, as plain text or zstd-compressed and base64 encoded
+CONTENT_FIELD = "content_chunk"
+COMPRESSED_CONTENT_FIELD = "content_chunk_zstd"
+
+# A point to store: (point ID, embedding, payload)
+Point = Tuple[str, List[float], Dict[str, Any]]
+
+
+class VectorStore(Protocol):
+    """Interface for storing and searching embedded notebook sources."""
+
+    async def initialize(self) -> None:
+        """Prepare the store for use."""
+        ...
+
+    async def add_source(
+        self,
+        content: str,
+        notebook_id: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        source_key: Optional[str] = None,
+        existing: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> List[str]:
+        """Chunk, embed and store a source document."""
+        ...
+
+    async def add_sources(
+        self,
+        notebook_id: str,
+        items: List[Dict[str, Any]],
+        existing: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Add many source documents concurrently."""
+        ...
+
+    async def sync_sources(self, notebook_id: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Make a notebook's stored points match a set of sources."""
+        ...
+
+    async def get_point_index(self, notebook_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get the IDs and payloads (without chunk text) of a notebook's stored points."""
+        ...
+
+    async def delete_points(self, point_ids: List[str], notebook_id: Optional[str] = None) -> None:
+        """Delete points by ID."""
+        ...
+
+    async def search(
+        self,
+        query: str,
+        notebook_id: Optional[str] = None,
+        limit: int = 5,
+        diversify: Optional[bool] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search for sources based on query and notebook ID."""
+        ...
+
+    async def search_many(
+        self,
+        queries: List[str],
+        notebook_id: Optional[str] = None,
+        limit: int = 5,
+        diversify: Optional[bool] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search with several phrasings of a query and merge the results."""
+        ...
+
+    def iter_chunks_by_notebook_id(
+        self,
+        notebook_id: str,
+        page_size: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all chunks for a notebook in chunk_index order."""
+        ...
+
+    async def get_all_chunks_by_notebook_id(self, notebook_id: str) -> List[Dict[str, Any]]:
+        """Get all chunks for a notebook."""
+        ...
+
+    async def delete_by_notebook_id(self, notebook_id: str) -> Any:
+        """Delete all sources for a notebook."""
+        ...
+
+
+class BaseVectorStore(ABC):
+    """Backend independent part of a vector store.
+
+    Subclasses must implement the abstract methods ``_setup``, ``_upsert_points``, ``_overwrite_payloads``,
+    ``_search_by_vector``, ``get_point_index``, ``delete_points``,
+    ``iter_chunks_by_notebook_id`` and ``delete_by_notebook_id``.
+    """
+
+    def __init__(
+        self,
+        embedding_model: str = "text-embedding-3-small",
+        openai_api_key: Optional[str] = None,
+        chunk_size: int = 512,
+        chunk_overlap: int = 50,
+        embedding_batch_size: int = 128,
+        embedding_batch_max_tokens: int = 100000,
+        upsert_batch_size: int = 256,
+        max_retries: int = 3,
+        ingestion_concurrency: int = 4,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        query_embedding_cache: Optional[QueryEmbeddingCache] = None,
+        chunker: Optional[Chunker] = None,
+        scroll_page_size: int = 256,
+        diversify: bool = False,
+        mmr_lambda: float = 0.7,
+        mmr_fetch_multiplier: int = 4,
+        duplicate_threshold: float = 0.95,
+        chunk_text_compression: Optional[str] = None,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    ):
+        """Initialize the shared embedding and chunking state.
+
+        Args:
+            embedding_model: OpenAI embedding model name, when no embedding_provider is given
+            openai_api_key: OpenAI API key, when no embedding_provider is given
+            chunk_size: Maximum tokens per chunk for the default chunker
+            chunk_overlap: Maximum overlapping tokens between chunks for the default chunker
+            embedding_batch_size: Maximum number of chunks per embeddings request
+            embedding_batch_max_tokens: Maximum number of tokens per embeddings request
+            upsert_batch_size: Maximum number of points per backend write
+            max_retries: Attempts per embedding or write batch before giving up
+            ingestion_concurrency: Maximum number of sources ingested concurrently by add_sources
+            embedding_cache: Optional persistent cache consulted before calling the embeddings API
+            query_embedding_cache: Optional in-memory cache for search query embeddings
+            chunker: Chunker used to split sources (default: MarkdownChunker)
+            scroll_page_size: Default number of points fetched per page when listing points
+            diversify: Re-rank search results with maximal marginal relevance by default
+            mmr_lambda: Weight of relevance against diversity when diversifying
+            mmr_fetch_multiplier: Candidates fetched per requested result when diversifying
+            duplicate_threshold: Cosine similarity above which results are collapsed as duplicates
+            chunk_text_compression: 'zstd' to store chunk text compressed, or None
+            embedding_provider: Provider used to embed chunks and queries
+                (default: OpenAIEmbeddingProvider for embedding_model)
+            rate_limiter: Limiter shared by all embedding requests in the process;
+                without one, batches are retried with plain exponential backoff
+        """
+        self.embedding_provider = embedding_provider or OpenAIEmbeddingProvider(embedding_model, openai_api_key)
+        # Caches are keyed by the provider's model so vectors from different spaces never mix
+        self.embedding_model = self.embedding_provider.model
+        self.rate_limiter = rate_limiter
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_batch_max_tokens = embedding_batch_max_tokens
+        self.upsert_batch_size = upsert_batch_size
+        self.max_retries = max_retries
+        self.ingestion_concurrency = ingestion_concurrency
+        self.embedding_cache = embedding_cache
+        self.query_embedding_cache = query_embedding_cache
+        self.scroll_page_size = scroll_page_size
+        self.diversify = diversify
+        self.mmr_lambda = mmr_lambda
+        self.mmr_fetch_multiplier = mmr_fetch_multiplier
+        self.duplicate_threshold = duplicate_threshold
+        if chunk_text_compression not in (None, "zstd"):
+            raise ValueError(f"Unsupported chunk text compression: {chunk_text_compression}")
+        self.chunk_text_compression = chunk_text_compression
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._initialized = False
+        self._initialize_lock = asyncio.Lock()
+        self.token_counter = TokenCounter(self.embedding_model)
+        self.chunker = chunker or MarkdownChunker(
+            max_tokens=chunk_size,
+            overlap_tokens=chunk_overlap,
+            token_counter=self.token_counter,
+        )
+
+    async def initialize(self) -> None:
+        """Initialize the backend asynchronously.
+
+        Called once from the application lifespan; methods also call it lazily.
+        Concurrent callers share a single setup run.
+        """
+        if self._initialized:
+            return
+        async with self._initialize_lock:
+            if not self._initialized:
+                await self._setup()
+                # Load the tokenizer now rather than on the first ingestion
+                await asyncio.to_thread(self.token_counter.count, "")
+                self._initialized = True
+
+    @abstractmethod
+    async def _setup(self) -> None:
+        """Create whatever the backend needs before first use."""
+
+    @abstractmethod
+    async def _upsert_points(self, points: List[Point]) -> None:
+        """Store points, replacing any with the same ID."""
+
+    @abstractmethod
+    async def _overwrite_payloads(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the payloads of stored points, keeping their vectors."""
+
+    @abstractmethod
+    async def _search_by_vector(
+        self,
+        vector: List[float],
+        notebook_id: Optional[str],
+        limit: int,
+        query: Optional[str] = None,
+        with_vectors: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Find the points nearest to a query vector, formatted with _format_result.
+
+        ``query`` is the original query text, for backends that also rank lexically.
+        With ``with_vectors``, results include their dense ``vector``. ``fields``
+        limits the payload fields fetched (default: all).
+        """
+
+    async def _search_many_by_vector(
+        self,
+        searches: List[Tuple[str, List[float]]],
+        notebook_id: Optional[str],
+        limit: int,
+        with_vectors: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several (query text, query vector) searches, one result list per search.
+
+        Backends override this to send all searches in a single request.
+        """
+        return list(await asyncio.gather(*(
+            self._search_by_vector(vector, notebook_id, limit, query=query, with_vectors=with_vectors, fields=fields)
+            for query, vector in searches
+        )))
+
+    @abstractmethod
+    async def get_point_index(self, notebook_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get the IDs and payloads (without chunk text) of a notebook's stored points."""
+
+    @abstractmethod
+    async def delete_points(self, point_ids: List[str], notebook_id: Optional[str] = None) -> None:
+        """Delete points by ID."""
+
+    @abstractmethod
+    def iter_chunks_by_notebook_id(
+        self,
+        notebook_id: str,
+        page_size: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all chunks for a notebook in chunk_index order."""
+
+    @abstractmethod
+    async def delete_by_notebook_id(self, notebook_id: str) -> Any:
+        """Delete all sources for a notebook."""
+
+    async def _get_embedding(self, text: str) -> List[float]:
+        """Get embedding for text using the embedding provider."""
+        embeddings = await self._get_embeddings([text])
+        return embeddings[0]
+
+    async def _get_query_embedding(self, query: str) -> List[float]:
+        """Get embedding for a search query, using the in-memory query cache if configured."""
+        embeddings = await self._get_query_embeddings([query])
+        return embeddings[0]
+
+    async def _get_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """Get embeddings for search queries, embedding all cache misses in one batched request."""
+        if self.query_embedding_cache is None:
+            return await self._get_embeddings(queries)
+
+        cached = {}
+        for query in queries:
+            embedding = self.query_embedding_cache.get(self.embedding_model, query)
+            if embedding is not None:
+                cached[query] = embedding
+
+        missing = [query for query in queries if query not in cached]
+        if missing:
+            for query, embedding in zip(missing, await self._get_embeddings(missing)):
+                self.query_embedding_cache.set(self.embedding_model, query, embedding)
+                cached[query] = embedding
+        if len(missing) < len(queries):
+            logger.info(f"{len(queries) - len(missing)}/{len(queries)} query embeddings served from cache (hit rate {self.query_embedding_cache.hit_rate:.1%})")
+
+        return [cached[query] for query in queries]
+
+    async def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get embeddings for many texts using batched embedding provider requests.
+
+        Texts already in the embedding cache are served from it. The rest are
+        grouped into batches bounded by both ``embedding_batch_size`` and
+        ``embedding_batch_max_tokens``; each batch is sent as a single
+        list-input request and retried on failure.
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            Embeddings in the same order as ``texts``
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        embeddings_by_text: Dict[str, List[float]] = {}
+        if self.embedding_cache:
+            embeddings_by_text = await self.embedding_cache.get_many(self.embedding_model, texts)
+
+        # Embed each distinct uncached text once
+        missing = [text for text in dict.fromkeys(texts) if text not in embeddings_by_text]
+        if missing:
+            new_embeddings: Dict[str, List[float]] = {}
+            batches = self._batch_by_tokens(missing)
+            for batch_number, (batch, tokens) in enumerate(batches, start=1):
+                logger.info(f"Getting embeddings for batch {batch_number}/{len(batches)} ({len(batch)} chunks, {tokens} tokens) using model {self.embedding_model}")
+                description = f"Embedding batch {batch_number}/{len(batches)}"
+                operation = lambda batch=batch: self.embedding_provider.embed(batch)
+                if self.rate_limiter:
+                    embeddings = await self.rate_limiter.run(operation, tokens=tokens, description=description)
+                else:
+                    embeddings = await self._with_retries(operation, description)
+                new_embeddings.update(zip(batch, embeddings))
+
+            if self.embedding_cache:
+                await self.embedding_cache.set_many(self.embedding_model, new_embeddings)
+            embeddings_by_text.update(new_embeddings)
+
+        if self.embedding_cache:
+            logger.info(f"Embedding cache served {len(texts) - len(missing)}/{len(texts)} texts (hit rate {self.embedding_cache.hit_rate:.1%})")
+
+        return [embeddings_by_text[text] for text in texts]
+
+    def _batch_by_tokens(self, texts: List[str]) -> List[Tuple[List[str], int]]:
+        """Group texts into batches bounded by item count and token count.
+
+        Args:
+            texts: The texts to group
+
+        Returns:
+            List of (batch, token count) preserving the original order
+        """
+        batches: List[Tuple[List[str], int]] = []
+        current_batch: List[str] = []
+        current_tokens = 0
+
+        for text in texts:
+            tokens = self.token_counter.count(text)
+            if current_batch and (
+                len(current_batch) >= self.embedding_batch_size
+                or current_tokens + tokens > self.embedding_batch_max_tokens
+            ):
+                batches.append((current_batch, current_tokens))
+                current_batch = []
+                current_tokens = 0
+            current_batch.append(text)
+            current_tokens += tokens
+
+        if current_batch:
+            batches.append((current_batch, current_tokens))
+
+        return batches
+
+    async def _with_retries(self, operation: Callable[[], Awaitable[T]], description: str) -> T:
+        """Run an async operation, retrying with exponential backoff on failure.
+
+        Args:
+            operation: Zero-argument callable returning a fresh awaitable per attempt
+            description: Human readable description used in log messages
+
+        Returns:
+            The result of the operation
+        """
+        attempt = 0
+        while True:
+            try:
+                return await operation()
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.max_retries:
+                    logger.error(f"{description} failed after {attempt} attempts: {e}")
+                    raise
+                delay = 2 ** (attempt - 1)
+                logger.warning(f"{description} failed (attempt {attempt}/{self.max_retries}), retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _get_embedding_size(self) -> int:
+        """Get embedding size of the embedding provider."""
+        return await self.embedding_provider.get_dimension()
+
+    def _chunk_text(self, text: str) -> List[str]:
+        """Split text into chunks with the configured chunker.
+
+        Args:
+            text: The text to split into chunks
+
+        Returns:
+            List of text chunks
+        """
+        if not text:
+            logger.warning("Empty text provided for chunking")
+            return []
+
+        logger.info(f"Chunking text with {type(self.chunker).__name__}")
+        chunks = list(self.chunker.chunk(text))
+
+        logger.info(f"Created {len(chunks)} chunks")
+        return chunks
+
+    @staticmethod
+    def _point_id(notebook_id: str, source_key: str, chunk: str) -> str:
+        """Derive a deterministic point ID from the notebook, source and chunk content."""
+        content_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{notebook_id}:{source_key}:{content_hash}"))
+
+    @staticmethod
+    def _default_source_key(content: str, metadata: Dict[str, Any]) -> str:
+        """Get a stable key for a source that was added without one."""
+        if metadata.get("url"):
+            return f"url:{metadata['url']}"
+        return f"content:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+    async def add_source(
+        self,
+        content: str,
+        notebook_id: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        source_key: Optional[str] = None,
+        existing: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> List[str]:
+        """Add source document to the store.
+
+        Point IDs are derived from the notebook ID, the source key and the chunk
+        content, so adding the same source again overwrites its points instead
+        of duplicating them. When ``existing`` is given, chunks already stored
+        are not embedded again; only their payload is refreshed if it changed.
+
+        Args:
+            content: Source content
+            notebook_id: Notebook ID for filtering
+            metadata: Additional metadata
+            source_key: Stable identifier of the source within the notebook
+                (default: its url, or a hash of its content)
+            existing: Snapshot of the notebook's stored points from get_point_index
+
+        Returns:
+            List of IDs for the stored chunks
+        """
+        if not self._initialized:
+            await self.initialize()
+        logger.info(f"Adding source document for notebook {notebook_id}")
+
+        if metadata is None:
+            metadata = {}
+        if source_key is None:
+            source_key = self._default_source_key(content, metadata)
+
+        # Chunk content for better retrieval
+        chunks = self._chunk_text(content)
+
+        if not chunks:
+            logger.warning(f"No chunks to add for notebook {notebook_id}")
+            return []
+
+        chunk_ids = [self._point_id(notebook_id, source_key, chunk) for chunk in chunks]
+        payloads = {}
+        for i, (chunk_id, chunk) in enumerate(zip(chunk_ids, chunks)):
+            # Identical chunks within a source share an ID; keep the first occurrence
+            payloads.setdefault(chunk_id, {
+                "content_chunk": chunk,
+                "chunk_index": i,
+                "total_chunks": len(chunks),
+                "notebook_id": notebook_id,
+                "source_key": source_key,
+                **metadata,
+            })
+
+        existing = existing or {}
+        new_ids = [chunk_id for chunk_id in payloads if chunk_id not in existing]
+        changed_ids = [
+            chunk_id for chunk_id in payloads
+            if chunk_id in existing and existing[chunk_id] != self._without_content(payloads[chunk_id])
+        ]
+        logger.info(f"Processing {len(chunks)} chunks ({len(new_ids)} new, {len(changed_ids)} with changed metadata)")
+
+        if new_ids:
+            # Embed new chunks with batched requests
+            embeddings = await self._get_embeddings([payloads[chunk_id]["content_chunk"] for chunk_id in new_ids])
+
+            # Store with bulk upserts
+            await self._upsert_points([
+                (chunk_id, embedding, self._encode_payload(payloads[chunk_id]))
+                for chunk_id, embedding in zip(new_ids, embeddings)
+            ])
+
+        if changed_ids:
+            await self._overwrite_payloads({
+                chunk_id: self._encode_payload(payloads[chunk_id]) for chunk_id in changed_ids
+            })
+
+        logger.info(f"Added source with {len(chunks)} chunks for notebook {notebook_id}")
+        return list(payloads)
+
+    @staticmethod
+    def _without_content(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: value for key, value in payload.items()
+            if key not in (CONTENT_FIELD, COMPRESSED_CONTENT_FIELD)
+        }
+
+    def _encode_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the payload to store, with the chunk text compressed if configured."""
+        if self.chunk_text_compression != "zstd" or CONTENT_FIELD not in payload:
+            return payload
+        stored = self._without_content(payload)
+        compressed = self._compressor.compress(payload[CONTENT_FIELD].encode("utf-8"))
+        stored[COMPRESSED_CONTENT_FIELD] = base64.b64encode(compressed).decode("ascii")
+        return stored
+
+    def _decode_payload(self, payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Get a stored payload with its chunk text in plain form, however it was stored."""
+        payload = payload or {}
+        if COMPRESSED_CONTENT_FIELD not in payload:
+            return payload
+        decoded = dict(payload)
+        compressed = base64.b64decode(decoded.pop(COMPRESSED_CONTENT_FIELD))
+        decoded[CONTENT_FIELD] = self._decompressor.decompress(compressed).decode("utf-8")
+        return decoded
+
+    @staticmethod
+    def _payload_fields(fields: List[str]) -> List[str]:
+        """Get the stored payload fields to fetch for the requested result fields."""
+        if CONTENT_FIELD in fields:
+            return [*fields, COMPRESSED_CONTENT_FIELD]
+        return list(fields)
+
+    async def add_sources(
+        self,
+        notebook_id: str,
+        items: List[Dict[str, Any]],
+        existing: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Add many source documents to the store concurrently.
+
+        Sources are ingested with at most ``ingestion_concurrency`` in flight.
+        A failing source does not affect the others; callers can retry just
+        the failed items.
+
+        Args:
+            notebook_id: Notebook ID for filtering
+            items: Sources to add, each a dict with ``content`` and optional
+                ``metadata`` and ``source_key``
+            existing: Snapshot of the notebook's stored points from get_point_index
+
+        Returns:
+            One result per item, in input order, with ``success``, ``chunk_ids`` and ``error``
+        """
+        if not self._initialized:
+            await self.initialize()
+        logger.info(f"Adding {len(items)} source documents for notebook {notebook_id}")
+
+        semaphore = asyncio.Semaphore(self.ingestion_concurrency)
+
+        async def ingest(item: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    chunk_ids = await self.add_source(
+                        content=item["content"],
+                        notebook_id=notebook_id,
+                        metadata=item.get("metadata"),
+                        source_key=item.get("source_key"),
+                        existing=existing,
+                    )
+                    return {"success": True, "chunk_ids": chunk_ids, "error": None}
+                except Exception as e:
+                    logger.warning(f"Failed to add source for notebook {notebook_id}: {e}")
+                    return {"success": False, "chunk_ids": [], "error": str(e)}
+
+        results = await asyncio.gather(*(ingest(item) for item in items))
+
+        failed = sum(1 for result in results if not result["success"])
+        logger.info(f"Added {len(items) - failed}/{len(items)} sources for notebook {notebook_id}")
+        return list(results)
+
+    async def sync_sources(self, notebook_id: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Make a notebook's stored points match a set of sources.
+
+        Only chunks that are not stored yet are embedded. Points that no longer
+        belong to any of the sources are deleted afterwards, unless some source
+        failed, in which case they are kept so search keeps returning results.
+
+        Args:
+            notebook_id: Notebook ID to sync
+            items: All sources of the notebook, as for add_sources
+
+        Returns:
+            One result per item, as for add_sources
+        """
+        existing = await self.get_point_index(notebook_id)
+        results = await self.add_sources(notebook_id, items, existing=existing)
+
+        if all(result["success"] for result in results):
+            keep = {chunk_id for result in results for chunk_id in result["chunk_ids"]}
+            stale = [point_id for point_id in existing if point_id not in keep]
+            if stale:
+                await self.delete_points(stale, notebook_id=notebook_id)
+        else:
+            logger.warning(f"Keeping stale points for notebook {notebook_id} because some sources failed")
+
+        return results
+
+    async def search(
+        self,
+        query: str,
+        notebook_id: Optional[str] = None,
+        limit: int = 5,
+        diversify: Optional[bool] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search for sources based on query and notebook ID.
+
+        Args:
+            query: Search query
+            notebook_id: Optional notebook ID to filter results
+            limit: Maximum number of results
+            diversify: Over-fetch candidates and select non-redundant ones with
+                maximal marginal relevance (default: ``diversify``)
+            fields: Payload fields to fetch, e.g. ``["content_chunk", "url"]``
+                (default: all); missing fields are None in the results
+
+        Returns:
+            List of matching sources with scores
+        """
+        if not self._initialized:
+            await self.initialize()
+        logger.info(f"Searching for: '{query}' in notebook: {notebook_id}")
+
+        # Get query embedding
+        query_embedding = await self._get_query_embedding(query)
+
+        diversify = self.diversify if diversify is None else diversify
+        fetch_limit = limit * self.mmr_fetch_multiplier if diversify else limit
+        logger.info(f"Executing search with limit: {fetch_limit}")
+        results = await self._search_by_vector(
+            query_embedding, notebook_id, fetch_limit, query=query, with_vectors=diversify, fields=fields,
+        )
+        if diversify:
+            results = self._select_diverse(results, limit)
+
+        logger.info(f"Found {len(results)} matching results")
+        return results
+
+    async def search_many(
+        self,
+        queries: List[str],
+        notebook_id: Optional[str] = None,
+        limit: int = 5,
+        diversify: Optional[bool] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search with several phrasings of a query at about the cost of one search.
+
+        All queries are embedded in one batched request and searched together.
+        Results are merged by point ID, keeping each point's best score.
+
+        Args:
+            queries: Search queries, e.g. the user question and a rewritten version
+            notebook_id: Optional notebook ID to filter results
+            limit: Maximum number of results per query and of merged results
+            diversify: Select non-redundant results with maximal marginal
+                relevance, as for search
+            fields: Payload fields to fetch, as for search
+
+        Returns:
+            List of matching sources with scores, best first
+        """
+        if not self._initialized:
+            await self.initialize()
+        queries = list(dict.fromkeys(query for query in queries if query and query.strip()))
+        if not queries:
+            return []
+        logger.info(f"Searching for {len(queries)} queries in notebook: {notebook_id}")
+
+        diversify = self.diversify if diversify is None else diversify
+        fetch_limit = limit * self.mmr_fetch_multiplier if diversify else limit
+        embeddings = await self._get_query_embeddings(queries)
+        result_lists = await self._search_many_by_vector(
+            list(zip(queries, embeddings)), notebook_id, fetch_limit, with_vectors=diversify, fields=fields,
+        )
+
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for results in result_lists:
+            for result in results:
+                best = merged.get(result["id"])
+                if best is None or result["score"] > best["score"]:
+                    merged[result["id"]] = result
+
+        results = sorted(merged.values(), key=lambda result: result["score"], reverse=True)
+        results = self._select_diverse(results, limit) if diversify else results[:limit]
+        logger.info(f"Found {len(results)} matching results for {len(queries)} queries")
+        return results
+
+    async def get_all_chunks_by_notebook_id(self, notebook_id: str) -> List[Dict[str, Any]]:
+        """Get all chunks for a specific notebook ID.
+
+        Prefer iter_chunks_by_notebook_id for large notebooks.
+
+        Args:
+            notebook_id: Notebook ID to retrieve chunks for
+
+        Returns:
+            List of all chunks for the notebook with their metadata, in chunk_index order
+        """
+        return [chunk async for chunk in self.iter_chunks_by_notebook_id(notebook_id)]
+
+    def _select_diverse(self, candidates: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """Pick non-redundant results from over-fetched candidates."""
+        results = select_diverse(candidates, limit, self.mmr_lambda, self.duplicate_threshold)
+        logger.info(f"Selected {len(results)} diverse results from {len(candidates)} candidates")
+        return results
+
+    def _format_result(
+        self,
+        point_id: Any,
+        score: float,
+        payload: Dict[str, Any],
+        vector: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """Format a search hit as a result dict, with its dense vector if given."""
+        payload = self._decode_payload(payload)
+        result = {
+            "id": point_id,
+            "score": score,
+            "content_chunk": payload.get("content_chunk"),
+            "notebook_id": payload.get("notebook_id"),
+            "metadata": payload.get("metadata"),
+            "url": payload.get("url"),
+            "page_title": payload.get("page_title"),
+        }
+        if vector is not None:
+            result["vector"] = vector
+        return result
+
+    def _format_chunk(self, point_id: Any, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a stored point as a chunk dict."""
+        payload = self._decode_payload(payload)
+        return {
+            "id": point_id,
+            "content_chunk": payload.get("content_chunk"),
+            "chunk_index": payload.get("chunk_index"),
+            "total_chunks": payload.get("total_chunks"),
+            "notebook_id": payload.get("notebook_id"),
+            "metadata": payload.get("metadata"),
+            "url": payload.get("url"),
+            "page_title": payload.get("page_title"),
+        }
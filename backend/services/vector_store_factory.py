@@ -0,0 +1,142 @@
+# backend/services/vector_store_factory.py
+"""
+Factory for creating vector store instances.
+"""
+import os
+from typing import Optional
+from loguru import logger
+from config.settings import settings
+from .chunking import WordWindowChunker
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .embedding_provider import (
+    EmbeddingProvider,
+    EmbeddingProviderType,
+    HashingEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    SentenceTransformerEmbeddingProvider,
+)
+from .rate_limiter import AdaptiveRateLimiter
+from .vector_store import BaseVectorStore
+
+class VectorStoreType:
+    QDRANT = "qdrant"
+    LOCAL = "local"
+
+# Shared by every store in the process so concurrent tasks, chats and audio jobs
+# draw from the same OpenAI request and token budget
+embedding_rate_limiter = AdaptiveRateLimiter(
+    requests_per_minute=settings.EMBEDDING_REQUESTS_PER_MINUTE or None,
+    tokens_per_minute=settings.EMBEDDING_TOKENS_PER_MINUTE or None,
+    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+    max_retries=settings.EMBEDDING_MAX_RETRIES,
+    name="Embeddings API",
+)
+
+class VectorStoreFactory:
+    @classmethod
+    def get_embedding_provider(cls, provider_type: Optional[str] = None) -> EmbeddingProvider:
+        """
+        Get embedding provider instance.
+
+        Args:
+            provider_type: Type of embedding provider ('openai', 'local' or 'hashing')
+
+        Returns:
+            Embedding provider instance
+        """
+        if provider_type is None:
+            provider_type = EmbeddingProviderType.OPENAI
+
+        if provider_type == EmbeddingProviderType.OPENAI:
+            logger.info(f"Using OpenAI embeddings ({settings.EMBEDDING_MODEL})")
+            return OpenAIEmbeddingProvider(
+                model=settings.EMBEDDING_MODEL,
+                api_key=os.getenv("OPENAI_API_KEY"),
+            )
+        elif provider_type == EmbeddingProviderType.LOCAL:
+            logger.info(f"Using local embedding model ({settings.LOCAL_EMBEDDING_MODEL})")
+            return SentenceTransformerEmbeddingProvider(
+                model=settings.LOCAL_EMBEDDING_MODEL,
+                device=settings.LOCAL_EMBEDDING_DEVICE,
+            )
+        elif provider_type == EmbeddingProviderType.HASHING:
+            logger.info("Using deterministic hashing embeddings")
+            return HashingEmbeddingProvider(dimension=settings.HASHING_EMBEDDING_DIMENSION)
+        else:
+            raise ValueError(f"Unsupported embedding provider: {provider_type}")
+
+    @classmethod
+    def get_vector_store(cls, store_type: Optional[str] = None) -> BaseVectorStore:
+        """
+        Get vector store instance. The store is not initialized yet.
+
+        Args:
+            store_type: Type of vector store to use ('qdrant' or 'local')
+
+        Returns:
+            Vector store instance
+        """
+        if store_type is None:
+            store_type = VectorStoreType.QDRANT
+
+        embedding_provider = cls.get_embedding_provider(settings.EMBEDDING_PROVIDER)
+        options = dict(
+            embedding_provider=embedding_provider,
+            rate_limiter=embedding_rate_limiter if isinstance(embedding_provider, OpenAIEmbeddingProvider) else None,
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP,
+            embedding_batch_size=settings.EMBEDDING_BATCH_SIZE,
+            embedding_batch_max_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+            upsert_batch_size=settings.QDRANT_UPSERT_BATCH_SIZE,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+            ingestion_concurrency=settings.INGESTION_CONCURRENCY,
+            embedding_cache=EmbeddingCache(
+                path=settings.EMBEDDING_CACHE_PATH,
+                max_size_mb=settings.EMBEDDING_CACHE_MAX_SIZE_MB,
+            ) if settings.EMBEDDING_CACHE_ENABLED else None,
+            query_embedding_cache=QueryEmbeddingCache(
+                max_entries=settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+            ) if settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES > 0 else None,
+            scroll_page_size=settings.QDRANT_SCROLL_PAGE_SIZE,
+            diversify=settings.SEARCH_DIVERSIFY,
+            mmr_lambda=settings.SEARCH_MMR_LAMBDA,
+            mmr_fetch_multiplier=settings.SEARCH_MMR_FETCH_MULTIPLIER,
+            duplicate_threshold=settings.SEARCH_DUPLICATE_THRESHOLD,
+            chunk_text_compression=None if settings.CHUNK_TEXT_COMPRESSION == "none" else settings.CHUNK_TEXT_COMPRESSION,
+            chunker=WordWindowChunker(
+                chunk_size=settings.CHUNK_SIZE,
+                chunk_overlap=settings.CHUNK_OVERLAP,
+            ) if settings.CHUNKER == "words" else None,
+        )
+
+        if store_type == VectorStoreType.QDRANT:
+            logger.info("Using Qdrant vector store")
+            from .qdrant_service import QdrantSourceStore
+            return QdrantSourceStore(
+                qdrant_url=os.getenv("QDRANT_API_URL"),
+                qdrant_api_key=os.getenv("QDRANT_API_KEY"),
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                vectors_on_disk=settings.QDRANT_VECTORS_ON_DISK,
+                quantization=None if settings.QDRANT_QUANTIZATION == "none" else settings.QDRANT_QUANTIZATION,
+                quantization_oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+                hnsw_m=settings.QDRANT_HNSW_M,
+                hnsw_ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                hnsw_ef=settings.QDRANT_HNSW_EF,
+                hybrid=settings.SEARCH_HYBRID,
+                hybrid_prefetch_limit=settings.HYBRID_PREFETCH_LIMIT,
+                **options,
+            )
+        elif store_type == VectorStoreType.LOCAL:
+            logger.info("Using local memory-mapped vector store")
+            from .local_vector_store import LocalVectorStore
+            return LocalVectorStore(
+                path=settings.LOCAL_VECTOR_STORE_PATH,
+                max_open_notebooks=settings.LOCAL_VECTOR_STORE_MAX_OPEN_NOTEBOOKS,
+                **options,
+            )
+        else:
+            raise ValueError(f"Unsupported vector store type: {store_type}")
+
+# Global vector store instance, created without initialization
+vector_store = VectorStoreFactory.get_vector_store(settings.VECTOR_STORE_TYPE)
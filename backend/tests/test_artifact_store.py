@@ -0,0 +1,190 @@
+"""Tests of the offloading of large task result fields, with storage kept in memory."""
+
+import gzip
+import importlib
+import json
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Set
+
+import pytest
+
+from services.artifact_store import ARTIFACTS_KEY, ArtifactStore
+
+# The module, which services shadows with its task_repository instance
+task_repository_module = importlib.import_module("services.task_repository")
+
+MIN_BYTES = 100
+
+
+class MemoryStorage:
+    """Storage backend keeping objects in a dict."""
+
+    def __init__(self, failing_keys: Set[str] = frozenset()):
+        self.objects: Dict[str, bytes] = {}
+        self.failing_keys = failing_keys
+
+    async def put_object(self, key: str, content: bytes, content_type: str = "application/octet-stream") -> str:
+        if key in self.failing_keys:
+            raise OSError("storage unavailable")
+        self.objects[key] = content
+        return key
+
+    async def get_object(self, key: str) -> bytes:
+        return self.objects[key]
+
+    async def delete_object(self, key: str) -> bool:
+        return self.objects.pop(key, None) is not None
+
+
+def make_result() -> dict:
+    return {
+        "title": "Short",
+        "faq": [{"question": "q", "answer": "a"}],
+        "blog_post": "word " * 100,
+        "scraped_data": [{"url": f"https://example.com/{index}", "markdown": "text " * 50} for index in range(5)],
+    }
+
+
+@pytest.fixture
+def storage() -> MemoryStorage:
+    return MemoryStorage()
+
+
+@pytest.fixture
+def store(storage) -> ArtifactStore:
+    return ArtifactStore(storage, MIN_BYTES)
+
+
+def test_large_fields_are_offloaded_behind_a_manifest(run, storage, store):
+    result = make_result()
+    manifest = run(store.offload("task-1", result))
+
+    assert store.is_manifest(manifest)
+    assert (manifest["title"], manifest["faq"]) == (result["title"], result["faq"])
+    assert set(manifest[ARTIFACTS_KEY]) == {"blog_post", "scraped_data"}
+    assert "blog_post" not in manifest and "scraped_data" not in manifest
+
+    artifact = manifest[ARTIFACTS_KEY]["scraped_data"]
+    data = json.dumps(result["scraped_data"]).encode("utf-8")
+    assert artifact == {
+        "key": "tasks/task-1/scraped_data.json.gz",
+        "encoding": "gzip",
+        "size": len(data),
+        "compressed_size": len(storage.objects[artifact["key"]]),
+    }
+    assert gzip.decompress(storage.objects[artifact["key"]]) == data
+    # The manifest is what the row stores, so it must be JSON
+    json.dumps(manifest)
+
+    assert run(store.load(manifest)) == result
+
+
+def test_small_results_and_manifests_are_not_offloaded(run, storage, store):
+    small = {"title": "Short"}
+    assert run(store.offload("task-1", small)) is small
+    assert run(store.offload("task-1", "not a dict")) == "not a dict"
+
+    manifest = run(store.offload("task-1", make_result()))
+    assert run(store.offload("task-1", manifest)) is manifest
+    assert len(storage.objects) == 2
+
+    disabled = ArtifactStore(storage, 0)
+    result = make_result()
+    assert run(disabled.offload("task-2", result)) is result
+
+
+def test_load_fetches_only_the_fields_asked_for(run, storage, store):
+    result = make_result()
+    manifest = run(store.offload("task-1", result))
+    storage.objects.pop(manifest[ARTIFACTS_KEY]["scraped_data"]["key"])
+
+    assert run(store.load(manifest, fields=["title", "blog_post"])) == {
+        "title": result["title"],
+        "blog_post": result["blog_post"],
+    }
+    assert run(store.load(manifest, fields=["faq", "missing"])) == {"faq": result["faq"]}
+    # Results stored before offloading existed load as they are
+    assert run(store.load(result, fields=["title"])) == {"title": result["title"]}
+    assert run(store.load(None)) is None
+
+
+def test_fields_that_cannot_be_stored_stay_inline(run):
+    storage = MemoryStorage(failing_keys={"tasks/task-1/blog_post.json.gz"})
+    store = ArtifactStore(storage, MIN_BYTES)
+    result = make_result()
+    manifest = run(store.offload("task-1", result))
+
+    assert manifest["blog_post"] == result["blog_post"]
+    assert set(manifest[ARTIFACTS_KEY]) == {"scraped_data"}
+    assert run(store.load(manifest)) == result
+
+    everything_fails = MemoryStorage(failing_keys={
+        "tasks/task-1/blog_post.json.gz",
+        "tasks/task-1/scraped_data.json.gz",
+    })
+    assert run(ArtifactStore(everything_fails, MIN_BYTES).offload("task-1", result)) is result
+
+
+def test_delete_removes_the_offloaded_fields(run, storage, store):
+    manifest = run(store.offload("task-1", make_result()))
+    other = run(store.offload("task-2", make_result()))
+
+    run(store.delete(manifest))
+    assert sorted(storage.objects) == sorted(artifact["key"] for artifact in other[ARTIFACTS_KEY].values())
+    # Anything but a manifest is ignored
+    run(store.delete(make_result()))
+    run(store.delete(None))
+    assert len(storage.objects) == 2
+
+
+def test_offloaded_fields_are_deleted_when_saving_the_row_fails(run, storage, store, monkeypatch):
+    class FailingSession:
+        async def execute(self, statement):
+            raise ConnectionError("database unavailable")
+
+    @asynccontextmanager
+    async def get_db_session():
+        yield FailingSession()
+
+    monkeypatch.setattr(task_repository_module, "artifact_store", store)
+    monkeypatch.setattr(task_repository_module, "get_db_session", get_db_session)
+
+    with pytest.raises(ConnectionError):
+        run(task_repository_module.task_repository.update_task_result("task-1", make_result(), "completed"))
+    assert storage.objects == {}
+
+
+@pytest.mark.usefixtures("db")
+def test_offloaded_fields_are_deleted_when_the_row_is_not_updated(run, storage, store, monkeypatch):
+    from models.db import Task
+    from services.db_service import get_db_session
+    from services.job_queue import job_queue
+
+    monkeypatch.setattr(task_repository_module, "artifact_store", store)
+    repository = task_repository_module.task_repository
+
+    async def scenario():
+        # A task that does not exist
+        assert not await repository.update_task_result(str(uuid.uuid4()), make_result(), "completed")
+        assert storage.objects == {}
+
+        # A task cancelled meanwhile
+        task_id = str(uuid.uuid4())
+        async with get_db_session() as session:
+            session.add(Task(id=task_id, notebook_id=str(uuid.uuid4()), status="running"))
+            await session.commit()
+        await job_queue.enqueue(task_id, "research")
+        await job_queue.cancel(task_id)
+        assert not await repository.update_task_result(task_id, make_result(), "completed")
+        assert storage.objects == {}
+
+        # The manifest of a saved result stays with its fields
+        other_id = str(uuid.uuid4())
+        async with get_db_session() as session:
+            session.add(Task(id=other_id, notebook_id=str(uuid.uuid4()), status="running"))
+            await session.commit()
+        assert await repository.update_task_result(other_id, make_result(), "completed")
+        assert len(storage.objects) == 2
+
+    run(scenario())
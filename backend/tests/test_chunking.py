@@ -0,0 +1,114 @@
+"""Tests of the chunkers, counting tokens with the offline character estimate."""
+
+import pytest
+
+from services import chunking
+from services.chunking import MarkdownChunker, TokenCounter, WordWindowChunker
+
+
+@pytest.fixture
+def counter(monkeypatch):
+    """A TokenCounter that cannot load the tokenizer, so it estimates ~4 characters per token."""
+    def unavailable(*args, **kwargs):
+        raise OSError("no network")
+
+    monkeypatch.setattr(chunking.tiktoken, "encoding_for_model", unavailable)
+    monkeypatch.setattr(chunking.tiktoken, "get_encoding", unavailable)
+    token_counter = TokenCounter()
+    assert token_counter.count("x" * 40) == 11
+    return token_counter
+
+
+def make_chunker(counter, max_tokens=60, overlap_tokens=10):
+    return MarkdownChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens, token_counter=counter)
+
+
+def paragraph(number: int, sentences: int = 4) -> str:
+    return " ".join(f"Paragraph {number} sentence {index} says something." for index in range(sentences))
+
+
+def test_word_windows_overlap():
+    words = " ".join(f"w{index}" for index in range(10))
+    chunks = list(WordWindowChunker(chunk_size=5, chunk_overlap=2).chunk(words))
+    assert chunks == ["w0 w1 w2 w3 w4", "w3 w4 w5 w6 w7", "w6 w7 w8 w9"]
+
+
+def test_word_windows_have_no_duplicate_tail():
+    # The last window ends on the last word, so no tail made only of overlap follows it
+    words = " ".join(f"w{index}" for index in range(8))
+    chunks = list(WordWindowChunker(chunk_size=5, chunk_overlap=2).chunk(words))
+    assert chunks == ["w0 w1 w2 w3 w4", "w3 w4 w5 w6 w7"]
+
+
+def test_word_window_overlap_must_be_smaller_than_the_window():
+    with pytest.raises(ValueError):
+        WordWindowChunker(chunk_size=5, chunk_overlap=5)
+
+
+def test_markdown_chunks_never_exceed_max_tokens(counter):
+    text = "\n\n".join([
+        "# Title",
+        paragraph(1),
+        "## Long words",
+        "x" * 1000,
+        "## Long sentence",
+        " ".join(["word"] * 300) + ".",
+        "| a | b |\n|---|---|\n" + "\n".join(f"| {index} | {'y' * 30} |" for index in range(40)),
+        "```\n" + "\n".join(f"print({index})" for index in range(80)) + "\n```",
+        *[paragraph(number) for number in range(2, 10)],
+    ])
+    chunker = make_chunker(counter)
+    chunks = list(chunker.chunk(text))
+
+    assert len(chunks) > 10
+    for chunk in chunks:
+        assert counter.count(chunk) <= chunker.max_tokens, chunk
+
+
+def test_markdown_chunks_have_no_duplicate_tail(counter):
+    chunks = list(make_chunker(counter).chunk("\n\n".join(paragraph(number) for number in range(6))))
+
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk not in previous
+    # Every sentence is in a chunk, and the last one ends the last chunk
+    for number in range(6):
+        for index in range(4):
+            assert any(f"Paragraph {number} sentence {index} " in chunk for chunk in chunks)
+    assert chunks[-1].endswith("Paragraph 5 sentence 3 says something.")
+
+
+def test_markdown_headings_stay_with_their_first_piece(counter):
+    text = "\n\n".join([
+        "# Introduction",
+        paragraph(1, sentences=6),
+        "## Details",
+        paragraph(2, sentences=6),
+    ])
+    chunks = list(make_chunker(counter).chunk(text))
+
+    assert "## Details" not in chunks
+    details = [chunk for chunk in chunks if "## Details" in chunk]
+    assert len(details) == 1
+    # A short tail of the previous section may share the chunk (see min_heading_split_tokens)
+    assert "## Details\n\nParagraph 2 sentence 0" in details[0]
+    assert chunks[0].startswith("# Introduction\n\nParagraph 1 sentence 0")
+
+
+def test_markdown_tables_repeat_their_header_when_split(counter):
+    header = "| name | value |\n|------|-------|"
+    rows = [f"| row {index} | {'v' * 20} |" for index in range(30)]
+    chunks = list(make_chunker(counter).chunk("\n".join([header, *rows])))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith(header + "\n")
+    # Every row is kept whole, in exactly one chunk
+    for row in rows:
+        assert sum(row in chunk.split("\n") for chunk in chunks) == 1
+
+
+def test_markdown_keeps_small_code_blocks_intact(counter):
+    code = "```python\ndef f():\n    return 1\n```"
+    chunks = list(make_chunker(counter).chunk(f"{paragraph(1)}\n\n{code}\n\n{paragraph(2)}"))
+    assert any(code in chunk for chunk in chunks)
@@ -0,0 +1,257 @@
+"""Tests of the JobQueue SQL against Postgres (skipped without TEST_DATABASE_URL)."""
+
+import asyncio
+import uuid
+from typing import Any, Dict, Optional
+
+import pytest
+from sqlalchemy import select, text, update
+
+from models.db import Task, TaskJob
+from services.db_service import get_db_session
+from services.job_queue import job_queue
+
+pytestmark = pytest.mark.usefixtures("db")
+
+LEASE_SECONDS = 60
+
+
+async def add_job(task_type: str = "research", max_attempts: int = 3) -> str:
+    """Create a task and queue its job, returning the job's ID."""
+    task_id = str(uuid.uuid4())
+    async with get_db_session() as session:
+        session.add(Task(id=task_id, notebook_id=str(uuid.uuid4()), status="queued"))
+        await session.commit()
+    await job_queue.enqueue(task_id, task_type, max_attempts=max_attempts)
+    return await get_job_id(task_id)
+
+
+async def get_job_id(task_id: str) -> str:
+    async with get_db_session() as session:
+        return (await session.execute(select(TaskJob.id).where(TaskJob.task_id == task_id))).scalar_one()
+
+
+async def get_job(job_id: str) -> TaskJob:
+    async with get_db_session() as session:
+        return await session.get(TaskJob, job_id)
+
+
+async def expire_lease(job_id: str) -> None:
+    """Let a job's lease run out, as if its worker stopped sending heartbeats."""
+    async with get_db_session() as session:
+        await session.execute(
+            update(TaskJob)
+            .where(TaskJob.id == job_id)
+            .values(lease_expires_at=text("now() - interval '1 second'"))
+        )
+        await session.commit()
+
+
+async def claim(worker_id: str = "worker-1", **kwargs: Any) -> Optional[Dict[str, Any]]:
+    return await job_queue.claim(worker_id, LEASE_SECONDS, **kwargs)
+
+
+def test_claims_the_oldest_queued_job_once(run):
+    async def scenario():
+        first = await add_job()
+        second = await add_job()
+
+        claimed = await claim()
+        assert claimed["id"] == first
+        assert claimed["attempts"] == 1
+        assert claimed["exhausted"] is False
+        job = await get_job(first)
+        assert (job.status, job.locked_by) == ("running", "worker-1")
+
+        assert (await claim())["id"] == second
+        assert await claim() is None
+
+    run(scenario())
+
+
+def test_claims_skip_locked_jobs(run):
+    async def scenario():
+        locked = await add_job()
+        free = await add_job()
+
+        # Another worker's claim transaction holds the oldest job's row
+        async with get_db_session() as session:
+            await session.execute(select(TaskJob).where(TaskJob.id == locked).with_for_update())
+            claimed = await claim()
+            await session.commit()
+
+        assert claimed["id"] == free
+        assert (await claim())["id"] == locked
+
+    run(scenario())
+
+
+def test_concurrent_claims_hand_out_each_job_once(run):
+    async def scenario():
+        job_ids = {await add_job() for _ in range(5)}
+        claims = await asyncio.gather(*[claim(f"worker-{number}") for number in range(10)])
+        claimed = [job["id"] for job in claims if job is not None]
+        assert sorted(claimed) == sorted(job_ids)
+
+    run(scenario())
+
+
+def test_claims_respect_the_running_limit(run):
+    async def scenario():
+        for _ in range(5):
+            await add_job()
+        claims = await asyncio.gather(*[claim(f"worker-{number}", max_running=2) for number in range(5)])
+        assert len([job for job in claims if job is not None]) == 2
+        assert await claim(max_running=2) is None
+        assert await claim(max_running=3) is not None
+
+    run(scenario())
+
+
+def test_claims_respect_the_running_limit_of_each_type(run):
+    async def scenario():
+        await add_job("research")
+        await add_job("research")
+        mindmap = await add_job("mindmap")
+        limits = {"research": 1, "mindmap": 1}
+
+        assert (await claim(max_running_by_type=limits))["task_type"] == "research"
+        # The second research job waits, the mindmap job behind it runs
+        assert (await claim(max_running_by_type=limits))["id"] == mindmap
+        assert await claim(max_running_by_type=limits) is None
+
+    run(scenario())
+
+
+def test_limits_of_zero_mean_unlimited(run):
+    async def scenario():
+        for _ in range(3):
+            await add_job("research")
+        limits = {"research": 0, "mindmap": 1}
+        for _ in range(3):
+            assert (await claim(max_running=0, max_running_by_type=limits))["task_type"] == "research"
+
+    run(scenario())
+
+
+def test_jobs_with_expired_leases_do_not_count_as_running(run):
+    async def scenario():
+        first = await add_job()
+        await add_job()
+        await claim(max_running=1)
+        assert await claim(max_running=1) is None
+
+        await expire_lease(first)
+        # The expired job is claimed again before the queued one
+        assert (await claim("worker-2", max_running=1))["id"] == first
+
+    run(scenario())
+
+
+def test_reclaims_jobs_whose_lease_expired(run):
+    async def scenario():
+        job_id = await add_job()
+        await claim("worker-1")
+        await expire_lease(job_id)
+
+        claimed = await claim("worker-2")
+        assert claimed["id"] == job_id
+        assert claimed["attempts"] == 2
+        assert claimed["exhausted"] is False
+
+        # The first worker lost the job
+        assert not await job_queue.heartbeat(job_id, "worker-1", LEASE_SECONDS)
+        assert not await job_queue.complete(job_id, "worker-1")
+        assert not await job_queue.fail(job_id, "worker-1", "boom")
+        assert await job_queue.complete(job_id, "worker-2")
+        assert (await get_job(job_id)).status == "completed"
+
+    run(scenario())
+
+
+def test_claims_jobs_expired_on_their_last_attempt_as_exhausted(run):
+    async def scenario():
+        job_id = await add_job(max_attempts=1)
+        await claim("worker-1")
+        await expire_lease(job_id)
+
+        claimed = await claim("worker-2")
+        assert claimed["id"] == job_id
+        assert claimed["attempts"] == 1
+        assert claimed["exhausted"] is True
+
+        # Giving up fails the job for good
+        assert not await job_queue.fail(job_id, "worker-2", "Task was interrupted too many times")
+        job = await get_job(job_id)
+        assert (job.status, job.last_error) == ("failed", "Task was interrupted too many times")
+        assert await claim() is None
+
+    run(scenario())
+
+
+def test_heartbeats_extend_the_lease(run):
+    async def scenario():
+        job_id = await add_job()
+        await claim("worker-1")
+        await expire_lease(job_id)
+
+        assert await job_queue.heartbeat(job_id, "worker-1", LEASE_SECONDS)
+        assert not await job_queue.heartbeat(job_id, "worker-2", LEASE_SECONDS)
+        # Renewed before anyone claimed it, so it is not available
+        assert await claim("worker-2") is None
+
+    run(scenario())
+
+
+def test_failed_jobs_are_queued_again_until_attempts_run_out(run):
+    async def scenario():
+        job_id = await add_job(max_attempts=2)
+        await claim()
+
+        assert await job_queue.fail(job_id, "worker-1", "first", retry_delay_seconds=60)
+        job = await get_job(job_id)
+        assert (job.status, job.locked_by, job.last_error) == ("queued", None, "first")
+        # Not available before the retry delay
+        assert await claim() is None
+
+        async with get_db_session() as session:
+            await session.execute(update(TaskJob).where(TaskJob.id == job_id).values(available_at=text("now()")))
+            await session.commit()
+        assert (await claim())["attempts"] == 2
+
+        assert not await job_queue.fail(job_id, "worker-1", "second", retry_delay_seconds=60)
+        job = await get_job(job_id)
+        assert (job.status, job.last_error) == ("failed", "second")
+        assert await claim() is None
+
+    run(scenario())
+
+
+def test_cancelled_jobs_are_not_claimed(run):
+    async def scenario():
+        job_id = await add_job()
+        task_id = (await get_job(job_id)).task_id
+
+        assert await job_queue.cancel(task_id) == {"id": job_id, "task_type": "research", "status": "queued"}
+        assert await claim() is None
+        assert await job_queue.cancel(task_id) is None
+
+    run(scenario())
+
+
+def test_running_jobs_see_their_cancellation(run):
+    async def scenario():
+        job_id = await add_job()
+        other = await add_job()
+        task_id = (await get_job(job_id)).task_id
+        await claim()
+        await claim()
+
+        assert (await job_queue.cancel(task_id))["status"] == "running"
+        assert await job_queue.get_cancelled([job_id, other]) == [job_id]
+        # The worker stops the job once its heartbeat fails
+        assert not await job_queue.heartbeat(job_id, "worker-1", LEASE_SECONDS)
+        assert not await job_queue.complete(job_id, "worker-1")
+        assert (await get_job(job_id)).status == "cancelled"
+
+    run(scenario())
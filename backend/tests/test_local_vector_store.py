@@ -0,0 +1,143 @@
+"""Tests of LocalVectorStore on a temporary directory, embedding with the offline hashing provider."""
+
+import pytest
+
+from services.embedding_provider import HashingEmbeddingProvider
+from services.local_vector_store import LocalVectorStore, _NotebookIndex
+
+DIMENSION = 8
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    """Create stores sharing one directory, as the API and worker processes do."""
+    def make() -> LocalVectorStore:
+        return LocalVectorStore(path=str(tmp_path), embedding_provider=HashingEmbeddingProvider(dimension=64))
+
+    return make
+
+
+def axis(index: int) -> list:
+    vector = [0.0] * DIMENSION
+    vector[index] = 1.0
+    return vector
+
+
+def points(notebook_id: str, indexes) -> list:
+    """Points whose vectors are unit axes, so a search for an axis finds exactly one of them."""
+    return [
+        (f"{notebook_id}-{index}", axis(index), {"notebook_id": notebook_id, "chunk_index": index, "content_chunk": f"chunk {index}"})
+        for index in indexes
+    ]
+
+
+def test_added_sources_are_found_by_search(run, make_store):
+    async def scenario():
+        store = make_store()
+        cats = await store.add_source("Cats purr and sleep in the sun all day.", "nb", metadata={"url": "https://cats.example"})
+        rockets = await store.add_source("Rockets burn fuel to reach orbit.", "nb")
+        await store.add_source("Cats purr and sleep in the sun all day.", "other")
+
+        results = await store.search("why do cats purr", notebook_id="nb", limit=1)
+        assert [result["id"] for result in results] == cats
+        assert results[0]["content_chunk"] == "Cats purr and sleep in the sun all day."
+        assert results[0]["notebook_id"] == "nb"
+
+        index = await store.get_point_index("nb")
+        assert set(index) == {*cats, *rockets}
+        assert all("content_chunk" not in payload for payload in index.values())
+
+    run(scenario())
+
+
+def test_deleting_points_compacts_the_matrix(run, make_store):
+    async def scenario():
+        store = make_store()
+        await store._upsert_points(points("nb", range(5)))
+        await store.delete_points(["nb-1", "nb-3"], notebook_id="nb")
+
+        notebook = store._open("nb")
+        assert notebook.ids == ["nb-0", "nb-2", "nb-4"]
+        assert notebook.rows == {"nb-0": 0, "nb-2": 1, "nb-4": 2}
+        assert notebook.vectors[2].tolist() == axis(4)
+        # Every remaining point is still found with its own vector
+        for index in (0, 2, 4):
+            results = await store._search_by_vector(axis(index), "nb", limit=1)
+            assert results[0]["id"] == f"nb-{index}"
+            assert results[0]["score"] == pytest.approx(1.0)
+        assert [chunk["id"] async for chunk in store.iter_chunks_by_notebook_id("nb")] == ["nb-0", "nb-2", "nb-4"]
+
+        # New points go after the compacted rows
+        await store._upsert_points(points("nb", [5]))
+        assert store._open("nb").rows["nb-5"] == 3
+
+    run(scenario())
+
+
+def test_readers_pick_up_writes_of_other_stores(run, make_store):
+    async def scenario():
+        writer, reader = make_store(), make_store()
+        await writer._upsert_points(points("nb", range(2)))
+        assert set(await reader.get_point_index("nb")) == {"nb-0", "nb-1"}
+
+        # Appended to the same log
+        await writer._upsert_points(points("nb", [2]))
+        await writer._overwrite_payloads({"nb-0": {"notebook_id": "nb", "chunk_index": 0, "title": "new"}})
+        index = await reader.get_point_index("nb")
+        assert set(index) == {"nb-0", "nb-1", "nb-2"}
+        assert index["nb-0"]["title"] == "new"
+        assert (await reader._search_by_vector(axis(2), "nb", limit=1))[0]["id"] == "nb-2"
+
+        # Rewritten under the next generation
+        await writer.delete_points(["nb-1"], notebook_id="nb")
+        assert set(await reader.get_point_index("nb")) == {"nb-0", "nb-2"}
+
+    run(scenario())
+
+
+def test_uncommitted_log_tails_are_ignored(run, make_store):
+    async def scenario():
+        writer = make_store()
+        await writer._upsert_points(points("nb", range(2)))
+        notebook = writer._open("nb")
+        log_path = notebook._log_path(notebook.generation)
+
+        # A writer that crashed after appending to the log but before committing the index
+        with open(log_path, "ab") as f:
+            f.write(b'[2, "nb-crashed", {"notebook_id": "nb"}]\n[3, "nb-tor')
+        assert set(await make_store().get_point_index("nb")) == {"nb-0", "nb-1"}
+
+        # The next write replaces the tail
+        await writer._upsert_points(points("nb", [2]))
+        assert set(await make_store().get_point_index("nb")) == {"nb-0", "nb-1", "nb-2"}
+        assert b"nb-crashed" not in log_path.read_bytes()
+
+    run(scenario())
+
+
+def test_delete_by_notebook_id_removes_only_that_notebook(run, make_store):
+    async def scenario():
+        store, reader = make_store(), make_store()
+        await store._upsert_points(points("nb", range(3)) + points("other", range(2)))
+        assert len(await reader.get_point_index("nb")) == 3
+
+        assert await store.delete_by_notebook_id("nb") == 3
+        assert not store._directory("nb").exists()
+        assert await store.get_point_index("nb") == {}
+        assert await reader.get_point_index("nb") == {}
+        assert await store._search_by_vector(axis(0), "nb", limit=5) == []
+        assert set(await store.get_point_index("other")) == {"other-0", "other-1"}
+        assert store._notebook_ids() == ["other"]
+
+        # The notebook can be filled again
+        await store._upsert_points(points("nb", [4]))
+        assert set(await reader.get_point_index("nb")) == {"nb-4"}
+
+    run(scenario())
+
+
+def test_vectors_of_another_dimension_are_rejected(tmp_path):
+    notebook = _NotebookIndex(tmp_path / "nb", "nb")
+    notebook.upsert(points("nb", [0]))
+    with pytest.raises(ValueError):
+        notebook.upsert([("nb-1", [1.0, 0.0], {"notebook_id": "nb"})])
@@ -0,0 +1,76 @@
+"""Tests of the error classification and retries of AdaptiveRateLimiter."""
+
+import pytest
+
+from services.rate_limiter import AdaptiveRateLimiter, is_overload_error, is_retryable_error
+
+
+class StatusError(Exception):
+    """An API error carrying an HTTP status code, as the OpenAI and httpx errors do."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def make_limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(max_concurrency=8, max_retries=3, base_delay=0, max_delay=0)
+
+
+def failing(*errors: Exception):
+    """An operation that raises the given errors in turn, then returns "ok"."""
+    calls = []
+
+    async def operation():
+        calls.append(None)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return operation, calls
+
+
+def test_errors_are_classified():
+    assert is_retryable_error(StatusError(429)) and is_overload_error(StatusError(429))
+    assert is_retryable_error(StatusError(503)) and is_overload_error(StatusError(503))
+    assert is_retryable_error(TimeoutError()) and is_overload_error(TimeoutError())
+    assert is_retryable_error(ConnectionResetError()) and is_overload_error(ConnectionResetError())
+    assert not is_retryable_error(StatusError(400)) and not is_overload_error(StatusError(400))
+    assert not is_retryable_error(TypeError()) and not is_overload_error(TypeError())
+    assert not is_retryable_error(KeyError("x"))
+    # Other errors are retried, but do not mean the API is overloaded
+    assert is_retryable_error(RuntimeError()) and not is_overload_error(RuntimeError())
+    # Wrapped errors are classified by their cause
+    try:
+        raise Exception("wrapped") from TimeoutError()
+    except Exception as e:
+        assert is_overload_error(e)
+
+
+@pytest.mark.parametrize("error", [TypeError("bad argument"), KeyError("missing"), StatusError(401)])
+def test_non_retryable_errors_are_raised_at_once(run, error):
+    limiter = make_limiter()
+    operation, calls = failing(error)
+    with pytest.raises(type(error)):
+        run(limiter.run(operation))
+    assert len(calls) == 1
+    assert limiter.concurrency == 8
+
+
+def test_only_overload_errors_lower_concurrency(run):
+    limiter = make_limiter()
+    operation, calls = failing(RuntimeError("invalid output"))
+    assert run(limiter.run(operation)) == "ok"
+    assert limiter.concurrency == 8
+
+    operation, calls = failing(StatusError(429))
+    assert run(limiter.run(operation)) == "ok"
+    assert (limiter.concurrency, limiter.rate_limited) == (4, 1)
+
+
+def test_retries_stop_after_max_retries(run):
+    limiter = make_limiter()
+    operation, calls = failing(*[StatusError(500)] * 5)
+    with pytest.raises(StatusError):
+        run(limiter.run(operation))
+    assert len(calls) == 3
@@ -0,0 +1,60 @@
+"""Tests of the cancellation guards of TaskRepository against Postgres (skipped without TEST_DATABASE_URL)."""
+
+import uuid
+
+import pytest
+
+from models.db import Task
+from services.db_service import get_db_session
+from services.job_queue import job_queue
+from services.task_repository import task_repository
+
+pytestmark = pytest.mark.usefixtures("db")
+
+
+async def add_task(status: str = "queued") -> str:
+    task_id = str(uuid.uuid4())
+    async with get_db_session() as session:
+        session.add(Task(id=task_id, notebook_id=str(uuid.uuid4()), status=status))
+        await session.commit()
+    await job_queue.enqueue(task_id, "research")
+    return task_id
+
+
+def test_cancelled_tasks_keep_their_status(run):
+    async def scenario():
+        task_id = await add_task()
+        await job_queue.cancel(task_id)
+        assert await task_repository.update_task_status(task_id, "cancelled")
+
+        assert not await task_repository.update_task_status(task_id, "running")
+        assert not await task_repository.update_task_result(task_id, {"title": "t"}, "completed")
+        assert not await task_repository.update_task_error(task_id, "boom")
+        task = await task_repository.get_task(task_id)
+        assert (task["status"], task["result"], task["error"]) == ("cancelled", None, None)
+
+    run(scenario())
+
+
+def test_tasks_whose_job_was_cancelled_can_only_be_cancelled(run):
+    async def scenario():
+        task_id = await add_task("running")
+        # cancel_task cancels the job before the task
+        await job_queue.cancel(task_id)
+
+        assert not await task_repository.update_task_result(task_id, {"title": "t"}, "completed")
+        assert not await task_repository.update_task_status(task_id, "running")
+        assert await task_repository.update_task_status(task_id, "cancelled")
+
+    run(scenario())
+
+
+def test_finished_tasks_cannot_be_cancelled(run):
+    async def scenario():
+        task_id = await add_task("running")
+        assert await task_repository.update_task_result(task_id, {"title": "t"}, "completed")
+
+        assert not await task_repository.update_task_status(task_id, "cancelled")
+        assert (await task_repository.get_task(task_id))["status"] == "completed"
+
+    run(scenario())
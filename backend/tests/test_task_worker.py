@@ -0,0 +1,308 @@
+"""Tests of TaskWorker against an in-memory job queue."""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from services import task_worker
+from services.cancellation import is_cancelled
+from services.job_queue import LeaseExpiredError
+from services.task_worker import TaskWorker
+
+
+class FakeJobQueue:
+    """Hands out the jobs it was given and records how the worker settled them."""
+
+    def __init__(self, jobs: List[Dict[str, Any]]):
+        self.jobs = list(jobs)
+        self.completed: List[str] = []
+        self.failed: List[tuple] = []
+        self.heartbeats: List[str] = []
+        self.cancelled: List[str] = []
+        # Result of heartbeat(): True renews, False reports the lease lost, an exception fails the call
+        self.heartbeat_result: Any = True
+        self.claim_error: Optional[Exception] = None
+
+    async def claim(self, worker_id, lease_seconds, task_types=None, max_running=None, max_running_by_type=None):
+        if self.claim_error is not None:
+            error, self.claim_error = self.claim_error, None
+            raise error
+        return self.jobs.pop(0) if self.jobs else None
+
+    async def heartbeat(self, job_id, worker_id, lease_seconds):
+        self.heartbeats.append(job_id)
+        if isinstance(self.heartbeat_result, Exception):
+            raise self.heartbeat_result
+        return self.heartbeat_result
+
+    async def complete(self, job_id, worker_id):
+        self.completed.append(job_id)
+        return True
+
+    async def fail(self, job_id, worker_id, error, retry_delay_seconds=30):
+        self.failed.append((job_id, error, retry_delay_seconds))
+        return True
+
+    async def get_cancelled(self, job_ids):
+        return [job_id for job_id in job_ids if job_id in self.cancelled]
+
+
+def make_job(number: int, exhausted: bool = False) -> Dict[str, Any]:
+    return {
+        "id": f"job-{number}",
+        "task_id": f"task-{number}",
+        "task_type": "research",
+        "attempts": 3 if exhausted else 1,
+        "max_attempts": 3,
+        "exhausted": exhausted,
+    }
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    fake = FakeJobQueue([])
+    monkeypatch.setattr(task_worker, "job_queue", fake)
+    return fake
+
+
+def make_worker(handler, **kwargs) -> TaskWorker:
+    options = {"poll_interval": 0.01, "heartbeat_interval": 0.01, "lease_seconds": 1, "retry_delay_seconds": 5}
+    options.update(kwargs)
+    return TaskWorker(handler, **options)
+
+
+async def run_until(worker: TaskWorker, condition, timeout: float = 2.0) -> None:
+    """Run the worker until ``condition()`` holds, then shut it down."""
+    worker.start()
+    try:
+        async with asyncio.timeout(timeout):
+            while not condition():
+                await asyncio.sleep(0.005)
+    finally:
+        await worker.shutdown(timeout=1.0)
+
+
+def test_completes_successful_jobs(run, queue):
+    queue.jobs = [make_job(1), make_job(2)]
+    handled = []
+
+    async def handler(job):
+        handled.append(job["id"])
+
+    run(run_until(make_worker(handler), lambda: len(queue.completed) == 2))
+
+    assert handled == ["job-1", "job-2"]
+    assert queue.completed == ["job-1", "job-2"]
+    assert queue.failed == []
+
+
+def test_fails_jobs_whose_handler_raises(run, queue):
+    queue.jobs = [make_job(1)]
+
+    async def handler(job):
+        raise RuntimeError("boom")
+
+    run(run_until(make_worker(handler), lambda: queue.failed))
+
+    assert queue.failed == [("job-1", "boom", 5)]
+    assert queue.completed == []
+
+
+def test_runs_at_most_concurrency_jobs(run, queue):
+    queue.jobs = [make_job(number) for number in range(5)]
+    running = 0
+    peak = 0
+
+    async def handler(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    run(run_until(make_worker(handler, concurrency=2), lambda: len(queue.completed) == 5))
+
+    assert peak == 2
+
+
+def test_keeps_polling_after_claim_errors(run, queue):
+    queue.jobs = [make_job(1)]
+    queue.claim_error = ConnectionError("database unavailable")
+
+    async def handler(job):
+        pass
+
+    run(run_until(make_worker(handler), lambda: queue.completed))
+
+    assert queue.completed == ["job-1"]
+
+
+def test_heartbeats_renew_the_lease_of_running_jobs(run, queue):
+    queue.jobs = [make_job(1)]
+    release = asyncio.Event()
+
+    async def handler(job):
+        await release.wait()
+
+    async def scenario():
+        worker = make_worker(handler)
+        worker.start()
+        while len(queue.heartbeats) < 3:
+            await asyncio.sleep(0.005)
+        release.set()
+        while not queue.completed:
+            await asyncio.sleep(0.005)
+        await worker.shutdown()
+
+    run(scenario())
+
+    assert set(queue.heartbeats) == {"job-1"}
+    assert queue.completed == ["job-1"]
+
+
+def test_stops_jobs_whose_lease_was_lost(run, queue):
+    queue.jobs = [make_job(1)]
+    queue.heartbeat_result = False
+    outcome = {}
+
+    async def handler(job):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            outcome["cancelled"] = is_cancelled()
+            raise
+
+    worker = make_worker(handler)
+    run(run_until(worker, lambda: outcome))
+
+    assert outcome == {"cancelled": True}
+    # Another worker holds the job now: this one neither completes nor fails it
+    assert queue.completed == []
+    assert queue.failed == []
+    assert worker._jobs == {}
+
+
+def test_keeps_running_jobs_when_heartbeats_fail(run, queue):
+    queue.jobs = [make_job(1)]
+    queue.heartbeat_result = ConnectionError("database unavailable")
+
+    async def handler(job):
+        await asyncio.sleep(0.1)
+
+    run(run_until(make_worker(handler), lambda: queue.completed))
+
+    assert len(queue.heartbeats) > 1
+    assert queue.completed == ["job-1"]
+
+
+def test_stops_jobs_cancelled_in_the_queue(run, queue):
+    queue.jobs = [make_job(1), make_job(2)]
+    outcome = {}
+
+    async def handler(job):
+        if job["id"] == "job-1":
+            queue.cancelled.append("job-1")
+        try:
+            await asyncio.sleep(0.2)
+        except asyncio.CancelledError:
+            outcome[job["id"]] = is_cancelled()
+            raise
+
+    run(run_until(make_worker(handler), lambda: outcome and queue.completed))
+
+    assert outcome == {"job-1": True}
+    assert queue.completed == ["job-2"]
+    assert queue.failed == []
+
+
+def test_cancel_task_stops_the_job_of_a_task(run, queue):
+    queue.jobs = [make_job(1)]
+    started = asyncio.Event()
+    outcome = {}
+
+    async def handler(job):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            outcome["cancelled"] = is_cancelled()
+            raise
+
+    async def scenario():
+        worker = make_worker(handler, heartbeat_interval=10)
+        worker.start()
+        await started.wait()
+        assert not worker.cancel_task("task-2")
+        assert worker.cancel_task("task-1")
+        while not outcome:
+            await asyncio.sleep(0.005)
+        await worker.shutdown()
+
+    run(scenario())
+
+    assert outcome == {"cancelled": True}
+    assert queue.completed == []
+
+
+def test_gives_up_exhausted_jobs(run, queue):
+    queue.jobs = [make_job(1, exhausted=True)]
+    handled = []
+    given_up = []
+
+    async def handler(job):
+        handled.append(job["id"])
+
+    async def give_up_handler(job, error):
+        given_up.append((job["id"], error))
+
+    run(run_until(make_worker(handler, give_up_handler=give_up_handler), lambda: queue.failed))
+
+    assert handled == []
+    assert [job_id for job_id, _ in given_up] == ["job-1"]
+    assert isinstance(given_up[0][1], LeaseExpiredError)
+    assert queue.failed == [("job-1", str(given_up[0][1]), 30)]
+
+
+def test_leaves_exhausted_jobs_to_expire_when_giving_up_fails(run, queue):
+    queue.jobs = [make_job(1, exhausted=True)]
+    attempts = []
+
+    async def give_up_handler(job, error):
+        attempts.append(job["id"])
+        raise ConnectionError("database unavailable")
+
+    async def handler(job):
+        pass
+
+    run(run_until(make_worker(handler, give_up_handler=give_up_handler), lambda: attempts))
+
+    # The job stays leased, so it is claimed as exhausted again once the lease expires
+    assert queue.failed == []
+
+
+def test_shutdown_cancels_jobs_running_past_the_timeout(run, queue):
+    queue.jobs = [make_job(1)]
+    started = asyncio.Event()
+    outcome = {}
+
+    async def handler(job):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            outcome["cancelled"] = is_cancelled()
+            raise
+
+    async def scenario():
+        worker = make_worker(handler, heartbeat_interval=10)
+        worker.start()
+        await started.wait()
+        await worker.shutdown(timeout=0.05)
+
+    run(scenario())
+
+    # Interrupted rather than cancelled: the lease expires and another worker runs the job
+    assert outcome == {"cancelled": False}
+    assert queue.completed == []
+    assert queue.failed == []
@@ -0,0 +1,55 @@
+"""
+Standalone task worker.
+
+Runs research, audio overview and mindmap tasks queued by the API. Start as
+many worker processes (on as many hosts) as needed; they share the queue in
+the database. Set RUN_EMBEDDED_WORKER=false on the API when using them.
+
+Usage (from the backend directory):
+    python worker.py
+"""
+
+import asyncio
+import os
+import signal
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+os.environ['CREWAI_DISABLE_TELEMETRY'] = 'true'
+
+from config.logging import setup_logging
+
+setup_logging(console_level="INFO", file_level="DEBUG")
+
+from services import initialize_db_pool, close_db_pool, vector_store
+from services.task_worker import create_task_worker
+from services.task_events import task_events
+
+async def main() -> None:
+    await initialize_db_pool()
+    try:
+        await vector_store.initialize()
+    except Exception as e:
+        # Tasks retry the setup lazily, e.g. once Qdrant is reachable
+        logger.error(f"Vector store initialization failed, will retry on first use: {e}")
+
+    # Workers only publish task events; the API processes stream them
+    await task_events.start(listen=False)
+
+    worker = create_task_worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        # Let running tasks finish; unfinished ones are picked up by another worker
+        await worker.shutdown()
+        await task_events.stop()
+        await close_db_pool()
+
+if __name__ == "__main__":
+    asyncio.run(main())